@@ -28,29 +28,32 @@ app_list = [
     "com.facebook.katana"
 ]
 
+# Separador usado para ler várias informações do dispositivo em uma única chamada
+DEVICE_INFO_SEPARATOR = "__MINIPCS_INFO__"
+
+def read_device_info(adb_path, serial):
+    """Lê modelo, versão do Android e DPI em uma única chamada `adb shell`"""
+    result = subprocess.run(
+        [adb_path, "-s", serial, "shell",
+         f"getprop ro.product.model; echo {DEVICE_INFO_SEPARATOR}; "
+         f"getprop ro.build.version.release; echo {DEVICE_INFO_SEPARATOR}; wm density"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
+    )
+    parts = [part.strip() for part in result.stdout.split(DEVICE_INFO_SEPARATOR)]
+    if len(parts) != 3:
+        raise ValueError("Resposta inesperada do dispositivo")
+    model, android_version, current_dpi = parts
+
+    return {
+        "model": model,
+        "android_version": android_version,
+        "current_dpi": current_dpi
+    }
+
 def get_device_info(ip_address, port):
     try:
         # Obtém informações do dispositivo
-        model = subprocess.run(
-            [ADB_PATH, "-s", f"{ip_address}:{port}", "shell", "getprop", "ro.product.model"],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-        ).stdout.strip()
-
-        android_version = subprocess.run(
-            [ADB_PATH, "-s", f"{ip_address}:{port}", "shell", "getprop", "ro.build.version.release"],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-        ).stdout.strip()
-
-        current_dpi = subprocess.run(
-            [ADB_PATH, "-s", f"{ip_address}:{port}", "shell", "wm", "density"],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-        ).stdout.strip()
-
-        return {
-            "model": model,
-            "android_version": android_version,
-            "current_dpi": current_dpi
-        }
+        return read_device_info(ADB_PATH, f"{ip_address}:{port}")
     except:
         return None
 
@@ -305,26 +308,7 @@ class ADBManager:
 
     def get_device_info(self, ip_address):
         try:
-            model = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "shell", "getprop", "ro.product.model"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-            ).stdout.strip()
-
-            android_version = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "shell", "getprop", "ro.build.version.release"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-            ).stdout.strip()
-
-            current_dpi = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "shell", "wm", "density"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-            ).stdout.strip()
-
-            return {
-                "model": model,
-                "android_version": android_version,
-                "current_dpi": current_dpi
-            }
+            return read_device_info(self.adb_path, f"{ip_address}:{self.port}")
         except:
             return None
 
@@ -3,19 +3,36 @@ import subprocess
 import os
 import threading
 import time
+import queue
+import uuid
+import socket
+import struct
+import shlex
+import re
+import asyncio
+import concurrent.futures
+import ipaddress
 # Importações para sistema de atualização
 import requests
 import json
 import zipfile
 import shutil
-from urllib.parse import urlparse
+import tempfile
+import hashlib
+import contextlib
+import multiprocessing
+import mmap
+import zlib
+from urllib.parse import urlparse, urljoin
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QGridLayout, QLabel, QLineEdit, 
                              QPushButton, QCheckBox, QTextEdit, QGroupBox,
                              QFrame, QScrollArea, QSizePolicy, QDialog,
                              QListWidget, QMessageBox, QComboBox, QProgressBar,
-                             QGraphicsDropShadowEffect)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QPropertyAnimation, QRect, QEasingCurve, pyqtProperty
+                             QGraphicsDropShadowEffect, QSpinBox, QTableView, QHeaderView,
+                             QAbstractItemView, QFileDialog, QInputDialog)
+from PyQt6.QtCore import (Qt, QThread, pyqtSignal, QTimer, QPropertyAnimation, QRect, QEasingCurve, pyqtProperty,
+                          QAbstractTableModel, QModelIndex, QFileSystemWatcher)
 from PyQt6.QtGui import QFont, QPalette, QColor, QIcon, QPainter, QPen, QBrush, QLinearGradient
 
 def resource_path(relative_path):
@@ -26,11 +43,1611 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+class ADBSessionError(Exception):
+    """Erro de comunicação com a sessão persistente do adb shell"""
+    pass
+
+class ADBShellSession:
+    """Mantém um único processo `adb -s <serial> shell` aberto e envia comandos por ele.
+
+    Cada comando é delimitado por marcadores (sentinelas) em stdout e stderr,
+    o que permite separar a saída e o código de saída de cada comando.
+    """
+
+    def __init__(self, adb_path, serial):
+        self.adb_path = adb_path
+        self.serial = serial
+        self.lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:12]
+        self._counter = 0
+        self._stdout_queue = queue.Queue()
+        self._stderr_queue = queue.Queue()
+
+        # -T: sem PTY, para manter stdout e stderr separados e sem eco
+        self.process = subprocess.Popen(
+            [adb_path, "-s", serial, "shell", "-T"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW
+        )
+        for stream, target in ((self.process.stdout, self._stdout_queue),
+                               (self.process.stderr, self._stderr_queue)):
+            threading.Thread(target=self._pump, args=(stream, target), daemon=True).start()
+
+    @staticmethod
+    def _pump(stream, target):
+        """Lê as linhas de um stream do processo e repassa para a fila"""
+        try:
+            for line in iter(stream.readline, b""):
+                target.put(line.decode("utf-8", errors="replace"))
+        except Exception:
+            pass
+        finally:
+            target.put(None)  # Fim do stream (sessão encerrada)
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def run(self, command, timeout=None):
+        """Executa um comando na sessão e retorna um CompletedProcess com código de saída, stdout e stderr"""
+        if isinstance(command, (list, tuple)):
+            command_line = " ".join(str(arg) for arg in command)
+        else:
+            command_line = command
+
+        with self.lock:
+            if not self.is_alive():
+                raise ADBSessionError(f"Sessão encerrada para {self.serial}")
+
+            self._counter += 1
+            marker = f"__MINIPCS_{self._token}_{self._counter}__"
+            # Subshell isola `exit`/`cd` do comando da sessão. O marcador de stderr é
+            # emitido antes do de stdout: em dispositivos antigos, sem shell v2, o
+            # stderr chega misturado ao stdout e isso é detectado abaixo
+            script = (
+                f"( {command_line}\n) </dev/null; __minipcs_rc=$?; "
+                f"echo \"{marker}\" >&2; echo \"{marker} $__minipcs_rc\"\n"
+            )
+            try:
+                self.process.stdin.write(script.encode("utf-8"))
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                raise ADBSessionError(f"Falha ao enviar comando: {e}")
+
+            deadline = time.monotonic() + timeout if timeout else None
+            stdout_lines = []
+            returncode = None
+            stderr_merged = False
+
+            while returncode is None:
+                line = self._next_line(self._stdout_queue, deadline, command)
+                index = line.find(marker)
+                if index < 0:
+                    stdout_lines.append(line)
+                    continue
+                if index > 0:
+                    stdout_lines.append(line[:index])
+                status = line[index + len(marker):].strip()
+                if status:
+                    returncode = int(status)
+                else:
+                    stderr_merged = True
+
+            stderr_lines = []
+            if not stderr_merged:
+                while True:
+                    line = self._next_line(self._stderr_queue, deadline, command)
+                    index = line.find(marker)
+                    if index < 0:
+                        stderr_lines.append(line)
+                        continue
+                    if index > 0:
+                        stderr_lines.append(line[:index])
+                    break
+
+            return subprocess.CompletedProcess(
+                command, returncode, "".join(stdout_lines), "".join(stderr_lines)
+            )
+
+    def _next_line(self, source, deadline, command):
+        """Lê a próxima linha respeitando o prazo do comando"""
+        try:
+            if deadline is None:
+                line = source.get()
+            else:
+                line = source.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise subprocess.TimeoutExpired(command, None)
+        if line is None:
+            raise ADBSessionError(f"Sessão encerrada para {self.serial}")
+        return line
+
+    def close(self):
+        """Encerra a sessão"""
+        try:
+            if self.is_alive():
+                self.process.stdin.write(b"exit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=2)
+        except Exception:
+            pass
+        if self.is_alive():
+            try:
+                self.process.kill()
+            except Exception:
+                pass
+
+class ADBProtocolError(Exception):
+    """Resposta FAIL ou inesperada do servidor adb"""
+    pass
+
+class ADBSocketClient:
+    """Cliente do protocolo host do adb (smart socket) falando direto com o servidor local.
+
+    Evita iniciar um processo `adb` por comando: cada requisição é uma conexão
+    TCP com o servidor adb (porta 5037), que já mantém os transportes abertos.
+    """
+
+    # Identificadores de pacote do protocolo shell v2
+    SHELL_STDIN = 0
+    SHELL_STDOUT = 1
+    SHELL_STDERR = 2
+    SHELL_EXIT = 3
+    SHELL_CLOSE_STDIN = 4
+
+    def __init__(self, host="127.0.0.1", port=5037, timeout=5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def _open(self):
+        # `self.timeout` vale para conectar e para as requisições curtas do host; o shell redefine
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def _recv_exact(sock, size, deadline=None):
+        """Lê exatamente `size` bytes; com `deadline` (time.monotonic) o prazo é total, não por recv"""
+        data = b""
+        while len(data) < size:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("prazo esgotado")
+                sock.settimeout(remaining)
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ADBProtocolError("Conexão encerrada pelo servidor adb")
+            data += chunk
+        return data
+
+    def _request(self, sock, payload):
+        """Envia uma requisição com prefixo de tamanho e valida OKAY/FAIL"""
+        data = payload.encode("utf-8")
+        sock.sendall(b"%04x" % len(data) + data)
+        status = self._recv_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise ADBProtocolError(self._read_message(sock).decode("utf-8", errors="replace"))
+        raise ADBProtocolError(f"Resposta inesperada do servidor adb: {status!r}")
+
+    def _read_message(self, sock):
+        length = int(self._recv_exact(sock, 4), 16)
+        return self._recv_exact(sock, length)
+
+    def version(self):
+        """Retorna a versão do servidor adb (usado para verificar disponibilidade)"""
+        with self._open() as sock:
+            self._request(sock, "host:version")
+            return int(self._read_message(sock), 16)
+
+    def devices(self):
+        """Lista os dispositivos via host:devices-l"""
+        with self._open() as sock:
+            self._request(sock, "host:devices-l")
+            output = self._read_message(sock).decode("utf-8", errors="replace")
+        return parse_devices_output(output)
+
+    def open_track_devices(self):
+        """Abre host:track-devices-l; o servidor envia a lista completa a cada mudança.
+
+        Servidores adb antigos não conhecem a variante -l e respondem FAIL; nesse
+        caso usa host:track-devices (só serial e estado). A conexão fica aberta
+        sem timeout; leia com `read_device_list` e feche o socket para encerrar.
+        """
+        requests_to_try = ["host:track-devices-l", "host:track-devices"]
+        for request in requests_to_try:
+            sock = self._open()
+            try:
+                self._request(sock, request)
+            except ADBProtocolError:
+                sock.close()
+                if request == requests_to_try[-1]:
+                    raise
+                continue
+            except BaseException:
+                sock.close()
+                raise
+            sock.settimeout(None)
+            return sock
+
+    def read_device_list(self, sock):
+        """Bloqueia até a próxima atualização de um socket de `open_track_devices`"""
+        return parse_devices_output(self._read_message(sock).decode("utf-8", errors="replace"))
+
+    def shell(self, serial, command, timeout=None, input=None):
+        """Executa um comando via shell,v2 e retorna um CompletedProcess com stdout, stderr e código de saída.
+
+        `timeout` é o prazo total do comando (None = sem limite, como no subprocess).
+        """
+        if isinstance(command, (list, tuple)):
+            command_line = " ".join(str(arg) for arg in command)
+        else:
+            command_line = command
+
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            with self._open() as sock:
+                sock.settimeout(timeout)
+                self._request(sock, f"host:transport:{serial}")
+                self._request(sock, f"shell,v2,raw:{command_line}")
+
+                if input is not None:
+                    data = input.encode("utf-8") if isinstance(input, str) else input
+                    for offset in range(0, len(data), 64 * 1024):
+                        chunk = data[offset:offset + 64 * 1024]
+                        sock.sendall(struct.pack("<BI", self.SHELL_STDIN, len(chunk)) + chunk)
+                    sock.sendall(struct.pack("<BI", self.SHELL_CLOSE_STDIN, 0))
+
+                stdout = []
+                stderr = []
+                returncode = None
+                while returncode is None:
+                    packet_id, length = struct.unpack("<BI", self._recv_exact(sock, 5, deadline))
+                    payload = self._recv_exact(sock, length, deadline)
+                    if packet_id == self.SHELL_STDOUT:
+                        stdout.append(payload)
+                    elif packet_id == self.SHELL_STDERR:
+                        stderr.append(payload)
+                    elif packet_id == self.SHELL_EXIT:
+                        returncode = payload[0] if payload else 0
+        except socket.timeout:
+            raise subprocess.TimeoutExpired(command, timeout)
+
+        return subprocess.CompletedProcess(
+            command, returncode,
+            b"".join(stdout).decode("utf-8", errors="replace"),
+            b"".join(stderr).decode("utf-8", errors="replace")
+        )
+
+# Resultado de ADBManager.ensure_connected
+CONNECTION_OK = "connected"
+CONNECTION_UNREACHABLE = "unreachable"  # nada respondeu na porta adb (desligado ou IP errado)
+CONNECTION_FAILED = "failed"  # a porta respondeu, mas o `adb connect` não estabeleceu o transporte
+
+def parse_devices_output(output):
+    """Interpreta a saída de `adb devices -l` / host:devices-l em uma lista de dicionários"""
+    devices = []
+    for line in output.splitlines():
+        line = line.strip()
+        if not line or line.startswith("List of devices") or line.startswith("*"):
+            continue
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        device = {"serial": parts[0], "state": parts[1]}
+        for extra in parts[2:]:
+            if ":" in extra:
+                key, value = extra.split(":", 1)
+                device[key] = value
+        devices.append(device)
+    return devices
+
+def build_batch_script(commands, marker):
+    """Monta um único script sh a partir de uma lista [(args, descrição), ...].
+
+    Após cada comando o script emite o marcador com o índice em stderr e,
+    em seguida, em stdout junto com o código de saída.
+    """
+    lines = []
+    for index, (command, _description) in enumerate(commands):
+        if isinstance(command, (list, tuple)):
+            command_line = " ".join(shlex.quote(str(arg)) for arg in command)
+        else:
+            command_line = command
+        lines.append(f"( {command_line}\n) </dev/null; __minipcs_rc=$?")
+        lines.append(f"echo \"{marker}:{index}\" >&2; echo \"{marker}:{index}:$__minipcs_rc\"")
+    return "\n".join(lines) + "\n"
+
+def parse_batch_output(commands, marker, stdout, stderr, stderr_limit=500):
+    """Separa a saída de um script de lote em um CompletedProcess por comando.
+
+    Retorna [(descrição, CompletedProcess), ...] na ordem de `commands`.
+    Comandos que não chegaram a executar recebem returncode -1.
+    """
+    pattern = re.compile(re.escape(marker) + r":(\d+)(?::(-?\d+))?")
+    outputs = {}
+    codes = {}
+    errors = {}
+
+    buffer = []
+    for line in stdout.splitlines(keepends=True):
+        match = pattern.search(line)
+        if not match:
+            buffer.append(line)
+            continue
+        if match.start() > 0:
+            buffer.append(line[:match.start()])
+        index = int(match.group(1))
+        if match.group(2) is None:
+            # Marcador de stderr em stdout: streams misturados (sem shell v2)
+            continue
+        codes[index] = int(match.group(2))
+        outputs[index] = "".join(buffer)
+        buffer = []
+
+    buffer = []
+    for line in stderr.splitlines(keepends=True):
+        match = pattern.search(line)
+        if not match:
+            buffer.append(line)
+            continue
+        if match.start() > 0:
+            buffer.append(line[:match.start()])
+        errors[int(match.group(1))] = "".join(buffer)[:stderr_limit]
+        buffer = []
+
+    records = []
+    for index, (command, description) in enumerate(commands):
+        if index in codes:
+            result = subprocess.CompletedProcess(command, codes[index], outputs.get(index, ""), errors.get(index, ""))
+        else:
+            result = subprocess.CompletedProcess(command, -1, "", "Não executado")
+        records.append((description, result))
+    return records
+
+def parse_getprop_output(output):
+    """Converte a saída de `getprop` ([chave]: [valor]) em dicionário"""
+    props = {}
+    for match in re.finditer(r"^\[([^\]]+)\]: \[(.*)\]\s*$", output, re.MULTILINE):
+        props[match.group(1)] = match.group(2)
+    return props
+
+class DeviceSnapshot:
+    """Retrato do dispositivo: getprop completo + `wm density`/`wm size`, obtidos em uma única ida"""
+
+    SNAPSHOT_COMMANDS = [
+        (["getprop"], "getprop"),
+        (["wm", "density"], "wm density"),
+        (["wm", "size"], "wm size")
+    ]
+
+    def __init__(self, serial, props, density_output, size_output):
+        self.serial = serial
+        self.props = props
+        self.model = props.get("ro.product.model", "")
+        self.android_version = props.get("ro.build.version.release", "")
+        self.sdk_int = self._to_int(props.get("ro.build.version.sdk"))
+        self.density_output = density_output.strip()
+        self.size_output = size_output.strip()
+        self.physical_density = self._to_int(self._find(r"Physical density:\s*(\d+)", self.density_output))
+        self.override_density = self._to_int(self._find(r"Override density:\s*(\d+)", self.density_output))
+        self.physical_size = self._find(r"Physical size:\s*(\S+)", self.size_output)
+        self.override_size = self._find(r"Override size:\s*(\S+)", self.size_output)
+        self.captured_at = time.monotonic()
+
+    @staticmethod
+    def _find(pattern, text):
+        match = re.search(pattern, text)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def from_batch(cls, serial, records):
+        """Monta o retrato a partir dos registros de `ADBManager.run_batch`"""
+        getprop, density, size = (result for _, result in records)
+        if getprop.returncode != 0:
+            return None
+        return cls(serial, parse_getprop_output(getprop.stdout), density.stdout, size.stdout)
+
+    @property
+    def android_major(self):
+        """Versão principal do Android (ex.: 9 para '9' ou '9.0.1')"""
+        return self._to_int(self.android_version.split(".")[0]) if self.android_version else None
+
+    @property
+    def current_dpi(self):
+        """DPI em uso: o override, se houver, senão o físico"""
+        return self.override_density or self.physical_density
+
+    def age(self):
+        return time.monotonic() - self.captured_at
+
+    def as_dict(self):
+        """Formato antigo de `get_device_info`"""
+        return {
+            "model": self.model,
+            "android_version": self.android_version,
+            "current_dpi": self.density_output
+        }
+
+# Pacote do aplicativo principal de cada tipo de painel
+MAIN_APP_PACKAGES = {
+    "Painel": "com.example.roosevelt.painel_senha_digital",
+    "Totem": "com.example.roosevelt.ai_autoatendimento"
+}
+
+def build_autostart_commands(main_package, android_major=None):
+    """Lista [(args, descrição), ...] que configura o auto-start do app principal"""
+    # Comandos que funcionaram no bash - adaptados para Python
+    autostart_commands = [
+        # 1. Desabilitar otimização de bateria
+        (["dumpsys", "deviceidle", "whitelist", "+" + main_package], "Whitelist de bateria"),
+        (["cmd", "appops", "set", main_package, "REQUEST_IGNORE_BATTERY_OPTIMIZATIONS", "allow"], "Ignorar otimização de bateria"),
+        
+        # 2. Permitir auto-start / background activity
+        (["cmd", "appops", "set", main_package, "START_FOREGROUND", "allow"], "Permitir foreground"),
+        (["cmd", "appops", "set", main_package, "SYSTEM_ALERT_WINDOW", "allow"], "Permitir janelas do sistema"),
+        (["cmd", "appops", "set", main_package, "RUN_IN_BACKGROUND", "allow"], "Executar em background"),
+        
+        # 3. Desabilitar App Standby
+        (["dumpsys", "usagestats", "set-standby-bucket", main_package, "10"], "Desabilitar App Standby"),
+        
+        # 4. Configurar como app crítico
+        (["cmd", "deviceidle", "whitelist", "+" + main_package], "App crítico do sistema"),
+        (["cmd", "appops", "set", main_package, "RUN_ANY_IN_BACKGROUND", "allow"], "Execução irrestrita"),
+        
+        # 5. Configurar Doze mode
+        (["settings", "put", "global", "device_idle_constants", 
+          "inactive_to=7200000,sensing_to=0,locating_to=0,location_accuracy=20,motion_inactive_to=0,idle_after_inactive_to=0,idle_pending_to=300000,max_idle_pending_to=600000,idle_pending_factor=2.0,idle_to=3600000,max_idle_to=21600000,idle_factor=2.0,min_time_to_alarm=3600000,max_temp_app_whitelist_duration=300000,mms_temp_app_whitelist_duration=60000,sms_temp_app_whitelist_duration=20000"], 
+          "Configurar Doze mode"),
+        
+        # 6. Conceder permissões específicas
+        (["pm", "grant", main_package, "android.permission.RECEIVE_BOOT_COMPLETED"], "Permissão BOOT_COMPLETED"),
+        (["pm", "grant", main_package, "android.permission.SYSTEM_ALERT_WINDOW"], "Permissão janelas sistema"),
+        (["pm", "grant", main_package, "android.permission.WAKE_LOCK"], "Permissão Wake Lock"),
+        (["pm", "grant", main_package, "android.permission.REQUEST_IGNORE_BATTERY_OPTIMIZATIONS"], "Permissão ignorar bateria")
+    ]
+    
+    # Comandos específicos por versão
+    if android_major and android_major >= 8:
+        autostart_commands.extend([
+            (["cmd", "appops", "set", main_package, "BOOT_COMPLETED", "allow"], "Permitir BOOT_COMPLETED"),
+            (["settings", "put", "global", "hidden_api_policy_pre_p_apps", "1"], "API Policy Pre-P"),
+            (["settings", "put", "global", "hidden_api_policy_p_apps", "1"], "API Policy P")
+        ])
+    
+    if android_major and android_major >= 9:
+        autostart_commands.extend([
+            (["device_config", "put", "activity_manager", "default_background_activity_starts_enabled", "true"], "Background activity starts")
+        ])
+    
+    if android_major and android_major >= 10:
+        autostart_commands.extend([
+            (["cmd", "appops", "set", main_package, "AUTO_START", "allow"], "Auto-start Android 10+")
+        ])
+    
+    return autostart_commands
+
+def build_autostart_start_commands(main_package):
+    """Formas de iniciar o app principal, na ordem em que devem ser tentadas"""
+    return [
+        # Método 1: Via SplashActivity (mais comum)
+        (["am", "start", "-n", main_package + "/.SplashActivity"], "Iniciar via SplashActivity"),
+        # Método 2: Via MainActivity (fallback)
+        (["am", "start", "-n", main_package + "/.MainActivity"], "Iniciar via MainActivity"),
+        # Método 3: Via launcher (genérico)
+        (["monkey", "-p", main_package, "-c", "android.intent.category.LAUNCHER", "1"], "Iniciar via launcher")
+    ]
+
+def summarize_autostart_records(records):
+    """Gera as linhas ✓/✗/⚠️ do auto-start. Retorna (sucessos, total, linhas)"""
+    successful_commands = 0
+    results = []
+    for description, result in records:
+        if result.returncode == 0:
+            successful_commands += 1
+            results.append(f"✓ {description}")
+        else:
+            # Alguns comandos podem falhar mas isso é OK para alguns casos
+            error_msg = result.stderr.strip().lower()
+            if any(x in error_msg for x in ["unknown command", "not found", "permission denied", "invalid"]):
+                results.append(f"⚠️ {description}: Comando não disponível (ignorando)")
+            else:
+                results.append(f"✗ {description}: {result.stderr.strip()[:50]}")
+    return successful_commands, len(records), results
+
+def command_fact(command):
+    """(tipo, chave, valor) que um comando de auto-start deixa no dispositivo; None se não houver como conferir"""
+    command = list(command)
+    if command[1:3] == ["deviceidle", "whitelist"] and command[3].startswith("+"):
+        return "idle_whitelist", command[3][1:], True
+    if command[:3] == ["cmd", "appops", "set"]:
+        return "appops", (command[3], command[4]), command[5]
+    if command[:3] == ["dumpsys", "usagestats", "set-standby-bucket"]:
+        return "standby", command[3], command[4]
+    if command[:2] == ["settings", "put"]:
+        return "settings", (command[2], command[3]), command[4]
+    if command[:2] == ["pm", "grant"]:
+        return "grants", (command[2], command[3]), True
+    if command[:2] == ["device_config", "put"]:
+        return "device_config", (command[2], command[3]), command[4]
+    return None
+
+class StatePlan:
+    """Diferença entre o estado desejado e o atual: só o que precisa ser executado"""
+
+    def __init__(self):
+        self.dpi = None        # (atual, desejado) quando o DPI precisa mudar
+        self.uninstall = []    # pacotes a remover
+        self.install = []      # posições em DesiredState.apks a instalar
+        self.autostart = []    # [(args, descrição)] de auto-start a aplicar
+        self.changed = []      # itens de auto-start sabidamente diferentes
+
+    @property
+    def reboot(self):
+        """Reiniciar só quando algo realmente mudou no dispositivo"""
+        return bool(self.dpi or self.uninstall or self.install or self.changed)
+
+    def is_empty(self):
+        return not (self.dpi or self.uninstall or self.install or self.autostart)
+
+    def describe(self):
+        if self.is_empty():
+            return "já está no estado desejado"
+        parts = []
+        if self.dpi:
+            parts.append(f"DPI {self.dpi[0] or '?'} → {self.dpi[1]}")
+        if self.uninstall:
+            parts.append(f"{len(self.uninstall)} remoção(ões)")
+        if self.install:
+            parts.append(f"{len(self.install)} instalação(ões)")
+        if self.autostart:
+            parts.append(f"{len(self.autostart)} ajuste(s) de auto-start")
+        return ", ".join(parts)
+
+class DesiredState:
+    """Estado desejado de um perfil: DPI, pacotes ausentes, versões de APK e auto-start.
+
+    Os itens de auto-start vêm de `build_autostart_commands`; cada comando é
+    traduzido (`command_fact`) no valor que deixa no dispositivo. O estado atual
+    é lido com um único lote de consultas (`query_commands` + `read`) e `diff`
+    devolve só os comandos necessários.
+    """
+
+    def __init__(self, dpi=None, absent_packages=(), apks=(), main_package=None, android_major=None):
+        self.dpi = str(dpi) if dpi else None
+        self.absent_packages = list(absent_packages)
+        self.apks = list(apks)  # [{package, version_code}], na ordem de instalação
+        self.main_package = main_package
+        self.autostart_commands = build_autostart_commands(main_package, android_major) if main_package else []
+        self.facts = [command_fact(command) for command, _ in self.autostart_commands]
+
+    def query_commands(self):
+        """Consultas do estado atual: [(args, (tipo, chave))]"""
+        queries = [
+            (["wm", "density"], ("dpi", None)),
+            (["pm", "list", "packages", "--show-versioncode"], ("versions", None)),
+            (["pm", "list", "packages"], ("packages", None)),
+        ]
+        kinds = {fact[0] for fact in self.facts if fact}
+        packages = {fact[1][0] for fact in self.facts if fact and fact[0] in ("appops", "grants")}
+        for package in sorted(packages):
+            queries.append((["cmd", "appops", "get", package], ("appops", package)))
+            queries.append((f"dumpsys package {shlex.quote(package)} | grep 'granted=true'", ("grants", package)))
+        if "idle_whitelist" in kinds:
+            queries.append((["dumpsys", "deviceidle", "whitelist"], ("idle_whitelist", None)))
+        for kind, key, _ in (fact for fact in self.facts if fact):
+            if kind == "standby":
+                queries.append((["am", "get-standby-bucket", key], (kind, key)))
+            elif kind == "settings":
+                queries.append((["settings", "get", key[0], key[1]], (kind, key)))
+            elif kind == "device_config":
+                queries.append((["device_config", "get", key[0], key[1]], (kind, key)))
+        return queries
+
+    @staticmethod
+    def read(records):
+        """Estado atual a partir dos registros de `run_batch` (None onde não foi possível ler)"""
+        state = {"dpi": None, "versions": None, "packages": None, "appops": None, "grants": None,
+                 "idle_whitelist": None, "standby": None, "settings": None, "device_config": None}
+        for (kind, key), result in records:
+            output = result.stdout
+            if result.returncode != 0 and kind != "grants":  # grep sem resultado também sai com 1
+                continue
+            if kind == "dpi":
+                density = (DeviceSnapshot._find(r"Override density:\s*(\d+)", output)
+                           or DeviceSnapshot._find(r"Physical density:\s*(\d+)", output))
+                state["dpi"] = density
+            elif kind == "versions":
+                state["versions"] = parse_package_versions(output) or None
+            elif kind == "packages":
+                state["packages"] = parse_package_list(output) or None
+            elif kind == "appops":
+                modes = state["appops"] = state["appops"] or {}
+                for match in re.finditer(r"^\s*([A-Z_]+): ([a-z]+)", output, re.MULTILINE):
+                    modes[(key, match.group(1))] = match.group(2)
+            elif kind == "grants":
+                if result.returncode in (0, 1):
+                    grants = state["grants"] = state["grants"] or set()
+                    grants.update((key, permission) for permission in re.findall(r"([\w.]+): granted=true", output))
+            elif kind == "idle_whitelist":
+                state["idle_whitelist"] = {line.split(",")[1] for line in output.splitlines() if line.count(",") >= 2}
+            elif kind in ("standby", "settings", "device_config"):
+                state[kind] = state[kind] or {}
+                state[kind][key] = output.strip()
+        return state
+
+    @staticmethod
+    def check(fact, state):
+        """True se o item já está aplicado, False se sabidamente não está, None se não dá para saber"""
+        kind, key, value = fact
+        actual = state.get(kind)
+        if actual is None:
+            return None
+        if kind == "idle_whitelist":
+            return key in actual
+        if kind == "grants":
+            return True if key in actual else None  # Permissões normais/appop não aparecem como concedidas
+        current = actual.get(key)
+        if current is None:
+            return None  # appop no modo padrão não é listado
+        if kind == "standby":
+            return True if current == value else None  # O bucket varia com o uso do app
+        return current == value
+
+    def diff(self, state):
+        plan = StatePlan()
+        if self.dpi and state["dpi"] != self.dpi:
+            plan.dpi = (state["dpi"], self.dpi)
+
+        installed = state["packages"]
+        plan.uninstall = [package for package in self.absent_packages if installed is None or package in installed]
+
+        versions = state["versions"]
+        for position, apk in enumerate(self.apks):
+            if (not apk.get("package") or apk.get("version_code") is None or versions is None
+                    or versions.get(apk["package"]) != apk["version_code"]):
+                plan.install.append(position)
+
+        for (command, description), fact in zip(self.autostart_commands, self.facts):
+            applied = self.check(fact, state) if fact else None
+            if applied:
+                continue
+            plan.autostart.append((command, description))
+            if applied is False:
+                plan.changed.append(description)
+        return plan
+
+class APKManifestError(Exception):
+    """AndroidManifest.xml ausente ou em formato binário inválido"""
+    pass
+
+# IDs de recurso dos atributos do manifesto (usados quando o nome do atributo foi ofuscado)
+MANIFEST_ATTRIBUTE_IDS = {
+    0x0101021b: "versionCode",
+    0x0101021c: "versionName",
+    0x0101020c: "minSdkVersion",
+    0x01010270: "targetSdkVersion",
+}
+
+def _axml_string_pool(data, offset):
+    """Lê o pool de strings de um chunk RES_STRING_POOL_TYPE"""
+    header_size, chunk_size, count, _, flags, strings_start = struct.unpack_from("<HIIIII", data, offset + 2)
+    utf8 = bool(flags & 0x100)
+    base = offset + strings_start
+    strings = []
+    for index in range(count):
+        position = base + struct.unpack_from("<I", data, offset + header_size + index * 4)[0]
+        if utf8:
+            # Tamanho em caracteres e depois em bytes, cada um com 1 ou 2 bytes
+            for _ in range(2):
+                length = data[position]
+                position += 1
+                if length & 0x80:
+                    length = ((length & 0x7F) << 8) | data[position]
+                    position += 1
+            strings.append(data[position:position + length].decode("utf-8", errors="replace"))
+        else:
+            length = struct.unpack_from("<H", data, position)[0]
+            position += 2
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | struct.unpack_from("<H", data, position)[0]
+                position += 2
+            strings.append(data[position:position + length * 2].decode("utf-16-le", errors="replace"))
+    return strings
+
+def parse_binary_manifest(data):
+    """Extrai package, versionCode, versionName e minSdk/targetSdk de um AndroidManifest.xml binário (AXML)"""
+    if len(data) < 8 or struct.unpack_from("<H", data, 0)[0] != 0x0003:
+        raise APKManifestError("AndroidManifest.xml não está no formato binário")
+
+    strings = []
+    resource_ids = []
+    info = {}
+    offset = struct.unpack_from("<H", data, 2)[0]
+    while offset + 8 <= len(data):
+        chunk_type, header_size, chunk_size = struct.unpack_from("<HHI", data, offset)
+        if chunk_size < 8:
+            raise APKManifestError("Chunk inválido no AndroidManifest.xml")
+
+        if chunk_type == 0x0001:  # RES_STRING_POOL_TYPE
+            strings = _axml_string_pool(data, offset)
+        elif chunk_type == 0x0180:  # RES_XML_RESOURCE_MAP_TYPE
+            count = (chunk_size - header_size) // 4
+            resource_ids = list(struct.unpack_from(f"<{count}I", data, offset + header_size))
+        elif chunk_type == 0x0102:  # RES_XML_START_ELEMENT_TYPE
+            name_index, attribute_start, attribute_size, attribute_count = struct.unpack_from(
+                "<IHHH", data, offset + header_size + 4)
+            element = strings[name_index] if name_index < len(strings) else ""
+            if element in ("manifest", "uses-sdk"):
+                position = offset + header_size + attribute_start
+                for _ in range(attribute_count):
+                    _, attr_name, raw_value, _, _, data_type, value = struct.unpack_from("<IIIHBBI", data, position)
+                    position += attribute_size
+                    name = MANIFEST_ATTRIBUTE_IDS.get(resource_ids[attr_name]) if attr_name < len(resource_ids) else None
+                    name = name or (strings[attr_name] if attr_name < len(strings) else "")
+                    if data_type == 0x03:  # TYPE_STRING
+                        index = raw_value if raw_value != 0xFFFFFFFF else value
+                        info[name] = strings[index] if index < len(strings) else ""
+                    else:
+                        info[name] = value
+            if element == "application":
+                break  # Os atributos de interesse vêm antes da aplicação
+        offset += chunk_size
+
+    if "package" not in info:
+        raise APKManifestError("Nome do pacote não encontrado no manifesto")
+    return {
+        "package": info["package"],
+        "version_code": int(info["versionCode"]) if str(info.get("versionCode", "")).isdigit() else None,
+        "version_name": str(info.get("versionName", "")),
+        "min_sdk": int(info["minSdkVersion"]) if str(info.get("minSdkVersion", "")).isdigit() else None,
+        "target_sdk": int(info["targetSdkVersion"]) if str(info.get("targetSdkVersion", "")).isdigit() else None,
+    }
+
+def read_apk_manifest(apk_path):
+    """Lê o manifesto de um APK sem aapt"""
+    try:
+        with zipfile.ZipFile(apk_path) as apk:
+            data = apk.read("AndroidManifest.xml")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise APKManifestError(f"APK inválido: {str(e)}")
+    return parse_binary_manifest(data)
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def describe_apk(apk_path):
+    """Entrada do índice de APKs: tamanho, mtime, sha256, dados do manifesto e pré-verificação.
+
+    Função de módulo para poder rodar nos processos do ProcessPoolExecutor.
+    """
+    stat = os.stat(apk_path)
+    check = verify_apk(apk_path)
+    entry = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256_file(apk_path),
+        "package": None,
+        "version_code": None,
+        "version_name": "",
+        "min_sdk": None,
+        "target_sdk": None,
+        "error": None,
+        "preflight_error": check["error"],  # Resultado de verify_apk (CRCs e manifesto)
+    }
+    try:
+        entry.update(read_apk_manifest(apk_path))
+    except (APKManifestError, struct.error, IndexError) as e:
+        entry["error"] = str(e) or "Manifesto inválido"
+    return entry
+
+def _verify_zip_entry(data, info):
+    """Confere o CRC de uma entrada do ZIP lendo os bytes direto do arquivo mapeado"""
+    header = data[info.header_offset:info.header_offset + 30]
+    if len(header) < 30 or header[:4] != b"PK\x03\x04":
+        raise zipfile.BadZipFile(f"Cabeçalho local inválido em {info.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    start = info.header_offset + 30 + name_length + extra_length
+    end = start + info.compress_size
+    if end > len(data):
+        raise zipfile.BadZipFile(f"{info.filename} truncado")
+
+    view = memoryview(data)[start:end]
+    try:
+        if info.compress_type == zipfile.ZIP_STORED:
+            crc, size = zlib.crc32(view), len(view)
+        elif info.compress_type == zipfile.ZIP_DEFLATED:
+            decompressor = zlib.decompressobj(-15)
+            crc = size = 0
+            for offset in range(0, len(view), 1024 * 1024):
+                chunk = decompressor.decompress(view[offset:offset + 1024 * 1024])
+                crc, size = zlib.crc32(chunk, crc), size + len(chunk)
+            chunk = decompressor.flush()
+            crc, size = zlib.crc32(chunk, crc), size + len(chunk)
+        else:
+            return  # Compressão incomum em APK: fica só a checagem do diretório central
+    except zlib.error as e:
+        raise zipfile.BadZipFile(f"{info.filename} corrompido: {e}")
+    finally:
+        view.release()
+    if crc != info.CRC or size != info.file_size:
+        raise zipfile.BadZipFile(f"CRC de {info.filename} não confere")
+
+def verify_apk(apk_path):
+    """Pré-verificação de um APK: existência, diretório central, CRCs e manifesto.
+
+    Função de módulo para poder rodar nos processos do ProcessPoolExecutor.
+    Retorna {path, missing, error, package, version_code, min_sdk}.
+    """
+    result = {"path": apk_path, "missing": False, "error": None, "package": None,
+              "version_code": None, "min_sdk": None}
+    if not os.path.exists(apk_path):
+        result["missing"] = True
+        return result
+    try:
+        with open(apk_path, "rb") as f, zipfile.ZipFile(f) as apk:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for info in apk.infolist():
+                    _verify_zip_entry(data, info)
+            manifest = parse_binary_manifest(apk.read("AndroidManifest.xml"))
+        result.update({key: manifest[key] for key in ("package", "version_code", "min_sdk")})
+    except KeyError:
+        result["error"] = "APK sem AndroidManifest.xml"
+    except (zipfile.BadZipFile, ValueError) as e:
+        result["error"] = f"ZIP inválido: {e}"
+    except (APKManifestError, struct.error, IndexError) as e:
+        result["error"] = f"Manifesto ilegível: {str(e) or 'formato inválido'}"
+    except OSError as e:
+        result["error"] = f"Erro de leitura: {e}"
+    return result
+
+class APKIndex:
+    """Índice em disco dos APKs em `base_path` (apk_index.json).
+
+    Cada entrada só é recalculada quando o tamanho ou o mtime do arquivo mudam;
+    vários APKs alterados são processados em paralelo em processos separados.
+    A entrada guarda também o resultado da pré-verificação (`preflight`).
+    """
+
+    INDEX_VERSION = 2
+
+    def __init__(self, base_path, index_file="apk_index.json"):
+        self.base_path = base_path
+        self.index_path = os.path.join(base_path, index_file)
+        self._entries = {}
+        self._lock = threading.RLock()
+        self.load()
+
+    @staticmethod
+    def _key(apk_path):
+        return os.path.normcase(os.path.abspath(apk_path))
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.INDEX_VERSION:
+                with self._lock:
+                    self._entries = data.get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        # Sob o lock e com arquivo temporário único: `get` e `refresh` podem gravar ao mesmo tempo
+        with self._lock:
+            data = {"version": self.INDEX_VERSION, "entries": self._entries}
+            temp_path = None
+            try:
+                fd, temp_path = tempfile.mkstemp(prefix="apk_index.", suffix=".tmp",
+                                                 dir=os.path.dirname(self.index_path))
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=1)
+                os.replace(temp_path, self.index_path)
+            except OSError:
+                # Pasta sem permissão de escrita: o índice fica só em memória
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def _is_current(self, entry, stat):
+        return entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def scan_paths(self):
+        apk_paths = []
+        for root, _, files in os.walk(self.base_path):
+            apk_paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".apk"))
+        return apk_paths
+
+    def _current_entries(self, apk_paths):
+        """Separa os APKs em ({chave: entrada atual}, [caminhos a recalcular]); ausentes ficam de fora"""
+        current = {}
+        stale = []
+        for apk_path in apk_paths:
+            key = self._key(apk_path)
+            try:
+                stat = os.stat(apk_path)
+            except OSError:
+                continue
+            with self._lock:
+                entry = self._entries.get(key)
+            if self._is_current(entry, stat):
+                current[key] = entry
+            else:
+                stale.append(apk_path)
+        return current, stale
+
+    def _describe(self, apk_paths, max_workers=None):
+        """Recalcula as entradas dos APKs (em paralelo se forem vários); retorna {chave: entrada}"""
+        updates = {}
+        if len(apk_paths) == 1:
+            try:
+                updates[self._key(apk_paths[0])] = describe_apk(apk_paths[0])
+            except OSError:
+                pass
+        elif apk_paths:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(describe_apk, apk_path): apk_path for apk_path in apk_paths}
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        updates[self._key(futures[future])] = future.result()
+                    except OSError:
+                        pass  # Arquivo ainda sendo copiado ou removido no meio do caminho
+        return updates
+
+    def refresh(self, max_workers=None):
+        """Sincroniza o índice com a pasta; retorna quantas entradas mudaram"""
+        apk_paths = self.scan_paths()
+        present = {self._key(apk_path) for apk_path in apk_paths}
+        _, stale = self._current_entries(apk_paths)
+        updates = self._describe(stale, max_workers)
+
+        with self._lock:
+            removed = [key for key in self._entries if key not in present]
+            for key in removed:
+                del self._entries[key]
+            self._entries.update(updates)
+        if updates or removed:
+            self.save()
+        return len(updates) + len(removed)
+
+    def get(self, apk_path):
+        """Entrada atual de um APK (recalculada na hora se o arquivo mudou); None se não existir"""
+        key = self._key(apk_path)
+        try:
+            stat = os.stat(apk_path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        if self._is_current(entry, stat):
+            return entry
+        entry = describe_apk(apk_path)
+        with self._lock:
+            self._entries[key] = entry
+        self.save()
+        return entry
+
+    def preflight(self, apk_paths, max_workers=None):
+        """Pré-verificação de um lote pelo índice; mesmo formato de `verify_apk`, na mesma ordem.
+
+        Só os APKs novos ou alterados desde a última verificação são lidos de
+        novo (em paralelo); os demais são uma consulta ao índice.
+        """
+        current, stale = self._current_entries(apk_paths)
+        updates = self._describe(stale, max_workers)
+        if updates:
+            with self._lock:
+                self._entries.update(updates)
+            self.save()
+        current.update(updates)
+
+        results = []
+        for apk_path in apk_paths:
+            entry = current.get(self._key(apk_path))
+            result = {"path": apk_path, "missing": entry is None, "error": None, "package": None,
+                      "version_code": None, "min_sdk": None}
+            if entry:
+                result["error"] = entry["preflight_error"]
+                if not result["error"]:
+                    result.update({key: entry[key] for key in ("package", "version_code", "min_sdk")})
+            results.append(result)
+        return results
+
+def parse_package_versions(output):
+    """Interpreta `pm list packages --show-versioncode` em {pacote: versionCode}"""
+    versions = {}
+    for line in output.splitlines():
+        match = re.match(r"\s*package:(\S+)\s+versionCode:(\d+)", line)
+        if match:
+            versions[match.group(1)] = int(match.group(2))
+    return versions
+
+class ArtifactStore:
+    """Repositório local de APKs endereçado por sha256 (`<base_path>/store`).
+
+    Cada versão de APK é guardada uma única vez em `objects/<sha256>/<nome>`,
+    mesmo que apareça em vários perfis. Os canais (ex.: "estavel", "teste")
+    mapeiam tipo de painel -> nome do APK -> sha256, então trocar de versão é só
+    trocar de canal. Acima de `max_bytes`, as versões usadas há mais tempo são
+    removidas, mas só as que nenhum canal referencia (ex.: o canal de rollback).
+    """
+
+    STORE_VERSION = 1
+
+    def __init__(self, base_path, max_bytes=2 * 1024 * 1024 * 1024):
+        self.store_path = os.path.join(base_path, "store")
+        self.objects_path = os.path.join(self.store_path, "objects")
+        self.manifest_path = os.path.join(self.store_path, "store.json")
+        self.max_bytes = max_bytes
+        self._objects = {}   # sha256 -> {name, size, last_used}
+        self._channels = {}  # canal -> {tipo de painel -> {nome do APK: sha256}}
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.STORE_VERSION:
+                with self._lock:
+                    self._objects = data.get("objects", {})
+                    self._channels = data.get("channels", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        # Sob o lock e com arquivo temporário único: duas threads nunca escrevem o mesmo .tmp
+        with self._lock:
+            data = {"version": self.STORE_VERSION, "objects": self._objects, "channels": self._channels}
+            temp_path = None
+            try:
+                os.makedirs(self.store_path, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(prefix="store.", suffix=".tmp", dir=self.store_path)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=1)
+                os.replace(temp_path, self.manifest_path)
+            except OSError:
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def path_for(self, digest):
+        with self._lock:
+            obj = self._objects.get(digest)
+        if not obj:
+            return None
+        return os.path.join(self.objects_path, digest, obj["name"])
+
+    def add(self, apk_path, digest=None):
+        """Copia um APK para o repositório (se ainda não estiver lá) e retorna o sha256"""
+        digest = digest or sha256_file(apk_path)
+        target = self.path_for(digest)
+        if not target or not os.path.exists(target):
+            name = os.path.basename(apk_path)
+            target = os.path.join(self.objects_path, digest, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temp_path = target + ".tmp"
+            shutil.copyfile(apk_path, temp_path)
+            os.replace(temp_path, target)
+            with self._lock:
+                self._objects[digest] = {"name": name, "size": os.path.getsize(target), "last_used": time.time()}
+        return digest
+
+    def channels(self):
+        with self._lock:
+            return sorted(self._channels)
+
+    def set_channel(self, channel, panel_type, apk_hashes):
+        """Define os APKs (nome -> sha256) de um tipo de painel no canal"""
+        with self._lock:
+            self._channels.setdefault(channel, {})[panel_type] = dict(apk_hashes)
+        self.save()
+
+    def import_files(self, channel, panel_type, apk_paths, digests=None):
+        """Guarda os arquivos existentes no repositório e os publica no canal; retorna quantos entraram"""
+        digests = digests or {}
+        apk_hashes = {}
+        for apk_path in apk_paths:
+            if os.path.exists(apk_path):
+                apk_hashes[os.path.basename(apk_path)] = self.add(apk_path, digests.get(apk_path))
+        if apk_hashes:
+            self.set_channel(channel, panel_type, apk_hashes)
+            self.evict()
+        return len(apk_hashes)
+
+    def resolve(self, channel, panel_type):
+        """Caminhos dos APKs do canal para o tipo de painel, marcando-os como usados agora.
+
+        O `last_used` é gravado em seguida, para a ordem da limpeza (LRU) valer
+        também depois de reabrir o programa.
+        """
+        with self._lock:
+            apk_hashes = self._channels.get(channel, {}).get(panel_type, {})
+            paths = []
+            touched = False
+            for name, digest in apk_hashes.items():
+                obj = self._objects.get(digest)
+                if obj:
+                    obj["last_used"] = time.time()
+                    touched = True
+                    paths.append(os.path.join(self.objects_path, digest, obj["name"]))
+                else:
+                    # Versão removida do repositório: aparece como APK não encontrado
+                    paths.append(os.path.join(self.objects_path, digest, name))
+            if touched:
+                self.save()
+        return paths
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(obj["size"] for obj in self._objects.values())
+
+    def evict(self):
+        """Remove as versões usadas há mais tempo até o repositório caber em `max_bytes`.
+
+        Versões referenciadas por qualquer canal nunca são removidas; se só elas
+        restarem, o repositório fica acima do limite (ver `total_bytes`).
+        """
+        with self._lock:
+            protected = set()
+            for panels in self._channels.values():
+                for apk_hashes in panels.values():
+                    protected.update(apk_hashes.values())
+            total = sum(obj["size"] for obj in self._objects.values())
+            removed = []
+            for digest, obj in sorted(self._objects.items(), key=lambda item: item[1]["last_used"]):
+                if total <= self.max_bytes:
+                    break
+                if digest in protected:
+                    continue
+                shutil.rmtree(os.path.join(self.objects_path, digest), ignore_errors=True)
+                del self._objects[digest]
+                total -= obj["size"]
+                removed.append(digest)
+        if removed:
+            self.save()
+        return removed
+
+class ArtifactServer:
+    """Servidor HTTP de APKs na rede local.
+
+    Cada tipo de painel tem um `<url>/<Painel|Totem>/index.json` no formato
+    {"apks": [{"name", "url", "size", "sha256", "package", "version_code", "version_name", "min_sdk"}]}.
+    `url` pode ser relativa ao índice; `size` e `sha256` são obrigatórios porque
+    a instalação é feita em streaming, sem cópia local.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/") + "/"
+
+    def fetch_index(self, panel_type, timeout=10):
+        """Lista os APKs publicados para o tipo de painel: (sucesso, lista ou mensagem)"""
+        index_url = urljoin(self.base_url, f"{panel_type}/index.json")
+        try:
+            response = requests.get(index_url, timeout=timeout)
+            response.raise_for_status()
+            entries = response.json().get("apks", [])
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            return False, f"Erro ao ler {index_url}: {e}"
+
+        artifacts = []
+        for entry in entries:
+            try:
+                artifacts.append({
+                    "name": entry.get("name") or os.path.basename(urlparse(entry["url"]).path),
+                    "url": urljoin(index_url, entry["url"]),
+                    "size": int(entry["size"]),
+                    "sha256": entry["sha256"].lower(),
+                    "package": entry.get("package"),
+                    "version_code": entry.get("version_code"),
+                    "version_name": entry.get("version_name"),
+                    "min_sdk": entry.get("min_sdk"),
+                })
+            except (KeyError, TypeError, ValueError, AttributeError):
+                return False, f"Entrada inválida em {index_url}: {entry}"
+        return True, artifacts
+
+def parse_package_list(output):
+    """Conjunto de pacotes de uma saída de `pm list packages`"""
+    return {line.strip()[len("package:"):].split()[0] for line in output.splitlines()
+            if line.strip().startswith("package:") and len(line.strip()) > len("package:")}
+
+# Consultas de prontidão: boot completo + id do boot atual, e atividade em primeiro plano
+BOOT_STATE_COMMAND = 'echo "$(getprop sys.boot_completed)|$(getprop dev.bootcomplete)|$(cat /proc/sys/kernel/random/boot_id 2>/dev/null)"'
+FOREGROUND_COMMAND = "dumpsys activity activities | grep -E 'mResumedActivity|topResumedActivity'"
+
+def parse_boot_state(output):
+    """(boot completo, boot_id) a partir da saída de BOOT_STATE_COMMAND"""
+    fields = (output.strip().splitlines() or [""])[-1].split("|")
+    if len(fields) != 3:
+        return False, None
+    return "1" in (fields[0].strip(), fields[1].strip()), fields[2].strip() or None
+
+class RebootRequests:
+    """Pedidos de reboot por dispositivo durante um provisionamento.
+
+    As etapas (DPI, remoções, auto-start) só declaram que precisam de reboot;
+    `finalize_reboot` do gerenciador reinicia cada dispositivo uma única vez, ao
+    final, e espera o boot completar (e o app principal abrir, se pedido).
+    """
+
+    def __init__(self):
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def request(self, serial, reason, package=None):
+        with self._lock:
+            entry = self._requests.setdefault(serial, {"reasons": [], "package": None})
+            if reason not in entry["reasons"]:
+                entry["reasons"].append(reason)
+            if package:
+                entry["package"] = package
+
+    def pending(self, serial):
+        with self._lock:
+            return serial in self._requests
+
+    def pop(self, serial):
+        """Retira o pedido do dispositivo: (motivos, pacote) ou None"""
+        with self._lock:
+            entry = self._requests.pop(serial, None)
+        return (entry["reasons"], entry["package"]) if entry else None
+
+# Pasta do cache de APKs no dispositivo, endereçado pelo sha256 do arquivo
+DEVICE_APK_CACHE = "/data/local/tmp/minipcs"
+
+class TokenBucket:
+    """Limitador de taxa (bytes/s) com rajada de até `capacity` bytes; rate None = sem limite"""
+
+    def __init__(self, rate=None, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate or 0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        """Bloqueia até haver saldo para `amount` bytes"""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Blocos maiores que a rajada passam com saldo negativo
+                if self._tokens >= min(amount, self.capacity):
+                    self._tokens -= amount
+                    return
+                wait = (min(amount, self.capacity) - self._tokens) / self.rate
+            time.sleep(wait)
+
+class TransferScheduler:
+    """Agenda transferências de APK para dispositivos Wi-Fi.
+
+    Limita quantas transferências rodam ao mesmo tempo (no total e por /24, que
+    em geral corresponde a um access point) e a taxa agregada com token buckets
+    global e por sub-rede. Mede a taxa de cada transferência para mostrar quais
+    dispositivos estão com sinal fraco, e usa a medida para ajustar as vagas da
+    sub-rede: transferências simultâneas abaixo de `min_rate` indicam o access
+    point saturado e liberam uma vaga a menos; taxas boas devolvem a vaga.
+    """
+
+    DEFAULT_GLOBAL_RATE = 24 * 1024 * 1024
+
+    def __init__(self, global_rate=DEFAULT_GLOBAL_RATE, subnet_rate=8 * 1024 * 1024, max_concurrent=8,
+                 max_per_subnet=3, min_rate=1024 * 1024):
+        self.subnet_rate = subnet_rate
+        self.max_per_subnet = max_per_subnet
+        self.min_rate = min_rate
+        self._global_bucket = TokenBucket(global_rate)
+        self._global_slots = threading.BoundedSemaphore(max_concurrent)
+        self._subnets = {}  # /24 -> {"active", "limit", "bucket"}
+        self._rates = {}
+        self._lock = threading.Lock()
+        self._slot_released = threading.Condition(self._lock)
+
+    def set_global_rate(self, rate):
+        """Limite agregado de todas as transferências em bytes/s (None ou 0 = sem limite)"""
+        self._global_bucket = TokenBucket(rate or None)
+
+    @staticmethod
+    def subnet_of(serial):
+        """Sub-rede /24 de um serial ip:porta (None para USB)"""
+        try:
+            return str(ipaddress.IPv4Network(f"{serial.rsplit(':', 1)[0]}/24", strict=False))
+        except ValueError:
+            return None
+
+    def _subnet(self, serial):
+        subnet = self.subnet_of(serial)
+        if subnet is None:
+            return None
+        with self._lock:
+            if subnet not in self._subnets:
+                self._subnets[subnet] = {"active": 0, "limit": self.max_per_subnet,
+                                         "bucket": TokenBucket(self.subnet_rate)}
+            return self._subnets[subnet]
+
+    def subnet_limit(self, serial):
+        """Vagas atuais da sub-rede do serial (None para USB)"""
+        subnet = self._subnet(serial)
+        if subnet is None:
+            return None
+        with self._lock:
+            return subnet["limit"]
+
+    @contextlib.contextmanager
+    def slot(self, serial):
+        """Aguarda a vez da transferência (fila por sub-rede e global)"""
+        subnet = self._subnet(serial)
+        if subnet:
+            with self._slot_released:
+                self._slot_released.wait_for(lambda: subnet["active"] < subnet["limit"])
+                subnet["active"] += 1
+        try:
+            with self._global_slots:
+                yield
+        finally:
+            if subnet:
+                with self._slot_released:
+                    subnet["active"] -= 1
+                    self._slot_released.notify_all()
+
+    def throttle(self, serial, amount):
+        self._global_bucket.consume(amount)
+        subnet = self._subnet(serial)
+        if subnet:
+            subnet["bucket"].consume(amount)
+
+    def record(self, serial, size, elapsed):
+        """Guarda a taxa medida (chamado dentro de `slot`) e ajusta as vagas da sub-rede"""
+        rate = size / max(elapsed, 0.001)
+        subnet = self._subnet(serial)
+        with self._slot_released:
+            self._rates[serial] = rate / (1024 * 1024)
+            if subnet is None:
+                return
+            if rate < self.min_rate and subnet["active"] > 1:
+                # Lenta junto com outras: access point saturado (sozinha, é o sinal do dispositivo)
+                subnet["limit"] = max(1, subnet["limit"] - 1)
+            elif rate >= 2 * self.min_rate and subnet["limit"] < self.max_per_subnet:
+                subnet["limit"] += 1
+                self._slot_released.notify_all()
+
+    def take_rate(self, serial):
+        """MB/s da última transferência ainda não informada (None se nada foi transferido desde então)"""
+        with self._lock:
+            return self._rates.pop(serial, None)
+
+class StageScheduler:
+    """Pipeline de provisionamento em etapas, com vagas separadas por etapa.
+
+    Cada dispositivo passa por connect → snapshot → uninstall → install →
+    settings → reboot → verify e só ocupa a vaga da etapa em que está: enquanto
+    um espera o boot, os outros seguem instalando. Etapas de transferência têm
+    poucas vagas; etapas de espera (boot, app abrindo), muitas.
+    """
+
+    STAGES = ("connect", "snapshot", "uninstall", "install", "settings", "reboot", "verify")
+    # Dispositivos em andamento ao mesmo tempo (threads/tarefas do lote)
+    max_in_flight = 64
+
+    def __init__(self, transfer_slots=4, command_slots=16, wait_slots=64, limits=None):
+        self.limits = {"connect": command_slots, "snapshot": command_slots, "uninstall": command_slots,
+                       "install": transfer_slots, "settings": command_slots,
+                       "reboot": wait_slots, "verify": wait_slots}
+        self.limits.update(limits or {})
+        self._slots = {stage: threading.BoundedSemaphore(max(1, limit)) for stage, limit in self.limits.items()}
+        self._async_slots = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Aguarda uma vaga na etapa `name` e a ocupa durante o bloco"""
+        with self._slots[name]:
+            yield
+
+    @contextlib.asynccontextmanager
+    async def astage(self, name):
+        """Versão assíncrona de `stage`, para o event loop compartilhado"""
+        if name not in self._async_slots:
+            self._async_slots[name] = asyncio.Semaphore(max(1, self.limits[name]))
+        async with self._async_slots[name]:
+            yield
+
+    @staticmethod
+    def throughput(count, elapsed):
+        """Texto de vazão do lote: dispositivos em X min (N/h)"""
+        per_hour = count * 3600 / max(elapsed, 1)
+        return f"{count} dispositivo(s) em {elapsed / 60:.1f} min ({per_hour:.0f}/h)"
+
 class ADBManager:
     def __init__(self):
         self.adb_path = resource_path("adb.exe")
         self.port = "5555"
 
+        # Transporte direto pelo socket do servidor adb (sem processos)
+        self.use_socket_transport = True
+        self.socket_client = ADBSocketClient()
+        self._socket_retry_at = 0
+
+        # Sessões persistentes de shell (uma por dispositivo)
+        self.use_shell_session = True
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+        # Cache de retratos dos dispositivos (serial -> DeviceSnapshot)
+        self.snapshot_ttl = 60
+        self._snapshots = {}
+        self._snapshots_lock = threading.Lock()
+
+        # Registro de conexões (serial -> estado no servidor adb: device, offline, unauthorized...)
+        self.connection_ttl = 5
+        self._connections = {}
+        self._connections_checked_at = 0
+        self._connections_lock = threading.Lock()
+        self.probe_timeout = 0.3
+
+        # Transferências de APK para dispositivos Wi-Fi (fila e limite de banda)
+        self.transfer_scheduler = TransferScheduler()
+
+        # Cache de APKs no dispositivo (por sha256) e índice local usado para obter o hash
+        self.device_cache_limit = 512 * 1024 * 1024
+        self.apk_index = None
+
+        # Prazos de espera após um reboot (boot completo e app principal em primeiro plano)
+        self.boot_timeout = 180
+        self.foreground_timeout = 60
+        # Sinalizado ao fechar a janela: as esperas terminam na hora
+        self.cancelled = threading.Event()
+
+    def _socket_available(self):
+        """Indica se o servidor adb local está aceitando conexões"""
+        return self.use_socket_transport and time.monotonic() >= self._socket_retry_at
+
+    def _socket_failed(self):
+        # Servidor fora do ar: volta ao caminho por processo por alguns segundos
+        self._socket_retry_at = time.monotonic() + 10
+
+    def _get_session(self, serial):
+        """Retorna a sessão de shell do dispositivo, criando se necessário"""
+        with self._sessions_lock:
+            session = self._sessions.get(serial)
+            if session and session.is_alive():
+                return session
+            try:
+                session = ADBShellSession(self.adb_path, serial)
+            except OSError:
+                return None
+            self._sessions[serial] = session
+            return session
+
+    def list_devices(self):
+        """Lista os dispositivos conhecidos pelo servidor adb.
+
+        Retorna (True, [{"serial": ..., "state": ...}, ...]) ou (False, mensagem de erro).
+        Toda listagem bem-sucedida também atualiza o registro de conexões.
+        """
+        if self._socket_available():
+            try:
+                devices = self.socket_client.devices()
+                self.update_connections(devices)
+                return True, devices
+            except ADBProtocolError as e:
+                return False, str(e)
+            except OSError:
+                self._socket_failed()
+
+        try:
+            result = subprocess.run(
+                [self.adb_path, "devices", "-l"],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            )
+        except Exception as e:
+            return False, str(e)
+        if result.returncode != 0:
+            return False, result.stderr.strip()
+        devices = parse_devices_output(result.stdout)
+        self.update_connections(devices)
+        return True, devices
+
+    def close_session(self, serial):
+        """Fecha a sessão de shell de um dispositivo (ex.: antes de reiniciar)"""
+        with self._sessions_lock:
+            session = self._sessions.pop(serial, None)
+        if session:
+            session.close()
+
+    def close_all_sessions(self):
+        """Fecha todas as sessões de shell abertas"""
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def shell(self, serial, command, timeout=None, input=None):
+        """Executa um comando no shell do dispositivo.
+
+        Ordem de preferência: socket do servidor adb (shell v2), sessão
+        persistente e, por fim, um processo `adb shell` avulso. A sessão
+        persistente não repassa stdin, então é ignorada quando há `input`.
+        """
+        if self._socket_available():
+            try:
+                return self.socket_client.shell(serial, command, timeout=timeout, input=input)
+            except subprocess.TimeoutExpired:
+                raise
+            except ADBProtocolError as e:
+                message = str(e)
+                # Erro do transporte (dispositivo ausente/offline) tem a mesma resposta do cliente adb
+                if "device" in message.lower() and ("not found" in message or "offline" in message):
+                    return subprocess.CompletedProcess(command, 1, "", f"error: {message}")
+                # shell v2 não suportado pelo dispositivo: segue para os outros caminhos
+            except OSError:
+                self._socket_failed()
+
+        if self.use_shell_session and input is None:
+            session = self._get_session(serial)
+            if session:
+                try:
+                    return session.run(command, timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    # Estado da sessão é desconhecido após timeout
+                    self.close_session(serial)
+                    raise
+                except ADBSessionError:
+                    self.close_session(serial)
+
+        args = list(command) if isinstance(command, (list, tuple)) else [command]
+        return subprocess.run(
+            [self.adb_path, "-s", serial, "shell"] + args,
+            input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            creationflags=subprocess.CREATE_NO_WINDOW, timeout=timeout
+        )
+
+    def run_script(self, serial, script, timeout=None):
+        """Executa um script sh completo no dispositivo em uma única invocação"""
+        if self.use_shell_session and not self._socket_available():
+            return self.shell(serial, script, timeout=timeout)
+        # Script via stdin evita o limite de tamanho da linha de comando do adb;
+        # o `exit` final encerra o sh em dispositivos sem shell v2 (sem EOF no stdin)
+        return self.shell(serial, "sh", timeout=timeout, input=script + "exit\n")
+
+    def run_batch(self, serial, commands, timeout=60):
+        """Executa uma lista [(args, descrição), ...] como um único script no dispositivo.
+
+        Retorna [(descrição, CompletedProcess), ...], um registro por comando,
+        no mesmo formato usado pelos relatórios ✓/✗/⚠️.
+        """
+        marker = f"__MINIPCS_BATCH_{uuid.uuid4().hex[:12]}__"
+        script = build_batch_script(commands, marker)
+        try:
+            result = self.run_script(serial, script, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return [(description, subprocess.CompletedProcess(command, -1, "", "Timeout"))
+                    for command, description in commands]
+
+        records = parse_batch_output(commands, marker, result.stdout, result.stderr)
+        if result.returncode != 0 and all(r.returncode == -1 for _, r in records):
+            # Falha antes de executar o script (ex.: dispositivo desconectado)
+            error = (result.stderr.strip() or result.stdout.strip() or "Erro desconhecido")[:500]
+            records = [(description, subprocess.CompletedProcess(r.args, -1, "", error))
+                       for description, r in records]
+        return records
+
     def connect(self, ip_address):
         try:
             result = subprocess.run(
@@ -41,38 +1658,110 @@ class ADBManager:
         except subprocess.CalledProcessError:
             return False
 
-    def get_device_info(self, ip_address):
+    def update_connections(self, devices):
+        """Substitui o registro de conexões pela lista vinda de `adb devices`/track-devices"""
+        with self._connections_lock:
+            self._connections = {device["serial"]: device["state"] for device in devices}
+            self._connections_checked_at = time.monotonic()
+
+    def refresh_connections(self, max_age=None):
+        """Atualiza o registro pelo servidor adb se ele for mais antigo que `max_age` segundos"""
+        max_age = self.connection_ttl if max_age is None else max_age
+        with self._connections_lock:
+            fresh = time.monotonic() - self._connections_checked_at < max_age
+        if fresh:
+            return True
+        success, _ = self.list_devices()
+        return success
+
+    def connection_state(self, serial):
+        """Estado registrado do transporte (None se o servidor adb não o conhece)"""
+        with self._connections_lock:
+            return self._connections.get(serial)
+
+    def mark_disconnected(self, serial):
+        """Esquece o transporte (ex.: o dispositivo vai reiniciar e a conexão cai)"""
+        with self._connections_lock:
+            self._connections.pop(serial, None)
+
+    def is_reachable(self, ip_address, timeout=None):
+        """Abre uma conexão TCP crua na porta adb para descartar IPs mortos rapidamente"""
         try:
-            model = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "shell", "getprop", "ro.product.model"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-            ).stdout.strip()
+            with socket.create_connection((ip_address, int(self.port)), timeout or self.probe_timeout):
+                return True
+        except OSError:
+            return False
 
-            android_version = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "shell", "getprop", "ro.build.version.release"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-            ).stdout.strip()
+    def ensure_connected(self, ip_address):
+        """Garante o transporte ip:porta online, só executando `adb connect` se ele não estiver.
 
-            current_dpi = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "shell", "wm", "density"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True
-            ).stdout.strip()
+        Retorna CONNECTION_OK, CONNECTION_UNREACHABLE ou CONNECTION_FAILED.
+        """
+        serial = self.serial_for(ip_address)
+        self.refresh_connections()
+        if self.connection_state(serial) == "device":
+            return CONNECTION_OK
+
+        # Sem resposta na porta: não vale esperar o timeout do próprio `adb connect`
+        if not self.is_reachable(ip_address):
+            self.mark_disconnected(serial)
+            return CONNECTION_UNREACHABLE
+
+        if not self.connect(ip_address):
+            self.mark_disconnected(serial)
+            return CONNECTION_FAILED
+
+        # `adb connect` pode terminar com código 0 sem conectar; confirmar no servidor
+        self.refresh_connections(max_age=0)
+        return CONNECTION_OK if self.connection_state(serial) == "device" else CONNECTION_FAILED
+
+    def serial_for(self, ip_address):
+        """Serial adb de um dispositivo Wi-Fi (ip:porta)"""
+        return f"{ip_address}:{self.port}"
+
+    def cached_snapshot(self, serial):
+        """Retrato em cache ainda dentro do TTL, ou None"""
+        with self._snapshots_lock:
+            snapshot = self._snapshots.get(serial)
+        if snapshot and snapshot.age() < self.snapshot_ttl:
+            return snapshot
+        return None
+
+    def store_snapshot(self, serial, snapshot):
+        """Atualiza o cache de retratos (None remove a entrada)"""
+        with self._snapshots_lock:
+            if snapshot:
+                self._snapshots[serial] = snapshot
+            else:
+                self._snapshots.pop(serial, None)
 
-            return {
-                "model": model,
-                "android_version": android_version,
-                "current_dpi": current_dpi
-            }
-        except:
-            return None
+    def get_device_snapshot(self, serial, refresh=False):
+        """Retorna o retrato do dispositivo, usando o cache enquanto estiver dentro do TTL"""
+        if not refresh:
+            snapshot = self.cached_snapshot(serial)
+            if snapshot:
+                return snapshot
+
+        try:
+            records = self.run_batch(serial, DeviceSnapshot.SNAPSHOT_COMMANDS, timeout=15)
+            snapshot = DeviceSnapshot.from_batch(serial, records)
+        except Exception:
+            snapshot = None
+
+        self.store_snapshot(serial, snapshot)
+        return snapshot
+
+    def invalidate_snapshot(self, serial):
+        """Descarta o retrato em cache (após reboot, mudança de DPI etc.)"""
+        self.store_snapshot(serial, None)
+
+    def get_device_info(self, ip_address):
+        snapshot = self.get_device_snapshot(f"{ip_address}:{self.port}")
+        return snapshot.as_dict() if snapshot else None
 
     def uninstall_app(self, ip_address, app_package):
         try:
-            result = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "uninstall", app_package],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = self.shell(f"{ip_address}:{self.port}", ["pm", "uninstall", app_package])
             return result.returncode == 0, result.stdout.strip() + result.stderr.strip()
         except subprocess.CalledProcessError as e:
             return False, e.stderr.strip()
@@ -82,19 +1771,300 @@ class ADBManager:
     def uninstall_app_usb(self, device_id, app_package):
         """Desinstala um app via USB usando device_id"""
         try:
-            result = subprocess.run(
-                [self.adb_path, "-s", device_id, "uninstall", app_package],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = self.shell(device_id, ["pm", "uninstall", app_package])
             return result.returncode == 0, result.stdout.strip() + result.stderr.strip()
         except subprocess.CalledProcessError as e:
             return False, e.stderr.strip()
         except Exception as e:
             return False, str(e)
 
+    def read_device_state(self, serial, desired):
+        """Estado atual do dispositivo para um DesiredState, em um único lote de consultas"""
+        try:
+            state = desired.read(self.run_batch(serial, desired.query_commands(), timeout=60))
+        except Exception:
+            state = desired.read([])
+        packages = [apk["package"] for apk in desired.apks if apk.get("package")]
+        if state["versions"] is None and packages:
+            # Android antigo sem --show-versioncode: consulta por dumpsys
+            state["versions"] = self.get_installed_versions(serial, packages) or None
+        return state
+
+    def get_installed_versions(self, serial, packages):
+        """versionCode instalado de cada pacote pedido ({pacote: versionCode}; ausentes ficam de fora).
+
+        Uma única consulta `pm list packages --show-versioncode`; em Android antigo,
+        sem essa opção, um lote de `dumpsys package` para os pacotes pedidos.
+        """
+        packages = list(dict.fromkeys(packages))
+        if not packages:
+            return {}
+        try:
+            result = self.shell(serial, ["pm", "list", "packages", "--show-versioncode"], timeout=30)
+            versions = parse_package_versions(result.stdout) if result.returncode == 0 else {}
+            if versions:
+                return {package: versions[package] for package in packages if package in versions}
+
+            records = self.run_batch(serial, [(["dumpsys", "package", package], package) for package in packages],
+                                     timeout=15 * len(packages))
+            versions = {}
+            for package, record in records:
+                match = re.search(r"versionCode=(\d+)", record.stdout)
+                if record.returncode == 0 and match and f"Package [{package}]" in record.stdout:
+                    versions[package] = int(match.group(1))
+            return versions
+        except Exception:
+            return {}  # Sem informação de versão: tudo é instalado normalmente
+
+    def install_apks(self, apk_paths, device_id, sdk_int=None):
+        """Instala um conjunto de APKs; retorna [(apk_path, sucesso, mensagem, MB/s)] na mesma ordem.
+
+        No Android 10+ (API 29) todos vão em uma única sessão `install-multi-package`
+        (transferência e commit únicos, tudo ou nada). Em builds antigos, ou se a
+        sessão falhar, cada APK é instalado separadamente para o resultado por APK.
+        A taxa só é informada quando o APK foi de fato transferido pelo agendador
+        (None no cache do dispositivo e na sessão única).
+        """
+        # Dispositivos Wi-Fi passam pelo agendador de banda, APK por APK
+        if len(apk_paths) > 1 and sdk_int and sdk_int >= 29 and not TransferScheduler.subnet_of(device_id):
+            try:
+                result = subprocess.run(
+                    [self.adb_path, "-s", device_id, "install-multi-package", "-r"] + list(apk_paths),
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                    creationflags=subprocess.CREATE_NO_WINDOW
+                )
+                message = result.stdout.strip() + result.stderr.strip()
+                if result.returncode == 0 and "Failure" not in message:
+                    return [(apk_path, True, message, None) for apk_path in apk_paths]
+            except Exception:
+                pass
+
+        results = []
+        for apk_path in apk_paths:
+            success, message = self.install_apk(apk_path, device_id)
+            results.append((apk_path, success, message, self.transfer_scheduler.take_rate(device_id)))
+        return results
+
+    def stream_to_device(self, apk_path, serial, command, chunk_size=256 * 1024, timeout=600):
+        """Envia o arquivo para o stdin de `exec-in <command>` pelo agendador de transferências.
+
+        Os blocos são limitados pelos token buckets e a taxa medida fica em
+        `transfer_scheduler.take_rate(serial)`. Retorna (código de saída, saída).
+        """
+        scheduler = self.transfer_scheduler
+        size = os.path.getsize(apk_path)
+        with scheduler.slot(serial):
+            started = time.monotonic()
+            process = subprocess.Popen(
+                [self.adb_path, "-s", serial, "exec-in", command],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            )
+            try:
+                with open(apk_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(chunk_size), b""):
+                        scheduler.throttle(serial, len(chunk))
+                        process.stdin.write(chunk)
+            except OSError:
+                pass  # O comando encerrou antes; o erro aparece na saída
+            try:
+                # communicate fecha o stdin (fim do arquivo) e lê o resultado
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                return -1, "Timeout na transferência"
+
+            if process.returncode == 0:
+                scheduler.record(serial, size, time.monotonic() - started)
+            return process.returncode, (stdout + stderr).decode("utf-8", errors="replace").strip()
+
+    def install_apk_streamed(self, apk_path, serial):
+        """Instala um APK em um dispositivo Wi-Fi transmitindo-o direto para `pm install -S`"""
+        size = os.path.getsize(apk_path)
+        returncode, message = self.stream_to_device(apk_path, serial, f"pm install -r -S {size}")
+        if returncode == 0 and "Success" in message:
+            return True, message
+        if "Failure" in message:
+            return False, message
+        # exec-in indisponível (adb/Android antigo): instalação normal
+        return self._install_apk_direct(apk_path, serial)
+
+    def install_apk_from_url(self, artifact, serial, chunk_size=256 * 1024, timeout=600):
+        """Instala um APK do servidor de artefatos sem gravá-lo em disco.
+
+        O download vai bloco a bloco para o stdin de `pm install -S <size>`. O
+        último bloco só é enviado depois que o tamanho e o sha256 conferem; se não
+        conferirem o processo é encerrado e o pm descarta a sessão incompleta.
+        """
+        name = artifact["name"]
+        size = artifact["size"]
+        try:
+            response = requests.get(artifact["url"], stream=True, timeout=(5, 60))
+            response.raise_for_status()
+        except requests.RequestException as e:
+            return False, f"Erro ao baixar {name}: {e}"
+
+        scheduler = self.transfer_scheduler
+        with response, scheduler.slot(serial):
+            started = time.monotonic()
+            process = subprocess.Popen(
+                [self.adb_path, "-s", serial, "exec-in", f"pm install -r -S {size}"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            )
+            digest = hashlib.sha256()
+            received = 0
+            held = b""
+            error = None
+            try:
+                for chunk in response.iter_content(chunk_size):
+                    digest.update(chunk)
+                    received += len(chunk)
+                    if received > size:
+                        break
+                    if held:
+                        scheduler.throttle(serial, len(held))
+                        process.stdin.write(held)
+                    held = chunk
+            except requests.RequestException as e:
+                error = f"Download de {name} interrompido: {e}"
+            except OSError:
+                # O pm encerrou antes de receber o APK inteiro; a saída dele explica o motivo
+                stdout, stderr = process.communicate()
+                message = (stdout + stderr).decode("utf-8", errors="replace").strip()
+                return False, message or f"Instalação de {name} interrompida pelo dispositivo"
+
+            if error is None and received != size:
+                error = f"Tamanho de {name} não confere ({received} de {size} bytes)"
+            elif error is None and digest.hexdigest() != artifact["sha256"]:
+                error = f"sha256 de {name} não confere com o índice do servidor"
+            if error:
+                process.kill()
+                process.communicate()
+                return False, error
+
+            try:
+                scheduler.throttle(serial, len(held))
+                process.stdin.write(held)
+            except OSError:
+                pass
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                return False, "Timeout na instalação"
+
+        message = (stdout + stderr).decode("utf-8", errors="replace").strip()
+        success = process.returncode == 0 and "Success" in message
+        if success:
+            scheduler.record(serial, size, time.monotonic() - started)
+        return success, message
+
+    def apk_sha256(self, apk_path):
+        """sha256 do APK, pelo índice de APKs quando disponível"""
+        if self.apk_index:
+            entry = self.apk_index.get(apk_path)
+            if entry:
+                return entry["sha256"]
+        return sha256_file(apk_path)
+
+    def _push_to_cache(self, apk_path, serial, remote):
+        """Envia o APK para o cache do dispositivo; o nome final só aparece com o arquivo completo"""
+        partial = remote + ".partial"
+        if TransferScheduler.subnet_of(serial):
+            returncode, _ = self.stream_to_device(apk_path, serial, f"cat > {partial}")
+        else:
+            result = subprocess.run(
+                [self.adb_path, "-s", serial, "push", apk_path, partial],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            )
+            returncode = result.returncode
+        if returncode == 0:
+            returncode = self.shell(serial, ["mv", partial, remote], timeout=30).returncode
+        if returncode != 0:
+            self.shell(serial, ["rm", "-f", partial], timeout=30)
+        return returncode == 0
+
+    def install_apk_cached(self, apk_path, serial):
+        """Instala a partir do cache do dispositivo (DEVICE_APK_CACHE/<sha256>.apk).
+
+        Se o arquivo já estiver lá com o mesmo hash, nada é transferido; senão ele
+        é enviado uma vez e reaproveitado em novas tentativas e reconfigurações.
+        Retorna None se o cache não puder ser usado (o chamador instala direto).
+        """
+        digest = self.apk_sha256(apk_path)
+        remote = f"{DEVICE_APK_CACHE}/{digest}.apk"
+        check = self.shell(
+            serial,
+            f"mkdir -p {DEVICE_APK_CACHE} && if [ -f {remote} ]; then sha256sum {remote} 2>/dev/null || echo sem-hash; fi",
+            timeout=120
+        )
+        if check.returncode != 0:
+            return None
+
+        cached = check.stdout.split()[:1] == [digest]
+        if cached:
+            self.shell(serial, ["touch", remote], timeout=30)  # Mais recente para a limpeza
+        elif not self._push_to_cache(apk_path, serial, remote):
+            return None
+
+        result = self.shell(serial, ["pm", "install", "-r", remote], timeout=300)
+        message = (result.stdout + result.stderr).strip()
+        if not cached:
+            self.evict_device_cache(serial, keep=remote)
+        if cached and result.returncode == 0:
+            message = f"{message} (do cache do dispositivo)"
+        return result.returncode == 0 and "Success" in message, message
+
+    def evict_device_cache(self, serial, keep=None, max_bytes=None):
+        """Remove os APKs mais antigos do cache do dispositivo até caber em `max_bytes`"""
+        max_bytes = max_bytes or self.device_cache_limit
+        try:
+            listing = self.shell(
+                serial,
+                f"for f in {DEVICE_APK_CACHE}/*.apk; do [ -f \"$f\" ] && stat -c '%Y %s %n' \"$f\"; done",
+                timeout=30
+            )
+            files = []
+            for line in listing.stdout.splitlines():
+                parts = line.split(" ", 2)
+                if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit():
+                    files.append((int(parts[0]), int(parts[1]), parts[2]))
+
+            total = sum(size for _, size, _ in files)
+            remove = []
+            for _, size, path in sorted(files):
+                if total <= max_bytes:
+                    break
+                if path != keep:
+                    remove.append(path)
+                    total -= size
+            if remove:
+                self.shell(serial, ["rm", "-f"] + remove, timeout=30)
+        except Exception:
+            pass  # A limpeza nunca deve quebrar uma instalação
+
     def install_apk(self, apk_path, device_id=None):
-        """Instala um APK no dispositivo"""
+        """Instala um APK no dispositivo, pelo cache do dispositivo quando possível"""
+        if device_id:
+            try:
+                result = self.install_apk_cached(apk_path, device_id)
+                if result is not None:
+                    return result
+            except Exception:
+                pass
+            if TransferScheduler.subnet_of(device_id):
+                # Wi-Fi passa pelo agendador de transferências
+                try:
+                    return self.install_apk_streamed(apk_path, device_id)
+                except Exception as e:
+                    return False, str(e)
+        return self._install_apk_direct(apk_path, device_id)
+
+    def _install_apk_direct(self, apk_path, device_id=None):
         try:
             cmd = [self.adb_path]
             if device_id:
@@ -114,11 +2084,8 @@ class ADBManager:
 
     def change_dpi(self, ip_address, dpi):
         try:
-            result = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "shell", "wm", "density", str(dpi)],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = self.shell(f"{ip_address}:{self.port}", ["wm", "density", str(dpi)])
+            self.invalidate_snapshot(f"{ip_address}:{self.port}")
             return result.returncode == 0, result.stdout.strip() + result.stderr.strip()
         except subprocess.CalledProcessError as e:
             return False, e.stderr.strip()
@@ -126,11 +2093,18 @@ class ADBManager:
             return False, str(e)
 
     def reboot_device(self, ip_address):
+        return self.reboot(f"{ip_address}:{self.port}")
+
+    def reboot(self, serial):
         try:
+            # A sessão de shell e a conexão caem junto com o dispositivo
+            self.close_session(serial)
+            self.invalidate_snapshot(serial)
+            self.mark_disconnected(serial)
             result = subprocess.run(
-                [self.adb_path, "-s", f"{ip_address}:{self.port}", "shell", "reboot"],
+                [self.adb_path, "-s", serial, "reboot"],
                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
+                creationflags=subprocess.CREATE_NO_WINDOW, timeout=10
             )
             return result.returncode == 0, result.stdout.strip() + result.stderr.strip()
         except subprocess.CalledProcessError as e:
@@ -138,82 +2112,151 @@ class ADBManager:
         except Exception as e:
             return False, str(e)
 
+    def finalize_reboot(self, serial, reboots, stages=None):
+        """Executa o reboot pedido pelas etapas (no máximo um) e espera o boot.
+
+        Com `stages` (StageScheduler) o reboot e a espera ocupam as vagas das
+        etapas "reboot" e "verify". Retorna (reiniciou, pronto, mensagem); sem
+        pedido pendente não reinicia.
+        """
+        entry = reboots.pop(serial)
+        if not entry:
+            return False, True, "Nenhuma etapa pediu reboot"
+        reasons, package = entry
+        stages = stages or StageScheduler()
+        with stages.stage("reboot"):
+            previous_boot_id = self.boot_id(serial)
+            success, message = self.reboot(serial)
+        if not success:
+            return False, False, f"Falha ao reiniciar ({', '.join(reasons)}): {message} - reinicie manualmente"
+        with stages.stage("verify"):
+            ready, ready_message = self.wait_until_ready(serial, previous_boot_id, package)
+        return True, ready, f"{ready_message} (reboot único: {', '.join(reasons)})"
+
+    def boot_id(self, serial):
+        """Identificador do boot atual (muda a cada reinício); None se não for possível ler"""
+        try:
+            result = self.shell(serial, BOOT_STATE_COMMAND, timeout=10)
+        except Exception:
+            return None
+        return parse_boot_state(result.stdout)[1] if result.returncode == 0 else None
+
+    def wait_until_ready(self, serial, previous_boot_id=None, package=None, timeout=None):
+        """Espera o dispositivo voltar de um reboot, com prazo.
+
+        USB usa `wait-for-device`; Wi-Fi reconecta. Depois consulta
+        sys.boot_completed/dev.bootcomplete com espera crescente até o boot
+        completar com um boot_id diferente de `previous_boot_id` (o dispositivo pode
+        ainda responder pelo boot antigo logo após o comando de reboot). Sem
+        `previous_boot_id`, primeiro espera ver o dispositivo cair (offline ou
+        boot incompleto) e só então o boot completo. Com `package`, confere
+        também se o app entrou em primeiro plano sozinho. Retorna (pronto, mensagem).
+        """
+        timeout = timeout or self.boot_timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        ip_address = serial.rsplit(":", 1)[0] if TransferScheduler.subnet_of(serial) else None
+        went_down = previous_boot_id is not None
+        delay = 0.5
+        while True:
+            remaining = deadline - time.monotonic()
+            if self.cancelled.is_set():
+                return False, "Espera cancelada"
+            if remaining <= 0:
+                return False, f"Dispositivo não completou o boot em {timeout} s"
+            try:
+                if ip_address:
+                    connected = self.ensure_connected(ip_address) == CONNECTION_OK
+                elif went_down:
+                    # Em partes de até 10 s, para um cancelamento não ficar preso no wait-for-device
+                    connected = subprocess.run(
+                        [self.adb_path, "-s", serial, "wait-for-device"],
+                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=max(1, min(10, remaining)),
+                        creationflags=subprocess.CREATE_NO_WINDOW
+                    ).returncode == 0
+                else:
+                    # Ainda sem ver a queda: consultar o estado sem bloquear
+                    connected = subprocess.run(
+                        [self.adb_path, "-s", serial, "get-state"],
+                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                        timeout=max(1, min(10, remaining)), creationflags=subprocess.CREATE_NO_WINDOW
+                    ).stdout.strip() == "device"
+                if connected:
+                    result = self.shell(serial, BOOT_STATE_COMMAND, timeout=max(1, min(10, remaining)))
+                    booted, boot_id = parse_boot_state(result.stdout)
+                    if result.returncode != 0 or not booted:
+                        went_down = True
+                    elif went_down and (previous_boot_id is None or boot_id != previous_boot_id):
+                        break
+                else:
+                    went_down = True
+            except subprocess.TimeoutExpired:
+                pass
+            except Exception:
+                self.close_session(serial)
+                went_down = True
+            self.cancelled.wait(max(0, min(delay, deadline - time.monotonic())))
+            delay = min(delay * 2, 5)
+
+        boot_seconds = time.monotonic() - started
+        self.invalidate_snapshot(serial)
+        if not package:
+            return True, f"Pronto em {boot_seconds:.0f} s"
+        if self.wait_for_foreground(serial, package):
+            return True, f"Boot em {boot_seconds:.0f} s; {package} em primeiro plano após {time.monotonic() - started:.0f} s"
+        return False, f"Boot em {boot_seconds:.0f} s, mas {package} não abriu sozinho em {self.foreground_timeout} s"
+
+    def wait_for_foreground(self, serial, package, timeout=None):
+        """Espera (com prazo) até uma atividade de `package` estar em primeiro plano"""
+        deadline = time.monotonic() + (timeout or self.foreground_timeout)
+        delay = 0.5
+        while True:
+            try:
+                result = self.shell(serial, FOREGROUND_COMMAND, timeout=10)
+                if f"{package}/" in result.stdout:
+                    return True
+            except Exception:
+                pass
+            if time.monotonic() + delay > deadline or self.cancelled.wait(delay):
+                return False
+            delay = min(delay * 2, 5)
+
     def configure_tts_portuguese_brazil(self, device_id):
         """Configura síntese de voz para português brasileiro com voz 5"""
         try:
-            commands_results = []
-            
-            # 1. Habilitar síntese de voz do Google
-            result1 = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "settings", "put", "secure", 
-                 "tts_default_synth", "com.google.android.tts"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            commands_results.append(("Definir Google TTS como padrão", result1))
-            
-            # 2. Definir idioma para português brasileiro
-            result2 = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "settings", "put", "secure", 
-                 "tts_default_locale", "pt-BR"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            commands_results.append(("Definir idioma pt-BR", result2))
-            
-            # 3. Configurar velocidade da fala (100 = normal)
-            result3 = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "settings", "put", "secure", 
-                 "tts_default_rate", "100"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            commands_results.append(("Configurar velocidade", result3))
-            
-            # 4. Configurar pitch da voz (100 = normal)
-            result4 = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "settings", "put", "secure", 
-                 "tts_default_pitch", "100"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            commands_results.append(("Configurar pitch", result4))
-            
-            # 5. Tentar configurar voz específica 5 - método 1
-            result5 = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "settings", "put", "secure", 
-                 "tts_default_variant", "5"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            commands_results.append(("Configurar variante de voz 5", result5))
-            
-            # 6. Configurar preferências específicas do Google TTS para voz 5
-            result6 = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "settings", "put", "secure", 
-                 "google_tts_voice_variant_pt_BR", "5"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            commands_results.append(("Configurar voz Google TTS pt-BR", result6))
-            
-            # 7. Tentar definir configuração de voz através de shared preferences (método alternativo)
-            result7 = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "am", "broadcast", "-a", 
-                 "android.speech.tts.engine.TTS_DATA_INSTALLED", "--es", "language", "pt-BR"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            commands_results.append(("Broadcast dados TTS instalados", result7))
+            tts_commands = [
+                # 1. Habilitar síntese de voz do Google
+                (["settings", "put", "secure", "tts_default_synth", "com.google.android.tts"],
+                 "Definir Google TTS como padrão"),
+                
+                # 2. Definir idioma para português brasileiro
+                (["settings", "put", "secure", "tts_default_locale", "pt-BR"], "Definir idioma pt-BR"),
+                
+                # 3. Configurar velocidade da fala (100 = normal)
+                (["settings", "put", "secure", "tts_default_rate", "100"], "Configurar velocidade"),
+                
+                # 4. Configurar pitch da voz (100 = normal)
+                (["settings", "put", "secure", "tts_default_pitch", "100"], "Configurar pitch"),
+                
+                # 5. Tentar configurar voz específica 5 - método 1
+                (["settings", "put", "secure", "tts_default_variant", "5"], "Configurar variante de voz 5"),
+                
+                # 6. Configurar preferências específicas do Google TTS para voz 5
+                (["settings", "put", "secure", "google_tts_voice_variant_pt_BR", "5"],
+                 "Configurar voz Google TTS pt-BR"),
+                
+                # 7. Tentar definir configuração de voz através de shared preferences (método alternativo)
+                (["am", "broadcast", "-a", "android.speech.tts.engine.TTS_DATA_INSTALLED",
+                  "--es", "language", "pt-BR"], "Broadcast dados TTS instalados"),
+                
+                # 8. Configurar engine específico do Google TTS
+                (["settings", "put", "secure", "tts_enabled_plugins",
+                  "com.google.android.tts/com.google.android.tts.service.GoogleTTSService"],
+                 "Habilitar plugin Google TTS")
+            ]
             
-            # 8. Configurar engine específico do Google TTS
-            result8 = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "settings", "put", "secure", 
-                 "tts_enabled_plugins", "com.google.android.tts/com.google.android.tts.service.GoogleTTSService"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            commands_results.append(("Habilitar plugin Google TTS", result8))
+            # Todos os comandos em uma única ida ao dispositivo
+            commands_results = self.run_batch(device_id, tts_commands)
             
             # Contar sucessos e falhas
             successful_commands = sum(1 for _, result in commands_results if result.returncode == 0)
@@ -256,12 +2299,8 @@ class ADBManager:
         """Instala dados de voz para português brasileiro"""
         try:
             # Tentar instalar dados de voz via comando de sistema
-            result = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "am", "start", "-a", 
-                 "android.speech.tts.engine.INSTALL_TTS_DATA", "-e", "language", "pt-BR"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = self.shell(device_id, ["am", "start", "-a", "android.speech.tts.engine.INSTALL_TTS_DATA",
+                                            "-e", "language", "pt-BR"])
             
             if result.returncode == 0:
                 return True, "Comando de instalação de dados de voz enviado"
@@ -279,38 +2318,35 @@ class ADBManager:
             # Tentar diferentes métodos para configurar voz 5
             methods = [
                 # Método 1: Configuração via settings específicos do Google TTS
-                ([self.adb_path, "-s", device_id, "shell", "settings", "put", "secure", 
+                (["settings", "put", "secure", 
                   "com.google.android.tts.voice.pt_BR", "5"], "Google TTS voz pt-BR específica"),
                 
                 # Método 2: Configuração via sistema de preferências
-                ([self.adb_path, "-s", device_id, "shell", "setprop", 
+                (["setprop", 
                   "persist.vendor.tts.voice.variant", "5"], "Propriedade sistema voz"),
                 
                 # Método 3: Broadcast para configurar voz
-                ([self.adb_path, "-s", device_id, "shell", "am", "broadcast", "-a", 
+                (["am", "broadcast", "-a", 
                   "com.google.android.tts.SET_VOICE", "--es", "voice", "pt-BR-voice-5"], "Broadcast configurar voz"),
                 
                 # Método 4: Intent direto para configurações TTS
-                ([self.adb_path, "-s", device_id, "shell", "am", "start", "-a", 
+                (["am", "start", "-a", 
                   "android.intent.action.MAIN", "-n", "com.google.android.tts/.settings.TtsSettingsActivity"], "Abrir configurações TTS"),
                 
                 # Método 5: Configuração via content provider
-                ([self.adb_path, "-s", device_id, "shell", "content", "insert", "--uri", 
+                (["content", "insert", "--uri", 
                   "content://com.google.android.tts.settings", "--bind", "voice:s:5"], "Content provider TTS")
             ]
             
             results = []
-            for command, description in methods:
-                try:
-                    result = subprocess.run(
-                        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-                        text=True, creationflags=subprocess.CREATE_NO_WINDOW
-                    )
-                    results.append((description, result.returncode == 0, result.stderr.strip()))
-                    advanced_commands.append(f"{'✓' if result.returncode == 0 else '✗'} {description}")
-                except Exception as e:
-                    results.append((description, False, str(e)))
-                    advanced_commands.append(f"✗ {description}: {str(e)}")
+            for description, result in self.run_batch(device_id, methods):
+                results.append((description, result.returncode == 0, result.stderr.strip()))
+                if result.returncode == 0:
+                    advanced_commands.append(f"✓ {description}")
+                elif result.returncode == -1:
+                    advanced_commands.append(f"✗ {description}: {result.stderr.strip()}")
+                else:
+                    advanced_commands.append(f"✗ {description}")
             
             successful_methods = sum(1 for _, success, _ in results if success)
             total_methods = len(results)
@@ -323,43 +2359,22 @@ class ADBManager:
     def configure_tts_portuguese_brazil_simple(self, device_id):
         """Versão simplificada da configuração TTS para evitar erros de conexão"""
         try:
-            # Verificar se o dispositivo ainda está conectado
-            check_result = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "echo", "test"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            if check_result.returncode != 0:
-                return False, f"Dispositivo não encontrado: {device_id}"
-            
-            successful_commands = 0
-            total_commands = 0
-            
             # Comandos essenciais apenas
             essential_commands = [
-                ("Definir Google TTS", ["settings", "put", "secure", "tts_default_synth", "com.google.android.tts"]),
-                ("Definir idioma pt-BR", ["settings", "put", "secure", "tts_default_locale", "pt-BR"]),
-                ("Configurar velocidade", ["settings", "put", "secure", "tts_default_rate", "100"]),
-                ("Configurar voz 5", ["settings", "put", "secure", "tts_default_variant", "5"])
+                (["settings", "put", "secure", "tts_default_synth", "com.google.android.tts"], "Definir Google TTS"),
+                (["settings", "put", "secure", "tts_default_locale", "pt-BR"], "Definir idioma pt-BR"),
+                (["settings", "put", "secure", "tts_default_rate", "100"], "Configurar velocidade"),
+                (["settings", "put", "secure", "tts_default_variant", "5"], "Configurar voz 5")
             ]
             
-            for description, cmd_args in essential_commands:
-                total_commands += 1
-                try:
-                    result = subprocess.run(
-                        [self.adb_path, "-s", device_id, "shell"] + cmd_args,
-                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                        creationflags=subprocess.CREATE_NO_WINDOW, timeout=10
-                    )
-                    
-                    if result.returncode == 0:
-                        successful_commands += 1
-                    
-                except subprocess.TimeoutExpired:
-                    continue
-                except Exception:
-                    continue
+            results = self.run_batch(device_id, essential_commands, timeout=10 * len(essential_commands))
+            
+            # Nenhum comando executado: dispositivo não respondeu
+            if all(result.returncode == -1 for _, result in results):
+                return False, f"Dispositivo não encontrado: {device_id}"
+            
+            successful_commands = sum(1 for _, result in results if result.returncode == 0)
+            total_commands = len(results)
             
             if successful_commands >= 2:  # Pelo menos TTS e idioma
                 return True, f"TTS configurado ({successful_commands}/{total_commands} comandos)"
@@ -373,11 +2388,7 @@ class ADBManager:
         """Detecta automaticamente o pacote principal instalado baseado no tipo de painel"""
         try:
             # Listar todos os pacotes instalados
-            result = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "pm", "list", "packages"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW, timeout=10
-            )
+            result = self.shell(device_id, ["pm", "list", "packages"], timeout=10)
             
             if result.returncode != 0:
                 return None
@@ -407,179 +2418,99 @@ class ADBManager:
         except Exception:
             return None
 
-    def configure_app_autostart(self, device_id, panel_type):
-        """Configura aplicativo para iniciar automaticamente no boot usando os comandos que funcionaram"""
+    def configure_app_autostart(self, device_id, panel_type, commands=None, restart=True, reboots=None,
+                                stages=None):
+        """Configura aplicativo para iniciar automaticamente no boot usando os comandos que funcionaram.
+
+        `commands` limita o lote aos itens pendentes (StatePlan.autostart); com
+        `restart` False o app não é reiniciado nem o dispositivo reinicia. Com
+        `reboots` (RebootRequests) o reboot de teste só é pedido, para o finalizador.
+        Com `stages` (StageScheduler) os comandos ocupam a etapa "settings" e a
+        espera pelo app em primeiro plano, a etapa "verify".
+        """
+        stages = stages or StageScheduler()
         try:
             # Definir pacotes corretos para cada tipo
-            main_app_packages = {
-                "Painel": "com.example.roosevelt.painel_senha_digital",
-                "Totem": "com.example.roosevelt.ai_autoatendimento"
-            }
-            
-            main_package = main_app_packages.get(panel_type)
+            main_package = MAIN_APP_PACKAGES.get(panel_type)
             if not main_package:
                 return False, f"Tipo de painel não reconhecido: {panel_type}"
             
             # Verificar se o app está instalado
-            check_result = subprocess.run(
-                [self.adb_path, "-s", device_id, "shell", "pm", "list", "packages", main_package],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW, timeout=10
-            )
+            check_result = self.shell(device_id, ["pm", "list", "packages", main_package], timeout=10)
             
             if main_package not in check_result.stdout:
                 return False, f"App principal não encontrado: {main_package}"
             
-            successful_commands = 0
-            total_commands = 0
-            results = []
-            
-            # Comandos que funcionaram no bash - adaptados para Python
-            autostart_commands = [
-                # 1. Desabilitar otimização de bateria
-                (["dumpsys", "deviceidle", "whitelist", "+" + main_package], "Whitelist de bateria"),
-                (["cmd", "appops", "set", main_package, "REQUEST_IGNORE_BATTERY_OPTIMIZATIONS", "allow"], "Ignorar otimização de bateria"),
-                
-                # 2. Permitir auto-start / background activity
-                (["cmd", "appops", "set", main_package, "START_FOREGROUND", "allow"], "Permitir foreground"),
-                (["cmd", "appops", "set", main_package, "SYSTEM_ALERT_WINDOW", "allow"], "Permitir janelas do sistema"),
-                (["cmd", "appops", "set", main_package, "RUN_IN_BACKGROUND", "allow"], "Executar em background"),
-                
-                # 3. Desabilitar App Standby
-                (["dumpsys", "usagestats", "set-standby-bucket", main_package, "10"], "Desabilitar App Standby"),
-                
-                # 4. Configurar como app crítico
-                (["cmd", "deviceidle", "whitelist", "+" + main_package], "App crítico do sistema"),
-                (["cmd", "appops", "set", main_package, "RUN_ANY_IN_BACKGROUND", "allow"], "Execução irrestrita"),
-                
-                # 5. Configurar Doze mode
-                (["settings", "put", "global", "device_idle_constants", 
-                  "inactive_to=7200000,sensing_to=0,locating_to=0,location_accuracy=20,motion_inactive_to=0,idle_after_inactive_to=0,idle_pending_to=300000,max_idle_pending_to=600000,idle_pending_factor=2.0,idle_to=3600000,max_idle_to=21600000,idle_factor=2.0,min_time_to_alarm=3600000,max_temp_app_whitelist_duration=300000,mms_temp_app_whitelist_duration=60000,sms_temp_app_whitelist_duration=20000"], 
-                  "Configurar Doze mode"),
-                
-                # 6. Conceder permissões específicas
-                (["pm", "grant", main_package, "android.permission.RECEIVE_BOOT_COMPLETED"], "Permissão BOOT_COMPLETED"),
-                (["pm", "grant", main_package, "android.permission.SYSTEM_ALERT_WINDOW"], "Permissão janelas sistema"),
-                (["pm", "grant", main_package, "android.permission.WAKE_LOCK"], "Permissão Wake Lock"),
-                (["pm", "grant", main_package, "android.permission.REQUEST_IGNORE_BATTERY_OPTIMIZATIONS"], "Permissão ignorar bateria")
-            ]
-            
-            # Verificar versão do Android para comandos específicos
+            # Verificar versão do Android para comandos específicos (retrato em cache)
             try:
-                android_version = subprocess.run(
-                    [self.adb_path, "-s", device_id, "shell", "getprop", "ro.build.version.release"],
-                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW, timeout=5
-                ).stdout.strip()
-                
-                # Comandos específicos por versão
-                if android_version and int(android_version.split('.')[0]) >= 8:
-                    autostart_commands.extend([
-                        (["cmd", "appops", "set", main_package, "BOOT_COMPLETED", "allow"], "Permitir BOOT_COMPLETED"),
-                        (["settings", "put", "global", "hidden_api_policy_pre_p_apps", "1"], "API Policy Pre-P"),
-                        (["settings", "put", "global", "hidden_api_policy_p_apps", "1"], "API Policy P")
-                    ])
-                
-                if android_version and int(android_version.split('.')[0]) >= 9:
-                    autostart_commands.extend([
-                        (["device_config", "put", "activity_manager", "default_background_activity_starts_enabled", "true"], "Background activity starts")
-                    ])
-                
-                if android_version and int(android_version.split('.')[0]) >= 10:
-                    autostart_commands.extend([
-                        (["cmd", "appops", "set", main_package, "AUTO_START", "allow"], "Auto-start Android 10+")
-                    ])
-                    
+                snapshot = self.get_device_snapshot(device_id)
+                android_major = snapshot.android_major if snapshot else None
             except Exception:
                 # Se não conseguir detectar a versão, continuar sem os comandos específicos
-                pass
+                android_major = None
             
-            # Executar todos os comandos
-            for cmd_args, description in autostart_commands:
-                total_commands += 1
-                try:
-                    result = subprocess.run(
-                        [self.adb_path, "-s", device_id, "shell"] + cmd_args,
-                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                        creationflags=subprocess.CREATE_NO_WINDOW, timeout=15
-                    )
-                    
-                    if result.returncode == 0:
-                        successful_commands += 1
-                        results.append(f"✓ {description}")
-                    else:
-                        # Alguns comandos podem falhar mas isso é OK para alguns casos
-                        error_msg = result.stderr.strip().lower()
-                        if any(x in error_msg for x in ["unknown command", "not found", "permission denied", "invalid"]):
-                            results.append(f"⚠️ {description}: Comando não disponível (ignorando)")
-                        else:
-                            results.append(f"✗ {description}: {result.stderr.strip()[:50]}")
-                    
-                except subprocess.TimeoutExpired:
-                    results.append(f"✗ {description}: Timeout")
-                    continue
-                except Exception as e:
-                    results.append(f"✗ {description}: {str(e)[:50]}")
-                    continue
+            if commands is None:
+                autostart_commands = build_autostart_commands(main_package, android_major)
+            else:
+                autostart_commands = list(commands)
+            
+            # Executar todos os comandos em um único script no dispositivo
+            with stages.stage("settings"):
+                records = self.run_batch(device_id, autostart_commands, timeout=15 * len(autostart_commands)) if autostart_commands else []
+            successful_commands, total_commands, results = summarize_autostart_records(records)
             
             # Consideramos sucesso se pelo menos 60% dos comandos funcionaram
-            success_rate = successful_commands / total_commands if total_commands > 0 else 0
+            success_rate = successful_commands / total_commands if total_commands > 0 else 1
+
+            if not restart and success_rate >= 0.6:
+                # Só itens que não dá para conferir (ex.: permissões que o pm não concede); sem reinício
+                summary = f"Auto-start de {main_package} conferido sem reiniciar ({successful_commands}/{total_commands} comandos aplicados)"
+                return True, f"{summary}. Detalhes: {'; '.join(results[:6])}" if results else summary
             
             if success_rate >= 0.6:
                 # Após configurar o auto-start, iniciar o painel uma vez
                 try:
                     # Tentar diferentes formas de iniciar o app
-                    start_commands = [
-                        # Método 1: Via SplashActivity (mais comum)
-                        (["am", "start", "-n", main_package + "/.SplashActivity"], "Iniciar via SplashActivity"),
-                        # Método 2: Via MainActivity (fallback)
-                        (["am", "start", "-n", main_package + "/.MainActivity"], "Iniciar via MainActivity"),
-                        # Método 3: Via launcher (genérico)
-                        (["monkey", "-p", main_package, "-c", "android.intent.category.LAUNCHER", "1"], "Iniciar via launcher")
-                    ]
-                    
                     app_started = False
-                    for start_cmd, start_desc in start_commands:
-                        try:
-                            start_result = subprocess.run(
-                                [self.adb_path, "-s", device_id, "shell"] + start_cmd,
-                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                                creationflags=subprocess.CREATE_NO_WINDOW, timeout=10
-                            )
-                            
-                            if start_result.returncode == 0:
-                                results.append(f"✓ {start_desc}")
-                                app_started = True
-                                break
-                            else:
-                                results.append(f"⚠️ {start_desc}: {start_result.stderr.strip()[:30]}")
-                        except Exception:
-                            continue
+                    with stages.stage("settings"):
+                        for start_cmd, start_desc in build_autostart_start_commands(main_package):
+                            try:
+                                start_result = self.shell(device_id, start_cmd, timeout=10)
+                                
+                                if start_result.returncode == 0:
+                                    results.append(f"✓ {start_desc}")
+                                    app_started = True
+                                    break
+                                else:
+                                    results.append(f"⚠️ {start_desc}: {start_result.stderr.strip()[:30]}")
+                            except Exception:
+                                continue
                     
                     if app_started:
                         results.append("✓ App iniciado com sucesso - configuração ativada")
                         
-                        # Aguardar um pouco para o app carregar
-                        import time
-                        time.sleep(10)
+                        # Aguardar o app chegar ao primeiro plano (com prazo) antes de reiniciar
+                        with stages.stage("verify"):
+                            in_foreground = self.wait_for_foreground(device_id, main_package)
+                        if not in_foreground:
+                            results.append(f"⚠️ App não ficou em primeiro plano em {self.foreground_timeout} s")
                         
-                        # Reiniciar o dispositivo para testar o auto-start
-                        try:
-                            reboot_result = subprocess.run(
-                                [self.adb_path, "-s", device_id, "reboot"],
-                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                                creationflags=subprocess.CREATE_NO_WINDOW, timeout=5
-                            )
-                            
-                            if reboot_result.returncode == 0:
-                                results.append("✓ Dispositivo reiniciado para testar auto-start")
-                                summary = f"Auto-start configurado, testado e dispositivo reiniciado para {main_package}"
+                        # Pedir o reboot de teste; o finalizador reinicia uma vez e mede se o app volta sozinho
+                        pending = reboots if reboots is not None else RebootRequests()
+                        pending.request(device_id, "testar o auto-start", package=main_package)
+                        if reboots is not None:
+                            summary = f"Auto-start configurado para {main_package} - reboot de teste agendado para o final"
+                        else:
+                            rebooted, ready, ready_message = self.finalize_reboot(device_id, pending, stages)
+                            if rebooted and ready:
+                                results.append(f"✓ Auto-start confirmado: {ready_message}")
+                                summary = f"Auto-start configurado e confirmado após o reboot para {main_package} ({ready_message})"
+                            elif rebooted:
+                                results.append(f"⚠️ {ready_message}")
+                                summary = f"Auto-start configurado para {main_package}, mas NÃO confirmado após o reboot: {ready_message}"
                             else:
                                 results.append("⚠️ Configurado mas falha ao reiniciar - reinicie manualmente")
                                 summary = f"Auto-start configurado para {main_package} - REINICIE MANUALMENTE para testar"
-                        except Exception:
-                            results.append("⚠️ Configurado mas falha ao reiniciar - reinicie manualmente")
-                            summary = f"Auto-start configurado para {main_package} - REINICIE MANUALMENTE para testar"
                     else:
                         results.append("⚠️ Configurado mas falha ao iniciar app - inicie manualmente e reinicie")
                         summary = f"Auto-start configurado para {main_package} - INICIE O APP MANUALMENTE e depois reinicie"
@@ -596,6 +2527,406 @@ class ADBManager:
         except Exception as e:
             return False, f"Erro ao configurar auto-start: {str(e)}"
 
+class AsyncADBManager:
+    """Operações do ADBManager em asyncio, para configurar muitos dispositivos em uma única thread.
+
+    Cada comando é um `asyncio.create_subprocess_exec` com prazo próprio; o
+    número de processos adb simultâneos é limitado por `max_processes`.
+    Compartilha caminho do adb, porta e cache de retratos com o ADBManager.
+    """
+
+    def __init__(self, adb_manager, max_processes=64, default_timeout=30):
+        self.adb_manager = adb_manager
+        self.max_processes = max_processes
+        self.default_timeout = default_timeout
+        self._semaphores = {}
+
+    def _semaphore(self):
+        # Um semáforo por event loop (asyncio.Semaphore fica preso ao loop em que é usado)
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_processes)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _run(self, args, timeout=None, input=None):
+        """Executa o adb com os argumentos dados e retorna um CompletedProcess"""
+        timeout = timeout or self.default_timeout
+        async with self._semaphore():
+            process = await asyncio.create_subprocess_exec(
+                self.adb_manager.adb_path, *args,
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            )
+            data = input.encode("utf-8") if isinstance(input, str) else input
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(data), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                raise subprocess.TimeoutExpired(args, timeout)
+            except asyncio.CancelledError:
+                # Cancelamento: não deixar o processo adb órfão
+                await asyncio.shield(self._kill(process))
+                raise
+        return subprocess.CompletedProcess(
+            args, process.returncode,
+            stdout.decode("utf-8", errors="replace"), stderr.decode("utf-8", errors="replace")
+        )
+
+    @staticmethod
+    async def _kill(process):
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    async def shell(self, serial, command, timeout=None, input=None):
+        args = list(command) if isinstance(command, (list, tuple)) else [command]
+        return await self._run(["-s", serial, "shell"] + args, timeout=timeout, input=input)
+
+    async def run_batch(self, serial, commands, timeout=60):
+        """Versão assíncrona de `ADBManager.run_batch` (um único processo por lista de comandos)"""
+        marker = f"__MINIPCS_BATCH_{uuid.uuid4().hex[:12]}__"
+        script = build_batch_script(commands, marker)
+        try:
+            result = await self.shell(serial, "sh", timeout=timeout, input=script + "exit\n")
+        except subprocess.TimeoutExpired:
+            return [(description, subprocess.CompletedProcess(command, -1, "", "Timeout"))
+                    for command, description in commands]
+
+        records = parse_batch_output(commands, marker, result.stdout, result.stderr)
+        if result.returncode != 0 and all(r.returncode == -1 for _, r in records):
+            error = (result.stderr.strip() or result.stdout.strip() or "Erro desconhecido")[:500]
+            records = [(description, subprocess.CompletedProcess(r.args, -1, "", error))
+                       for description, r in records]
+        return records
+
+    async def connect(self, ip_address, timeout=None):
+        try:
+            result = await self._run(["connect", self.adb_manager.serial_for(ip_address)], timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return False
+        return result.returncode == 0
+
+    async def is_reachable(self, ip_address, timeout=None):
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip_address, int(self.adb_manager.port)),
+                timeout or self.adb_manager.probe_timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    async def scan_subnet(self, network, max_concurrency=256, timeout=None, on_found=None):
+        """Procura hosts com a porta adb aberta em uma rede (ex.: ipaddress.ip_network("10.0.0.0/24")).
+
+        Os hosts da tabela ARP são testados e informados primeiro, em uma rodada
+        própria, já que são os mais prováveis de estarem ligados; só depois o
+        restante da rede é varrido, com até `max_concurrency` conexões
+        simultâneas. `on_found(ip)` é chamado a cada host encontrado.
+        """
+        known = await asyncio.to_thread(read_arp_table)
+        hosts = [str(host) for host in network.hosts()]
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def probe(ip_address):
+            async with semaphore:
+                reachable = await self.is_reachable(ip_address, timeout)
+            if reachable and on_found:
+                on_found(ip_address)
+            return reachable
+
+        found = []
+        for batch in ([ip for ip in hosts if ip in known], [ip for ip in hosts if ip not in known]):
+            results = await asyncio.gather(*(probe(ip) for ip in batch))
+            found.extend(ip for ip, reachable in zip(batch, results) if reachable)
+        return sorted(found, key=ipaddress.IPv4Address)
+
+    async def ensure_connected(self, ip_address, timeout=None):
+        """Versão assíncrona de `ADBManager.ensure_connected` (mesmo registro de conexões)"""
+        manager = self.adb_manager
+        serial = manager.serial_for(ip_address)
+        await asyncio.to_thread(manager.refresh_connections)
+        if manager.connection_state(serial) == "device":
+            return CONNECTION_OK
+
+        if not await self.is_reachable(ip_address):
+            manager.mark_disconnected(serial)
+            return CONNECTION_UNREACHABLE
+
+        if not await self.connect(ip_address, timeout=timeout):
+            manager.mark_disconnected(serial)
+            return CONNECTION_FAILED
+
+        await asyncio.to_thread(manager.refresh_connections, 0)
+        return CONNECTION_OK if manager.connection_state(serial) == "device" else CONNECTION_FAILED
+
+    async def get_device_snapshot(self, serial, refresh=False, timeout=15):
+        if not refresh:
+            snapshot = self.adb_manager.cached_snapshot(serial)
+            if snapshot:
+                return snapshot
+        records = await self.run_batch(serial, DeviceSnapshot.SNAPSHOT_COMMANDS, timeout=timeout)
+        snapshot = DeviceSnapshot.from_batch(serial, records)
+        self.adb_manager.store_snapshot(serial, snapshot)
+        return snapshot
+
+    async def read_device_state(self, serial, desired):
+        try:
+            return desired.read(await self.run_batch(serial, desired.query_commands(), timeout=60))
+        except Exception:
+            return desired.read([])
+
+    async def uninstall_apps(self, serial, packages):
+        """Remove vários pacotes em uma única chamada de shell; retorna [(pacote, sucesso, mensagem)]"""
+        if not packages:
+            return []
+        records = await self.run_batch(serial, [(["pm", "uninstall", package], package) for package in packages],
+                                       timeout=30 * len(packages))
+        return [(package, record.returncode == 0, record.stdout.strip() + record.stderr.strip())
+                for package, record in records]
+
+    async def install_apk(self, apk_path, serial):
+        # Mesmo caminho das instalações síncronas (cache do dispositivo, fila e limites de banda)
+        try:
+            return await asyncio.to_thread(self.adb_manager.install_apk, apk_path, serial)
+        except Exception as e:
+            return False, str(e)
+
+    async def change_dpi(self, serial, dpi, timeout=None):
+        try:
+            result = await self.shell(serial, ["wm", "density", str(dpi)], timeout=timeout)
+            self.adb_manager.invalidate_snapshot(serial)
+            return result.returncode == 0, result.stdout.strip() + result.stderr.strip()
+        except Exception as e:
+            return False, str(e)
+
+    async def reboot_device(self, serial, timeout=10):
+        self.adb_manager.close_session(serial)
+        self.adb_manager.invalidate_snapshot(serial)
+        self.adb_manager.mark_disconnected(serial)
+        try:
+            result = await self._run(["-s", serial, "reboot"], timeout=timeout)
+            return result.returncode == 0, result.stdout.strip() + result.stderr.strip()
+        except Exception as e:
+            return False, str(e)
+
+    async def boot_id(self, serial):
+        try:
+            result = await self.shell(serial, BOOT_STATE_COMMAND, timeout=10)
+        except Exception:
+            return None
+        return parse_boot_state(result.stdout)[1] if result.returncode == 0 else None
+
+    async def wait_until_ready(self, serial, previous_boot_id=None, package=None, timeout=None):
+        """Versão assíncrona de `ADBManager.wait_until_ready` (as esperas não bloqueiam o loop)"""
+        timeout = timeout or self.adb_manager.boot_timeout
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + timeout
+        ip_address = serial.rsplit(":", 1)[0] if TransferScheduler.subnet_of(serial) else None
+        # Sem boot_id anterior, só conta o boot completo depois de ver o dispositivo cair
+        went_down = previous_boot_id is not None
+        delay = 0.5
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False, f"Dispositivo não completou o boot em {timeout} s"
+            try:
+                if ip_address:
+                    connected = await self.ensure_connected(ip_address) == CONNECTION_OK
+                elif went_down:
+                    connected = (await self._run(["-s", serial, "wait-for-device"], timeout=remaining)).returncode == 0
+                else:
+                    state = await self._run(["-s", serial, "get-state"], timeout=max(1, min(10, remaining)))
+                    connected = state.stdout.strip() == "device"
+                if connected:
+                    result = await self.shell(serial, BOOT_STATE_COMMAND, timeout=max(1, min(10, remaining)))
+                    booted, boot_id = parse_boot_state(result.stdout)
+                    if result.returncode != 0 or not booted:
+                        went_down = True
+                    elif went_down and (previous_boot_id is None or boot_id != previous_boot_id):
+                        break
+                else:
+                    went_down = True
+            except subprocess.TimeoutExpired:
+                pass
+            except OSError:
+                went_down = True
+            await asyncio.sleep(max(0, min(delay, deadline - loop.time())))
+            delay = min(delay * 2, 5)
+
+        boot_seconds = loop.time() - started
+        self.adb_manager.invalidate_snapshot(serial)
+        if not package:
+            return True, f"Pronto em {boot_seconds:.0f} s"
+        if await self.wait_for_foreground(serial, package):
+            return True, f"Boot em {boot_seconds:.0f} s; {package} em primeiro plano após {loop.time() - started:.0f} s"
+        return False, f"Boot em {boot_seconds:.0f} s, mas {package} não abriu sozinho em {self.adb_manager.foreground_timeout} s"
+
+    async def wait_for_foreground(self, serial, package, timeout=None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.adb_manager.foreground_timeout)
+        delay = 0.5
+        while True:
+            try:
+                result = await self.shell(serial, FOREGROUND_COMMAND, timeout=10)
+                if f"{package}/" in result.stdout:
+                    return True
+            except subprocess.TimeoutExpired:
+                pass
+            if loop.time() + delay > deadline:
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5)
+
+    async def finalize_reboot(self, serial, reboots, stages=None):
+        """Versão assíncrona de `ADBManager.finalize_reboot`: (reiniciou, pronto, mensagem)"""
+        entry = reboots.pop(serial)
+        if not entry:
+            return False, True, "Nenhuma etapa pediu reboot"
+        reasons, package = entry
+        stages = stages or StageScheduler()
+        async with stages.astage("reboot"):
+            previous_boot_id = await self.boot_id(serial)
+            success, message = await self.reboot_device(serial)
+        if not success:
+            return False, False, f"Falha ao reiniciar ({', '.join(reasons)}): {message} - reinicie manualmente"
+        async with stages.astage("verify"):
+            ready, ready_message = await self.wait_until_ready(serial, previous_boot_id, package)
+        return True, ready, f"{ready_message} (reboot único: {', '.join(reasons)})"
+
+    async def configure_app_autostart(self, serial, panel_type, commands=None, restart=True, reboots=None,
+                                      stages=None):
+        """Versão assíncrona de `ADBManager.configure_app_autostart` (a espera pelo app não bloqueia o loop)"""
+        stages = stages or StageScheduler()
+        try:
+            main_package = MAIN_APP_PACKAGES.get(panel_type)
+            if not main_package:
+                return False, f"Tipo de painel não reconhecido: {panel_type}"
+
+            check_result = await self.shell(serial, ["pm", "list", "packages", main_package], timeout=10)
+            if main_package not in check_result.stdout:
+                return False, f"App principal não encontrado: {main_package}"
+
+            if commands is None:
+                snapshot = await self.get_device_snapshot(serial)
+                autostart_commands = build_autostart_commands(main_package, snapshot.android_major if snapshot else None)
+            else:
+                autostart_commands = list(commands)
+
+            records = []
+            if autostart_commands:
+                async with stages.astage("settings"):
+                    records = await self.run_batch(serial, autostart_commands, timeout=15 * len(autostart_commands))
+            successful_commands, total_commands, results = summarize_autostart_records(records)
+
+            if total_commands and successful_commands / total_commands < 0.6:
+                return False, f"Falha na configuração de auto-start para {main_package} ({successful_commands}/{total_commands} comandos). Resultados: {'; '.join(results[:3])}"
+
+            if not restart:
+                summary = f"Auto-start de {main_package} conferido sem reiniciar ({successful_commands}/{total_commands} comandos aplicados)"
+                return True, f"{summary}. Detalhes: {'; '.join(results[:6])}" if results else summary
+
+            app_started = False
+            async with stages.astage("settings"):
+                for start_cmd, start_desc in build_autostart_start_commands(main_package):
+                    try:
+                        start_result = await self.shell(serial, start_cmd, timeout=10)
+                    except subprocess.TimeoutExpired:
+                        continue
+                    if start_result.returncode == 0:
+                        results.append(f"✓ {start_desc}")
+                        app_started = True
+                        break
+                    results.append(f"⚠️ {start_desc}: {start_result.stderr.strip()[:30]}")
+
+            if not app_started:
+                results.append("⚠️ Configurado mas falha ao iniciar app - inicie manualmente e reinicie")
+                summary = f"Auto-start configurado para {main_package} - INICIE O APP MANUALMENTE e depois reinicie"
+            else:
+                results.append("✓ App iniciado com sucesso - configuração ativada")
+
+                # Aguardar o app chegar ao primeiro plano (com prazo) antes de reiniciar
+                async with stages.astage("verify"):
+                    in_foreground = await self.wait_for_foreground(serial, main_package)
+                if not in_foreground:
+                    results.append(f"⚠️ App não ficou em primeiro plano em {self.adb_manager.foreground_timeout} s")
+
+                # Pedir o reboot de teste; o finalizador reinicia uma vez e mede se o app volta sozinho
+                pending = reboots if reboots is not None else RebootRequests()
+                pending.request(serial, "testar o auto-start", package=main_package)
+                if reboots is not None:
+                    summary = f"Auto-start configurado para {main_package} - reboot de teste agendado para o final"
+                else:
+                    rebooted, ready, ready_message = await self.finalize_reboot(serial, pending, stages)
+                    if rebooted and ready:
+                        results.append(f"✓ Auto-start confirmado: {ready_message}")
+                        summary = f"Auto-start configurado e confirmado após o reboot para {main_package} ({ready_message})"
+                    elif rebooted:
+                        results.append(f"⚠️ {ready_message}")
+                        summary = f"Auto-start configurado para {main_package}, mas NÃO confirmado após o reboot: {ready_message}"
+                    else:
+                        results.append("⚠️ Configurado mas falha ao reiniciar - reinicie manualmente")
+                        summary = f"Auto-start configurado para {main_package} - REINICIE MANUALMENTE para testar"
+
+            return True, f"{summary}. Detalhes: {'; '.join(results[:6])}"
+
+        except Exception as e:
+            return False, f"Erro ao configurar auto-start: {str(e)}"
+
+class AsyncLoopBridge:
+    """Event loop asyncio rodando em uma thread de fundo, compartilhado pela GUI e pelas threads de trabalho"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="minipcs-asyncio", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine):
+        """Agenda a corrotina no loop e retorna um concurrent.futures.Future (pode ser cancelado)"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        """Executa a corrotina no loop de fundo e aguarda o resultado (cancela se o prazo estourar)"""
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def cancel_all(self, timeout=5):
+        """Cancela todas as tarefas do loop e espera elas encerrarem (os processos adb são finalizados)"""
+        if self.loop.is_running():
+            try:
+                self.run(self._cancel_tasks(), timeout)
+            except Exception:
+                pass
+
+    @staticmethod
+    async def _cancel_tasks():
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
+
 class AppManager:
     def __init__(self):
         self.default_apps = {
@@ -640,6 +2971,18 @@ class APKManager:
                 os.path.join(self.base_path, "Totem", "sintese.apk")
             ]
         }
+        # APKs da lista que o template do perfil não exige: ausentes só geram aviso
+        self.optional_apks = {"Totem": {"sintese.apk"}}
+
+        # Índice de metadados dos APKs (atualizado em segundo plano pela janela principal)
+        self.apk_index = APKIndex(self.base_path)
+
+        # Servidor HTTP de APKs (opcional); quando definido, substitui as pastas locais
+        self.artifact_server = ""
+
+        # Repositório de versões por sha256; com um canal selecionado, os APKs vêm dele
+        self.artifact_store = ArtifactStore(self.base_path)
+        self.channel = ""
     
     def create_folder_structure(self):
         """Cria a estrutura de pastas se não existir"""
@@ -778,7 +3121,25 @@ Pasta: {folder_path}
     
     def get_apk_list(self, panel_type):
         """Retorna a lista de APKs para o tipo de painel especificado"""
+        if self.channel:
+            return self.artifact_store.resolve(self.channel, panel_type)
         return self.apk_lists.get(panel_type, [])
+
+    def is_optional(self, panel_type, apk_path):
+        return os.path.basename(apk_path) in self.optional_apks.get(panel_type, set())
+
+    def get_channels(self):
+        return self.artifact_store.channels()
+
+    def save_channel(self, channel, panel_type):
+        """Guarda os APKs atuais da pasta do painel no repositório, como o canal `channel`"""
+        apk_paths = self.apk_lists.get(panel_type, [])
+        digests = {}
+        for apk_path in apk_paths:
+            info = self.get_apk_info(apk_path)
+            if info:
+                digests[apk_path] = info["sha256"]
+        return self.artifact_store.import_files(channel, panel_type, apk_paths, digests)
     
     def get_panel_types(self):
         """Retorna os tipos de painéis disponíveis"""
@@ -788,27 +3149,68 @@ Pasta: {folder_path}
         """Retorna o caminho base onde estão as pastas dos APKs"""
         return self.base_path
 
+    def get_apk_info(self, apk_path):
+        """Metadados do APK pelo índice (None se o arquivo não existir)"""
+        try:
+            return self.apk_index.get(apk_path)
+        except OSError:
+            return None
+
+    def get_artifacts(self, panel_type):
+        """APKs publicados no servidor de artefatos: (sucesso, lista ou mensagem)"""
+        return ArtifactServer(self.artifact_server).fetch_index(panel_type)
+
+    def get_watch_paths(self):
+        """Pastas monitoradas para manter o índice atualizado"""
+        return [self.base_path] + [os.path.join(self.base_path, panel) for panel in self.get_panel_types()]
+
+class APKIndexThread(QThread):
+    """Atualiza o índice de APKs fora da thread da interface"""
+    finished = pyqtSignal(int)
+
+    def __init__(self, apk_manager):
+        super().__init__()
+        self.apk_manager = apk_manager
+
+    def run(self):
+        try:
+            changed = self.apk_manager.apk_index.refresh()
+        except Exception:
+            changed = 0
+        self.finished.emit(changed)
+
 class WorkerThread(QThread):
     finished = pyqtSignal(str)
     progress = pyqtSignal(str)
+    device_update = pyqtSignal(str, object)  # ip, campos da linha na tabela de dispositivos
 
-    def __init__(self, adb_manager, app_manager, devices_to_process):
+    def __init__(self, adb_manager, app_manager, devices_to_process, async_manager, loop_bridge,
+                 max_parallel=1):
         super().__init__()
         self.adb_manager = adb_manager
         self.app_manager = app_manager
         self.devices_to_process = devices_to_process
+        # Os dispositivos rodam como tarefas no loop de fundo, em pipeline: no máximo
+        # `max_parallel` por vez nas etapas de comando, sem limite prático nas esperas.
+        self.async_manager = async_manager
+        self.loop_bridge = loop_bridge
+        self.max_parallel = max(1, max_parallel)
+        self.stages = StageScheduler(transfer_slots=self.max_parallel, command_slots=self.max_parallel)
+        # Pedidos de reboot das etapas; cada dispositivo reinicia no máximo uma vez, ao final
+        self.reboots = RebootRequests()
 
     def run(self):
-        results = []
-        for ip, dpi, device_num in self.devices_to_process:
-            result = self.process_device(ip, dpi, device_num)
-            results.append(result)
-            self.progress.emit(f"Processando dispositivo {device_num}...")
+        started = time.monotonic()
+        try:
+            results = self.loop_bridge.run(self.process_all_async())
+        except concurrent.futures.CancelledError:
+            return  # Janela fechando: as tarefas foram canceladas
 
         if len(results) == 1:
             self.finished.emit(results[0])
         else:
             success_count = sum(1 for r in results if "sucesso" in r.lower())
+            self.progress.emit(f"Lote concluído: {StageScheduler.throughput(len(results), time.monotonic() - started)}")
             if success_count == len(results):
                 self.finished.emit("Todos os dispositivos configurados com sucesso!")
             elif success_count > 0:
@@ -816,201 +3218,793 @@ class WorkerThread(QThread):
             else:
                 self.finished.emit("Erro ao configurar dispositivos.")
 
-    def process_device(self, ip_address, dpi, device_num):
+    def report_uninstall(self, device_num, app, success, message):
+        """Informa o resultado da remoção; retorna False se o erro deve interromper o dispositivo"""
+        if success:
+            self.progress.emit(f"Dispositivo {device_num}: {app} removido com sucesso")
+            return True
+
+        # Melhor detecção de tipos de erro
+        message_lower = message.lower()
+
+        if "DELETE_FAILED_DEVICE_POLICY_MANAGER" in message or "DELETE_FAILED_INTERNAL_ERROR" in message:
+            self.progress.emit(f"Dispositivo {device_num}: {app} não pode ser removido (app do sistema)")
+        elif "not installed" in message_lower or "not found" in message_lower or "unknown package" in message_lower:
+            self.progress.emit(f"Dispositivo {device_num}: {app} não está instalado (ignorando)")
+        elif message.strip() == "":
+            self.progress.emit(f"Dispositivo {device_num}: {app} não está instalado (sem resposta)")
+        else:
+            self.progress.emit(f"Dispositivo {device_num}: Erro ao remover {app}: {message}")
+            return False
+        return True
+
+    def report_plan(self, ip_address, device_num, plan):
+        self.progress.emit(f"Dispositivo {device_num}: {plan.describe()}")
+        self.update_device(ip_address, "Aplicando alterações...", 15)
+
+    def update_device(self, ip_address, status, progress=None, level=None):
+        fields = {"status": status, "level": level}
+        if progress is not None:
+            fields["progress"] = progress
+        self.device_update.emit(ip_address, fields)
+
+    def finish_device(self, ip_address, result):
+        """Status final da linha a partir da mensagem de resultado do dispositivo"""
+        text = result.split(": ", 1)[-1]
+        if "sucesso" in result.lower():
+            self.update_device(ip_address, text, 100, "ok")
+        else:
+            self.update_device(ip_address, text, level="error")
+
+    async def process_all_async(self):
+        # Cada etapa limita a si mesma (StageScheduler.astage); aqui só o total em andamento
+        semaphore = asyncio.Semaphore(StageScheduler.max_in_flight)
+
+        async def bounded(ip_address, dpi, device_num):
+            async with semaphore:
+                result = await self.process_device_async(ip_address, dpi, device_num)
+            self.finish_device(ip_address, result)
+            self.progress.emit(f"Processando dispositivo {device_num}...")
+            return result
+
+        # gather preserva a ordem dos dispositivos no resumo
+        return await asyncio.gather(*(bounded(*device) for device in self.devices_to_process))
+
+    async def process_device_async(self, ip_address, dpi, device_num):
+        """Conecta, lê o estado, aplica só as diferenças (remoções e DPI) e reinicia uma vez, se preciso"""
+        manager = self.async_manager
+        serial = self.adb_manager.serial_for(ip_address)
         try:
             self.progress.emit(f"Dispositivo {device_num}: Conectando...")
-            if not self.adb_manager.connect(ip_address):
+            self.update_device(ip_address, "Conectando...", 5)
+            async with self.stages.astage("connect"):
+                status = await manager.ensure_connected(ip_address)
+            if status == CONNECTION_UNREACHABLE:
+                return f"Dispositivo {device_num}: Inacessível (sem resposta na porta {self.adb_manager.port})"
+            if status != CONNECTION_OK:
                 return f"Dispositivo {device_num}: Erro de conexão"
-            
-            self.progress.emit(f"Dispositivo {device_num}: Removendo aplicativos...")
-            # Remove aplicativos
-            for app in self.app_manager.app_list:
+
+            # Estado atual em um lote só; apenas as diferenças são aplicadas
+            self.progress.emit(f"Dispositivo {device_num}: Lendo estado atual...")
+            self.update_device(ip_address, "Lendo estado atual...", 10)
+            desired = DesiredState(dpi=dpi, absent_packages=self.app_manager.app_list)
+            async with self.stages.astage("snapshot"):
+                plan = desired.diff(await manager.read_device_state(serial, desired))
+            self.report_plan(ip_address, device_num, plan)
+            if plan.is_empty():
+                return f"Dispositivo {device_num}: Configurado com sucesso! (nenhuma alteração necessária)"
+
+            if plan.uninstall:
                 try:
-                    self.progress.emit(f"Dispositivo {device_num}: Removendo {app}...")
-                    success, message = self.adb_manager.uninstall_app(ip_address, app)
-                    if not success:
-                        # Melhor detecção de tipos de erro
-                        message_lower = message.lower()
-                        
-                        if "DELETE_FAILED_DEVICE_POLICY_MANAGER" in message or "DELETE_FAILED_INTERNAL_ERROR" in message:
-                            self.progress.emit(f"Dispositivo {device_num}: {app} não pode ser removido (app do sistema)")
-                        elif "not installed" in message_lower or "not found" in message_lower or "unknown package" in message_lower:
-                            self.progress.emit(f"Dispositivo {device_num}: {app} não está instalado (ignorando)")
-                        elif message.strip() == "":
-                            self.progress.emit(f"Dispositivo {device_num}: {app} não está instalado (sem resposta)")
-                        else:
-                            self.progress.emit(f"Dispositivo {device_num}: Erro ao remover {app}: {message}")
+                    self.progress.emit(f"Dispositivo {device_num}: Removendo aplicativos...")
+                    self.update_device(ip_address, f"Removendo {len(plan.uninstall)} aplicativo(s)...", 40)
+                    async with self.stages.astage("uninstall"):
+                        uninstall_results = await manager.uninstall_apps(serial, plan.uninstall)
+                    for app, success, message in uninstall_results:
+                        if not self.report_uninstall(device_num, app, success, message):
                             return f"Dispositivo {device_num}: Erro ao remover {app}"
-                    else:
-                        self.progress.emit(f"Dispositivo {device_num}: {app} removido com sucesso")
                 except Exception as e:
-                    self.progress.emit(f"Dispositivo {device_num}: Exceção ao remover {app}: {str(e)}")
-                    return f"Dispositivo {device_num}: Erro ao tentar remover {app}"
-            
-            self.progress.emit(f"Dispositivo {device_num}: Alterando DPI para {dpi}...")
-            # Altera DPI
-            success, message = self.adb_manager.change_dpi(ip_address, dpi)
-            if not success:
-                self.progress.emit(f"Dispositivo {device_num}: Erro ao alterar DPI: {message}")
-                return f"Dispositivo {device_num}: Erro ao alterar DPI - {message}"
-            else:
+                    self.progress.emit(f"Dispositivo {device_num}: Exceção ao remover aplicativos: {str(e)}")
+                    return f"Dispositivo {device_num}: Erro ao tentar remover aplicativos"
+
+            if plan.dpi:
+                self.progress.emit(f"Dispositivo {device_num}: Alterando DPI para {dpi}...")
+                self.update_device(ip_address, f"Alterando DPI para {dpi}...", 70)
+                async with self.stages.astage("settings"):
+                    success, message = await manager.change_dpi(serial, dpi)
+                if not success:
+                    self.progress.emit(f"Dispositivo {device_num}: Erro ao alterar DPI: {message}")
+                    return f"Dispositivo {device_num}: Erro ao alterar DPI - {message}"
                 self.progress.emit(f"Dispositivo {device_num}: DPI alterado com sucesso")
-            
-            self.progress.emit(f"Dispositivo {device_num}: Reiniciando...")
-            # Reinicia dispositivo
-            try:
-                success, message = self.adb_manager.reboot_device(ip_address)
-                if success:
-                    self.progress.emit(f"Dispositivo {device_num}: Reiniciado com sucesso")
-                else:
-                    self.progress.emit(f"Dispositivo {device_num}: Erro ao reiniciar: {message}")
-            except Exception as e:
-                self.progress.emit(f"Dispositivo {device_num}: Exceção ao reiniciar: {str(e)}")
-            
+
+            if plan.reboot:
+                self.reboots.request(serial, "DPI/remoções")
+            if self.reboots.pending(serial):
+                self.progress.emit(f"Dispositivo {device_num}: Reiniciando...")
+                self.update_device(ip_address, "Reiniciando e aguardando o boot...", 85)
+                rebooted, ready, message = await manager.finalize_reboot(serial, self.reboots, self.stages)
+                self.progress.emit(f"Dispositivo {device_num}: {message}")
+                if rebooted and not ready:
+                    return f"Dispositivo {device_num}: Configurado, mas {message[0].lower()}{message[1:]}"
+
             return f"Dispositivo {device_num}: Configurado com sucesso!"
-            
+
         except Exception as e:
             self.progress.emit(f"Dispositivo {device_num}: Exceção geral: {str(e)}")
             return f"Dispositivo {device_num}: Erro - {str(e)}"
 
+def read_arp_table():
+    """IPs presentes na tabela ARP/vizinhança do sistema (hosts vistos recentemente na rede)"""
+    try:
+        if os.path.exists("/proc/net/arp"):
+            with open("/proc/net/arp") as f:
+                output = f.read()
+        else:
+            output = subprocess.run(
+                ["arp", "-a"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=5,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            ).stdout
+    except Exception:
+        return set()
+    return set(re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", output))
+
+def format_device_status(snapshot):
+    """Texto do status de um dispositivo conectado a partir do retrato em cache"""
+    status = f"Conectado: {snapshot.model}"
+    if snapshot.android_version:
+        status += f" · Android {snapshot.android_version}"
+    if snapshot.current_dpi:
+        status += f" · {snapshot.current_dpi} DPI"
+    return status
+
+def parse_device_list(text, default_dpi):
+    """Extrai pares (ip, dpi) de texto colado ou CSV: um dispositivo por linha, DPI opcional"""
+    devices = []
+    for line in text.splitlines():
+        fields = [field.strip().strip('"') for field in re.split(r"[,;\t ]+", line.strip()) if field.strip()]
+        if not fields:
+            continue
+        try:
+            ip = str(ipaddress.IPv4Address(fields[0].split(":")[0]))
+        except ValueError:
+            continue  # cabeçalho ou linha inválida
+        dpi = fields[1] if len(fields) > 1 and fields[1].isdigit() else default_dpi
+        devices.append((ip, dpi))
+    return devices
+
+class FleetTableModel(QAbstractTableModel):
+    """Tabela de dispositivos Wi-Fi: IP, DPI alvo, status, modelo e progresso.
+
+    As atualizações das threads de trabalho são acumuladas em `queue_update` e
+    aplicadas a cada `flush_interval` ms com um único dataChanged, para a tabela
+    continuar fluida com centenas de dispositivos em andamento.
+    """
+
+    COLUMNS = ["IP", "DPI", "Status", "Modelo", "Progresso"]
+    FIELDS = ["ip", "dpi", "status", "model", "progress"]
+    LEVEL_COLORS = {"ok": "#4caf50", "error": "#ff6b6b", "warning": "#ffa726"}
+
+    def __init__(self, parent=None, flush_interval=100):
+        super().__init__(parent)
+        self._rows = []
+        self._index = {}  # ip -> linha
+        self._pending = {}
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(flush_interval)
+        self._flush_timer.timeout.connect(self.flush_updates)
+        self._flush_timer.start()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        field = self.FIELDS[index.column()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if field == "progress":
+                return f"{row['progress']}%" if row["progress"] else ""
+            return row[field]
+        if role == Qt.ItemDataRole.ForegroundRole and field == "status" and row["level"]:
+            return QColor(self.LEVEL_COLORS[row["level"]])
+        if role == Qt.ItemDataRole.TextAlignmentRole and field in ("dpi", "progress"):
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        if index.isValid() and self.FIELDS[index.column()] in ("ip", "dpi"):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        row = self._rows[index.row()]
+        field = self.FIELDS[index.column()]
+        value = str(value).strip()
+        if field == "ip":
+            try:
+                value = str(ipaddress.IPv4Address(value))
+            except ValueError:
+                return False
+            if value != row["ip"] and value in self._index:
+                return False
+            del self._index[row["ip"]]
+            self._index[value] = index.row()
+        elif field == "dpi" and not value.isdigit():
+            return False
+        row[field] = value
+        self.dataChanged.emit(index, index)
+        return True
+
+    def add_devices(self, devices):
+        """Acrescenta pares (ip, dpi); IPs já presentes apenas recebem o novo DPI. Retorna quantos foram novos"""
+        new_rows = []
+        for ip, dpi in devices:
+            if ip in self._index:
+                self.queue_update(ip, {"dpi": dpi})
+            elif ip not in (r["ip"] for r in new_rows):
+                new_rows.append({"ip": ip, "dpi": dpi, "status": "", "level": None, "model": "", "progress": 0})
+        if new_rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_rows) - 1)
+            for offset, row in enumerate(new_rows):
+                self._rows.append(row)
+                self._index[row["ip"]] = first + offset
+            self.endInsertRows()
+        return len(new_rows)
+
+    def remove_rows(self, rows):
+        for row in sorted(set(rows), reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            self.endRemoveRows()
+        self._reindex()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._index = {}
+        self._pending = {}
+        self.endResetModel()
+
+    def _reindex(self):
+        self._index = {row["ip"]: position for position, row in enumerate(self._rows)}
+
+    def devices(self):
+        return [(row["ip"], row["dpi"]) for row in self._rows]
+
+    def ip_at(self, row):
+        return self._rows[row]["ip"]
+
+    def queue_update(self, ip, fields):
+        """Agenda a atualização de uma linha (aplicada no próximo ciclo do timer)"""
+        self._pending.setdefault(ip, {}).update(fields)
+
+    def flush_updates(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        changed = []
+        for ip, fields in pending.items():
+            position = self._index.get(ip)
+            if position is None:
+                continue
+            self._rows[position].update(fields)
+            changed.append(position)
+        if changed:
+            self.dataChanged.emit(self.index(min(changed), 0),
+                                  self.index(max(changed), len(self.COLUMNS) - 1))
+
+class ConnectWorkerThread(QThread):
+    """Conecta e lê o retrato de vários dispositivos ao mesmo tempo no event loop compartilhado"""
+    finished = pyqtSignal(str)
+    device_update = pyqtSignal(str, object)
+
+    def __init__(self, async_manager, loop_bridge, ip_addresses, max_parallel=8):
+        super().__init__()
+        self.async_manager = async_manager
+        self.loop_bridge = loop_bridge
+        self.ip_addresses = ip_addresses
+        self.max_parallel = max(1, max_parallel)
+
+    def run(self):
+        try:
+            results = self.loop_bridge.run(self.connect_all())
+        except concurrent.futures.CancelledError:
+            return  # Janela fechando: as tarefas foram canceladas
+        connected_count = sum(1 for connected in results if connected)
+        if connected_count == 0:
+            self.finished.emit("Nenhum dispositivo conectado")
+        elif connected_count == 1:
+            self.finished.emit("1 dispositivo conectado")
+        else:
+            self.finished.emit(f"{connected_count} dispositivos conectados")
+
+    async def connect_all(self):
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def bounded(ip_address):
+            async with semaphore:
+                return await self.connect_device(ip_address)
+
+        return await asyncio.gather(*(bounded(ip) for ip in self.ip_addresses))
+
+    async def connect_device(self, ip_address):
+        manager = self.async_manager
+        self.device_update.emit(ip_address, {"status": "Conectando...", "level": None, "progress": 0})
+        try:
+            status = await manager.ensure_connected(ip_address)
+            if status == CONNECTION_OK:
+                snapshot = await manager.get_device_snapshot(manager.adb_manager.serial_for(ip_address))
+                if snapshot:
+                    self.device_update.emit(ip_address, {"status": format_device_status(snapshot),
+                                                         "level": "ok", "model": snapshot.model})
+                    return True
+                self.device_update.emit(ip_address, {"status": "Erro ao obter informações", "level": "error"})
+            elif status == CONNECTION_UNREACHABLE:
+                self.device_update.emit(ip_address, {"status": "Dispositivo inacessível", "level": "error"})
+            else:
+                self.device_update.emit(ip_address, {"status": "Dispositivo não conectado", "level": "error"})
+        except Exception as e:
+            self.device_update.emit(ip_address, {"status": f"Erro: {str(e)}", "level": "error"})
+        return False
+
+class ScanWorkerThread(ConnectWorkerThread):
+    """Descobre Mini PCs com adb na rede e identifica cada um com um retrato em lote"""
+    progress = pyqtSignal(str)
+    device_found = pyqtSignal(str)
+
+    def __init__(self, async_manager, loop_bridge, network, max_parallel=8):
+        super().__init__(async_manager, loop_bridge, [], max_parallel)
+        self.network = network
+
+    def run(self):
+        try:
+            started = time.monotonic()
+            self.progress.emit(f"Procurando dispositivos em {self.network} ({self.network.num_addresses} endereços)...")
+            found = self.loop_bridge.run(self.scan())
+            elapsed = time.monotonic() - started
+            self.finished.emit(f"Busca concluída em {elapsed:.1f}s: {len(found)} dispositivo(s) com adb encontrados")
+        except concurrent.futures.CancelledError:
+            pass  # Janela fechando: as tarefas foram canceladas
+        except Exception as e:
+            self.finished.emit(f"Erro na busca: {str(e)}")
+
+    async def scan(self):
+        found = await self.async_manager.scan_subnet(self.network, on_found=self.device_found.emit)
+        # Identificar os encontrados (conexão + retrato), como em "Conectar aos Dispositivos"
+        self.ip_addresses = found
+        await self.connect_all()
+        return found
+
+class DeviceWatcherThread(QThread):
+    """Acompanha os dispositivos do servidor adb em tempo real (host:track-devices).
+
+    Emite eventos de conexão, desconexão e mudança de estado, e mantém o
+    registro de conexões do ADBManager atualizado sem consultas periódicas.
+    """
+    device_attached = pyqtSignal(str, str)  # serial, estado
+    device_detached = pyqtSignal(str)
+    state_changed = pyqtSignal(str, str, str)  # serial, estado anterior, estado novo
+    device_ready = pyqtSignal(str)  # o dispositivo chegou ao estado "device"
+    error = pyqtSignal(str)
+
+    def __init__(self, adb_manager, retry_interval=2):
+        super().__init__()
+        self.adb_manager = adb_manager
+        self.retry_interval = retry_interval
+        self._running = True
+        self._stopped = threading.Event()
+        self._sock = None
+        self._states = {}
+
+    def stop(self):
+        """Pede o fim do acompanhamento sem bloquear; a thread termina depois (sinal finished)"""
+        self._running = False
+        self._stopped.set()
+        sock = self._sock
+        if sock:
+            # Desbloqueia o recv pendente
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def run(self):
+        client = self.adb_manager.socket_client
+        last_error = None
+        while self._running:
+            try:
+                self._sock = client.open_track_devices()
+                last_error = None
+                while self._running:
+                    self.handle_devices(client.read_device_list(self._sock))
+            except (OSError, ADBProtocolError) as e:
+                if not self._running:
+                    break
+                # A mesma falha a cada tentativa só aparece uma vez no log
+                if str(e) != last_error:
+                    self.error.emit(f"Acompanhamento de dispositivos interrompido: {str(e)}")
+                    last_error = str(e)
+                if not self.server_running(client):
+                    # Servidor adb fora do ar: iniciar e tentar de novo
+                    try:
+                        subprocess.run([self.adb_manager.adb_path, "start-server"],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=15,
+                                       creationflags=subprocess.CREATE_NO_WINDOW)
+                    except Exception:
+                        pass
+                self._stopped.wait(self.retry_interval)
+            finally:
+                if self._sock:
+                    self._sock.close()
+                    self._sock = None
+
+    @staticmethod
+    def server_running(client):
+        """True se o servidor adb responde (ele pode estar no ar e só ter recusado a requisição)"""
+        try:
+            client.version()
+            return True
+        except (OSError, ADBProtocolError, ValueError):
+            return False
+
+    def handle_devices(self, devices):
+        self.adb_manager.update_connections(devices)
+        current = {device["serial"]: device["state"] for device in devices}
+
+        for serial in self._states.keys() - current.keys():
+            self.device_detached.emit(serial)
+        for serial, state in current.items():
+            previous = self._states.get(serial)
+            if previous is None:
+                self.device_attached.emit(serial, state)
+            elif previous != state:
+                self.state_changed.emit(serial, previous, state)
+            if state == "device" and previous != "device":
+                self.device_ready.emit(serial)
+        self._states = current
+
 class USBWorkerThread(QThread):
     finished = pyqtSignal(str)
     progress = pyqtSignal(str)
 
-    def __init__(self, adb_manager, app_manager, apk_manager, panel_type):
+    def __init__(self, adb_manager, app_manager, apk_manager, panel_type, max_parallel=4, serials=None,
+                 stages=None):
         super().__init__()
         self.adb_manager = adb_manager
         self.app_manager = app_manager
         self.apk_manager = apk_manager
         self.panel_type = panel_type
+        self.max_parallel = max(1, max_parallel)
+        self.multiple = False
+        # Seriais já conhecidos (modo quiosque); sem eles, os dispositivos são listados no início
+        self.serials = serials
+        # APKs do servidor de artefatos (None = pastas locais)
+        self.artifacts = None
+        # Pipeline por etapas: poucas instalações e comandos simultâneos, esperas sem limite prático.
+        # No modo quiosque o mesmo StageScheduler é compartilhado por todos os workers.
+        self.stages = stages or StageScheduler(transfer_slots=self.max_parallel, command_slots=self.max_parallel)
+        # Pedidos de reboot das etapas (reboot único por dispositivo, ao final) e quem reiniciou
+        self.reboots = RebootRequests()
+        self.rebooted = []
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Interrompe o lote: cada dispositivo para na próxima etapa (as esperas de boot são do ADBManager)"""
+        self._cancelled.set()
 
     def run(self):
         try:
-            self.progress.emit("🔍 Verificando dispositivos USB...")
-            
-            # Verificar dispositivos USB conectados
-            result = subprocess.run(
-                [self.adb_manager.adb_path, "devices"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            if result.returncode != 0:
-                self.finished.emit(f"❌ Erro ao executar 'adb devices': {result.stderr}")
-                return
-            
-            devices_output = result.stdout.strip()
-            self.progress.emit(f"📱 Saída do comando 'adb devices':\n{devices_output}")
-            
-            # Verificar se há dispositivos conectados
-            connected_devices = []
-            for line in devices_output.split('\n'):
-                if line.strip() and not line.startswith('List of devices') and '\tdevice' in line:
-                    device_id = line.split('\t')[0]
-                    connected_devices.append(device_id)
+            if self.serials:
+                connected_devices = list(self.serials)
+            else:
+                self.progress.emit("🔍 Verificando dispositivos USB...")
+
+                # Verificar dispositivos USB conectados
+                success, devices = self.adb_manager.list_devices()
+
+                if not success:
+                    self.finished.emit(f"❌ Erro ao listar dispositivos adb: {devices}")
+                    return
+
+                devices_output = "\n".join(f"{d['serial']}\t{d['state']}" for d in devices)
+                self.progress.emit(f"📱 Dispositivos adb:\n{devices_output}")
+
+                # Verificar se há dispositivos conectados
+                connected_devices = [d["serial"] for d in devices if d["state"] == "device"]
             
             if not connected_devices:
                 self.finished.emit("❌ Nenhum dispositivo USB encontrado. Conecte um dispositivo via USB.")
                 return
             
             self.progress.emit(f"✅ Dispositivos encontrados: {len(connected_devices)}")
-            
-            # Processar todos os dispositivos conectados sequencialmente
-            processed = 0
-            for idx, device_id in enumerate(connected_devices, start=1):
-                self.progress.emit(f"\n🔌 Dispositivo {idx}/{len(connected_devices)}: {device_id}")
-                
-                # CONFIGURAÇÃO RÁPIDA USB - Foco em instalação e configuração, não remoção
-                self.progress.emit("⚡ Configuração Rápida: Foco em instalação de APKs e configuração")
-                self.progress.emit("ℹ️ Para remoção de apps, use a configuração manual via Wi-Fi")
-                
-                # Instalar APKs do painel selecionado
-                apk_list = self.apk_manager.get_apk_list(self.panel_type)
-                if apk_list:
-                    self.progress.emit(f"📦 Iniciando instalação de aplicativos do {self.panel_type}...")
-                    self.progress.emit(f"📋 Total de APKs para instalar: {len(apk_list)}")
-                    
-                    installed_count = 0
-                    failed_count = 0
-                    
-                    for i, apk_path in enumerate(apk_list, 1):
-                        apk_name = os.path.basename(apk_path)
-                        self.progress.emit(f"⬇️ [{i}/{len(apk_list)}] Instalando {apk_name}...")
-                        
-                        if os.path.exists(apk_path):
-                            success, message = self.adb_manager.install_apk(apk_path, device_id)
-                            if success:
-                                self.progress.emit(f"✅ [{i}/{len(apk_list)}] {apk_name} instalado com sucesso!")
-                                installed_count += 1
-                            else:
-                                self.progress.emit(f"❌ [{i}/{len(apk_list)}] Erro ao instalar {apk_name}: {message}")
-                                failed_count += 1
-                        else:
-                            self.progress.emit(f"⚠️ [{i}/{len(apk_list)}] APK não encontrado: {apk_path}")
-                            failed_count += 1
-                    
-                    # Resumo da instalação
-                    self.progress.emit(f"📊 Resumo da instalação:")
-                    self.progress.emit(f"   ✅ Instalados com sucesso: {installed_count}")
-                    self.progress.emit(f"   ❌ Falharam: {failed_count}")
-                    self.progress.emit(f"   📦 Total processado: {len(apk_list)}")
-                else:
-                    self.progress.emit(f"⚠️ Nenhum APK encontrado para {self.panel_type}")
-                
-                # Alterar DPI para 160
-                self.progress.emit("🔧 Alterando DPI para 160...")
-                dpi_result = subprocess.run(
-                    [self.adb_manager.adb_path, "-s", device_id, "shell", "wm", "density", "160"],
-                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
-                
-                if dpi_result.returncode != 0:
-                    self.progress.emit(f"❌ Erro ao alterar DPI: {dpi_result.stderr}")
+
+            if self.apk_manager.artifact_server:
+                success, artifacts = self.apk_manager.get_artifacts(self.panel_type)
+                if success:
+                    self.artifacts = artifacts
+                    self.progress.emit(f"🌐 {len(artifacts)} APK(s) em {self.apk_manager.artifact_server}")
                 else:
-                    self.progress.emit("✅ DPI alterado com sucesso para 160!")
-                
-                # Configurar TTS para português brasileiro (apenas para painéis)
-                # DESABILITADO: Instalação automática da síntese de voz comentada
-                # if "Painel" in self.panel_type:
-                #     self.progress.emit("🗣️ Configurando síntese de voz para português brasileiro...")
-                #     
-                #     # Usar versão simplificada para evitar problemas de conexão
-                #     tts_success, tts_message = self.adb_manager.configure_tts_portuguese_brazil_simple(device_id)
-                #     if tts_success:
-                #         self.progress.emit(f"✅ {tts_message}")
-                #         self.progress.emit("ℹ️ TTS configurado: Google TTS, pt-BR, voz 5, velocidade normal")
-                #     else:
-                #         self.progress.emit(f"⚠️ Problema na configuração TTS: {tts_message}")
-                #         self.progress.emit("ℹ️ Você pode configurar manualmente: Configurações → Acessibilidade → TTS")
-                
-                # Configurar auto-start do aplicativo principal (para painéis e totem)
-                if self.panel_type in ["Painel", "Totem"]:
-                    self.progress.emit("🚀 Configurando inicialização automática do aplicativo...")
-                    
-                    autostart_success, autostart_message = self.adb_manager.configure_app_autostart(device_id, self.panel_type)
-                    if autostart_success:
-                        self.progress.emit(f"✅ {autostart_message}")
-                        self.progress.emit("ℹ️ App configurado para iniciar automaticamente no boot")
-                    else:
-                        self.progress.emit(f"⚠️ Problema na configuração de auto-start: {autostart_message}")
-                        self.progress.emit("ℹ️ Você pode configurar manualmente nas configurações do dispositivo")
-                
-                processed += 1
+                    self.progress.emit(f"⚠️ {artifacts}\nℹ️ Usando os APKs da pasta local")
+
+            # Nenhum dispositivo é alterado se algum APK do lote tiver problema
+            problems = self.preflight(connected_devices)
+            if problems:
+                self.progress.emit("❌ Pré-verificação falhou:\n" + "\n".join(f"   • {problem}" for problem in problems))
+                self.finished.emit("❌ Nenhum dispositivo foi alterado. Corrija os APKs e tente novamente.")
+                return
+            
+            # Todos os dispositivos andam em pipeline: cada etapa tem suas vagas (instalação
+            # até max_parallel por vez), e as esperas de um se sobrepõem ao trabalho dos outros
+            self.multiple = len(connected_devices) > 1
+            total = len(connected_devices)
+            started = time.monotonic()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(StageScheduler.max_in_flight, total)) as executor:
+                results = list(executor.map(
+                    lambda item: self.provision_device(item[0], total, item[1]),
+                    enumerate(connected_devices, start=1)
+                ))
+            processed = sum(1 for done in results if done)
+            self.progress.emit(f"⏱️ {StageScheduler.throughput(total, time.monotonic() - started)}")
             
-            # Mensagem final sobre o reboot - agora é feito automaticamente pelo auto-start
+            # Mensagem final sobre o reboot - um único reboot por dispositivo, ao final
             self.progress.emit("ℹ️ Configuração concluída!")
-            if "Painel" in self.panel_type:
-                self.progress.emit("💡 O dispositivo foi reiniciado automaticamente para testar o auto-start.")
-                self.progress.emit("💡 Aguarde o boot completo e verifique se o painel inicia sozinho.")
+            if not self.rebooted:
+                self.progress.emit("💡 Nenhum dispositivo precisou reiniciar.")
             else:
-                self.progress.emit("💡 O dispositivo foi reiniciado automaticamente para testar o auto-start.")
+                self.progress.emit(f"💡 {len(self.rebooted)} dispositivo(s) reiniciado(s) uma única vez, ao final, para testar o auto-start.")
+                self.progress.emit("💡 O resultado de cada dispositivo indica se o app abriu sozinho após o boot.")
             
             self.finished.emit(f"🎉 Configuração do {self.panel_type} concluída para {processed} dispositivo(s)!")
                 
         except Exception as e:
             self.finished.emit(f"❌ Erro inesperado: {str(e)}")
 
+    def log(self, device_id, text):
+        """Progresso de um dispositivo; com vários em paralelo, cada linha leva o serial"""
+        if self.multiple:
+            text = "\n".join(f"[{device_id}] {line}" if line else line for line in text.split("\n"))
+        self.progress.emit(text)
+
+    def preflight(self, devices):
+        """Confere todos os APKs do perfil antes de tocar nos dispositivos; retorna a lista de problemas"""
+        self.progress.emit("🧪 Pré-verificação dos APKs...")
+        if self.artifacts is not None:
+            checks = [{"path": artifact["name"], "missing": False, "error": None,
+                       "package": artifact["package"], "min_sdk": artifact["min_sdk"]}
+                      for artifact in self.artifacts]
+        else:
+            checks = self.apk_manager.apk_index.preflight(self.apk_manager.get_apk_list(self.panel_type))
+
+        # Só os APKs opcionais do perfil (ex.: sintese.apk no Totem) podem faltar; os demais impedem o lote
+        missing = [os.path.basename(check["path"]) for check in checks if check["missing"]]
+        optional = [name for name in missing if self.apk_manager.is_optional(self.panel_type, name)]
+        if optional:
+            self.progress.emit(f"⚠️ APK(s) opcionais não encontrados, serão ignorados: {', '.join(optional)}")
+
+        problems = [f"{name}: APK não encontrado" for name in missing if name not in optional]
+        problems += [f"{os.path.basename(check['path'])}: {check['error']}" for check in checks if check["error"]]
+        # O app principal tem de estar no lote (índices do servidor sem "package" não dá para conferir)
+        main_package = MAIN_APP_PACKAGES.get(self.panel_type)
+        packages = [check["package"] for check in checks if not check["missing"]]
+        if main_package and not problems and all(packages) and main_package not in packages:
+            problems.append(f"Nenhum APK do lote contém o app principal {main_package}")
+        min_sdks = [(os.path.basename(check["path"]), check["min_sdk"]) for check in checks if check["min_sdk"]]
+        if min_sdks:
+            # Versões do Android da frota (os retratos ficam em cache para a configuração)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_parallel, len(devices))) as executor:
+                snapshots = list(executor.map(self.adb_manager.get_device_snapshot, devices))
+            for device_id, snapshot in zip(devices, snapshots):
+                sdk_int = snapshot.sdk_int if snapshot else None
+                if sdk_int is None:
+                    continue
+                for apk_name, min_sdk in min_sdks:
+                    if sdk_int < min_sdk:
+                        problems.append(f"{apk_name} exige Android API {min_sdk}, mas {device_id} tem API {sdk_int}")
+
+        if not problems:
+            self.progress.emit(f"✅ {len(checks) - len(missing)} APK(s) verificados")
+        return problems
+
+    def desired_apks(self, apk_list):
+        """Pacote e versão de cada APK do perfil, para o DesiredState"""
+        if self.artifacts is not None:
+            return apk_list
+        apks = []
+        for apk_path in apk_list:
+            info = self.apk_manager.get_apk_info(apk_path) or {}  # Sem manifesto legível: instala normalmente
+            apks.append({"package": info.get("package"), "version_code": info.get("version_code"),
+                         "version_name": info.get("version_name")})
+        return apks
+
+    def install_local_apks(self, device_id, apk_list, desired_apks, pending):
+        """Instala os APKs da pasta local nas posições `pending`; retorna (instalados, ignorados, falhas)"""
+        installed_count = 0
+        failed_count = 0
+        skipped_count = 0
+        
+        positions = {}
+        for i, apk_path in enumerate(apk_list, 1):
+            apk_name = os.path.basename(apk_path)
+            manifest = desired_apks[i - 1]
+            if i - 1 not in pending:
+                self.log(device_id, f"⏭️ [{i}/{len(apk_list)}] {apk_name} já instalado na versão {manifest['version_name'] or manifest['version_code']} (ignorado)")
+                skipped_count += 1
+            elif os.path.exists(apk_path):
+                positions[apk_path] = i
+            else:
+                self.log(device_id, f"⚠️ [{i}/{len(apk_list)}] APK não encontrado: {apk_path}")
+                failed_count += 1
+
+        # Os APKs restantes vão em uma única sessão do gerenciador de pacotes quando possível
+        if positions:
+            names = ", ".join(os.path.basename(apk_path) for apk_path in positions)
+            self.log(device_id, f"⬇️ Instalando {names}...")
+            snapshot = self.adb_manager.get_device_snapshot(device_id)
+            results = self.adb_manager.install_apks(list(positions), device_id,
+                                                    snapshot.sdk_int if snapshot else None)
+            for apk_path, success, message, rate in results:
+                i = positions[apk_path]
+                apk_name = os.path.basename(apk_path)
+                if success:
+                    speed = f" ({rate:.1f} MB/s)" if rate else ""
+                    self.log(device_id, f"✅ [{i}/{len(apk_list)}] {apk_name} instalado com sucesso!{speed}")
+                    installed_count += 1
+                else:
+                    self.log(device_id, f"❌ [{i}/{len(apk_list)}] Erro ao instalar {apk_name}: {message}")
+                    failed_count += 1
+
+        return installed_count, skipped_count, failed_count
+
+    def install_artifacts(self, device_id, artifacts, pending):
+        """Instala em streaming os APKs do servidor nas posições `pending`; retorna (instalados, ignorados, falhas)"""
+        installed_count = 0
+        failed_count = 0
+        skipped_count = 0
+
+        for i, artifact in enumerate(artifacts, 1):
+            name = artifact["name"]
+            if i - 1 not in pending:
+                self.log(device_id, f"⏭️ [{i}/{len(artifacts)}] {name} já instalado na versão {artifact['version_name'] or artifact['version_code']} (ignorado)")
+                skipped_count += 1
+                continue
+
+            self.log(device_id, f"⬇️ Instalando {name} do servidor...")
+            success, message = self.adb_manager.install_apk_from_url(artifact, device_id)
+            rate = self.adb_manager.transfer_scheduler.take_rate(device_id)
+            if success:
+                speed = f" ({rate:.1f} MB/s)" if rate else ""
+                self.log(device_id, f"✅ [{i}/{len(artifacts)}] {name} instalado com sucesso!{speed}")
+                installed_count += 1
+            else:
+                self.log(device_id, f"❌ [{i}/{len(artifacts)}] Erro ao instalar {name}: {message}")
+                failed_count += 1
+
+        return installed_count, skipped_count, failed_count
+
+    def provision_device(self, idx, total, device_id):
+        """Instala os APKs, ajusta o DPI e configura o auto-start de um dispositivo USB"""
+        try:
+            self.progress.emit(f"\n🔌 Dispositivo {idx}/{total}: {device_id}")
+
+            # CONFIGURAÇÃO RÁPIDA USB - Foco em instalação e configuração, não remoção
+            self.log(device_id, "⚡ Configuração Rápida: Foco em instalação de APKs e configuração")
+            self.log(device_id, "ℹ️ Para remoção de apps, use a configuração manual via Wi-Fi")
+            
+            # Estado desejado do perfil x estado atual (um lote de consultas): só as diferenças são aplicadas
+            apk_list = self.artifacts if self.artifacts is not None else self.apk_manager.get_apk_list(self.panel_type)
+            desired_apks = self.desired_apks(apk_list)
+            with self.stages.stage("snapshot"):
+                snapshot = self.adb_manager.get_device_snapshot(device_id)
+                desired = DesiredState(dpi=160, apks=desired_apks, main_package=MAIN_APP_PACKAGES.get(self.panel_type),
+                                       android_major=snapshot.android_major if snapshot else None)
+                plan = desired.diff(self.adb_manager.read_device_state(device_id, desired))
+            self.log(device_id, f"🧭 Diferenças: {plan.describe()}")
+
+            if self._cancelled.is_set():
+                return False
+
+            # Instalar APKs do painel selecionado (servidor de artefatos ou pasta local)
+            if apk_list:
+                self.log(device_id, f"📦 Iniciando instalação de aplicativos do {self.panel_type}...")
+                self.log(device_id, f"📋 Total de APKs para instalar: {len(apk_list)}")
+
+                pending = set(plan.install)
+                with self.stages.stage("install"):
+                    if self.artifacts is not None:
+                        installed_count, skipped_count, failed_count = self.install_artifacts(device_id, apk_list, pending)
+                    else:
+                        installed_count, skipped_count, failed_count = self.install_local_apks(
+                            device_id, apk_list, desired_apks, pending)
+
+                # Resumo da instalação
+                self.log(device_id, f"📊 Resumo da instalação:")
+                self.log(device_id, f"   ✅ Instalados com sucesso: {installed_count}")
+                self.log(device_id, f"   ⏭️ Já atualizados: {skipped_count}")
+                self.log(device_id, f"   ❌ Falharam: {failed_count}")
+                self.log(device_id, f"   📦 Total processado: {len(apk_list)}")
+            else:
+                self.log(device_id, f"⚠️ Nenhum APK encontrado para {self.panel_type}")
+            
+            if self._cancelled.is_set():
+                return False
+
+            # Alterar DPI para 160
+            if not plan.dpi:
+                self.log(device_id, "⏭️ DPI já está em 160")
+            else:
+                self.log(device_id, "🔧 Alterando DPI para 160...")
+                with self.stages.stage("settings"):
+                    dpi_result = self.adb_manager.shell(device_id, ["wm", "density", "160"])
+                self.adb_manager.invalidate_snapshot(device_id)
+
+                if dpi_result.returncode != 0:
+                    self.log(device_id, f"❌ Erro ao alterar DPI: {dpi_result.stderr}")
+                else:
+                    self.log(device_id, "✅ DPI alterado com sucesso para 160!")
+            
+            # Configurar TTS para português brasileiro (apenas para painéis)
+            # DESABILITADO: Instalação automática da síntese de voz comentada
+            # if "Painel" in self.panel_type:
+            #     self.log(device_id, "🗣️ Configurando síntese de voz para português brasileiro...")
+            #     
+            #     # Usar versão simplificada para evitar problemas de conexão
+            #     tts_success, tts_message = self.adb_manager.configure_tts_portuguese_brazil_simple(device_id)
+            #     if tts_success:
+            #         self.log(device_id, f"✅ {tts_message}")
+            #         self.log(device_id, "ℹ️ TTS configurado: Google TTS, pt-BR, voz 5, velocidade normal")
+            #     else:
+            #         self.log(device_id, f"⚠️ Problema na configuração TTS: {tts_message}")
+            #         self.log(device_id, "ℹ️ Você pode configurar manualmente: Configurações → Acessibilidade → TTS")
+            
+            if self._cancelled.is_set():
+                return False
+
+            # Configurar auto-start do aplicativo principal (para painéis e totem)
+            if self.panel_type in ["Painel", "Totem"] and not (plan.autostart or plan.reboot):
+                self.log(device_id, "⏭️ Auto-start já configurado - nenhuma alteração, sem reiniciar")
+            elif self.panel_type in ["Painel", "Totem"]:
+                self.log(device_id, "🚀 Configurando inicialização automática do aplicativo...")
+                
+                # Pede o reboot de teste do auto-start só se algo mudou de fato no dispositivo
+                autostart_success, autostart_message = self.adb_manager.configure_app_autostart(
+                    device_id, self.panel_type, commands=plan.autostart, restart=plan.reboot,
+                    reboots=self.reboots, stages=self.stages)
+                if autostart_success:
+                    self.log(device_id, f"✅ {autostart_message}")
+                    self.log(device_id, "ℹ️ App configurado para iniciar automaticamente no boot")
+                else:
+                    self.log(device_id, f"⚠️ Problema na configuração de auto-start: {autostart_message}")
+                    self.log(device_id, "ℹ️ Você pode configurar manualmente nas configurações do dispositivo")
+
+            # Um único reboot ao final, se alguma etapa pediu, esperando o boot (e o app) voltar
+            if self.reboots.pending(device_id) and not self._cancelled.is_set():
+                self.log(device_id, "🔄 Reiniciando (uma vez, ao final)...")
+                rebooted, ready, message = self.adb_manager.finalize_reboot(device_id, self.reboots, self.stages)
+                if rebooted:
+                    self.rebooted.append(device_id)
+                self.log(device_id, f"✅ {message}" if ready else f"⚠️ {message}")
+
+            return True
+        except Exception as e:
+            self.reboots.pop(device_id)
+            self.log(device_id, f"❌ Erro inesperado: {str(e)}")
+            return False
+
 class AppListDialog(QDialog):
     def __init__(self, parent, adb_manager, ip_address):
         super().__init__(parent)
@@ -1081,17 +4075,20 @@ class AppListDialog(QDialog):
     def load_apps(self):
         try:
             # Conectar ao dispositivo
-            if not self.adb_manager.connect(self.ip_address):
+            status = self.adb_manager.ensure_connected(self.ip_address)
+            if status == CONNECTION_UNREACHABLE:
+                self.show_message_box("Erro", "Dispositivo inacessível. Verifique se está ligado e se o IP está correto.", "critical")
+                return
+            if status != CONNECTION_OK:
                 self.show_message_box("Erro", "Não foi possível conectar ao dispositivo.", "critical")
                 return
 
             # Obter lista de aplicativos instalados
-            result = subprocess.run(
-                [self.adb_manager.adb_path, "-s", f"{self.ip_address}:{self.adb_manager.port}", 
-                 "shell", "pm", "list", "packages", "-f"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
+            result = self.adb_manager.shell(
+                f"{self.ip_address}:{self.adb_manager.port}", ["pm", "list", "packages", "-f"]
             )
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
 
             apps = result.stdout.strip().split('\n')
             for app in apps:
@@ -1100,7 +4097,7 @@ class AppListDialog(QDialog):
                     self.app_list.addItem(package_name)
 
         except subprocess.CalledProcessError as e:
-            self.show_message_box("Erro", f"Erro ao carregar aplicativos: {e.stderr.decode()}", "critical")
+            self.show_message_box("Erro", f"Erro ao carregar aplicativos: {e.stderr}", "critical")
         except Exception as e:
             self.show_message_box("Erro", f"Erro inesperado: {str(e)}", "critical")
 
@@ -1285,8 +4282,23 @@ class ConfiguradorDPI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.adb_manager = ADBManager()
+        self.loop_bridge = AsyncLoopBridge()
+        self.async_adb_manager = AsyncADBManager(self.adb_manager)
+        # Modo quiosque (USB): acompanhamento contínuo e configurações em andamento por serial
+        self.device_watcher = None
+        self.worker = None
+        self.usb_worker = None
+        self.connect_worker = None
+        self.scan_worker = None
+        # Threads já paradas, mantidas vivas até o sinal finished (destruir uma QThread rodando aborta)
+        self.retired_threads = set()
+        self.kiosk_workers = {}
+        self.kiosk_stages = None
+        self.kiosk_finished = {}
+        self.kiosk_cooldown = 180
         self.app_manager = AppManager()
         self.apk_manager = APKManager()
+        self.adb_manager.apk_index = self.apk_manager.apk_index
         self.update_manager = UpdateManager()  # Adicionar gerenciador de atualizações
         
         # Controles para evitar verificações múltiplas
@@ -1295,8 +4307,60 @@ class ConfiguradorDPI(QMainWindow):
         
         self.load_settings()
         self.init_ui()
+        self.setup_apk_index_watcher()
         self.setup_auto_update_check()  # Configurar verificação automática
 
+    def setup_apk_index_watcher(self):
+        """Mantém o índice de APKs atualizado quando arquivos mudam nas pastas de APKs"""
+        self.apk_index_thread = None
+        self.apk_index_pending = False
+        self.apk_watcher = QFileSystemWatcher(self)
+        self.apk_watcher.addPaths([path for path in self.apk_manager.get_watch_paths() if os.path.isdir(path)])
+        self.apk_watcher.directoryChanged.connect(lambda path: self.apk_index_timer.start())
+
+        # Agrupar rajadas de eventos (cópia de um APK grande gera vários)
+        self.apk_index_timer = QTimer(self)
+        self.apk_index_timer.setSingleShot(True)
+        self.apk_index_timer.setInterval(1500)
+        self.apk_index_timer.timeout.connect(self.refresh_apk_index)
+        self.refresh_apk_index()
+
+    def refresh_apk_index(self):
+        if self.apk_index_thread and self.apk_index_thread.isRunning():
+            self.apk_index_pending = True
+            return
+        self.apk_index_pending = False
+        self.apk_index_thread = APKIndexThread(self.apk_manager)
+        self.apk_index_thread.finished.connect(self.on_apk_index_refreshed)
+        self.apk_index_thread.start()
+
+    def on_apk_index_refreshed(self, changed):
+        if self.apk_index_pending:
+            self.refresh_apk_index()
+
+    def closeEvent(self, event):
+        """Cancela os trabalhos em andamento e espera todas as threads antes de encerrar o event loop"""
+        self.adb_manager.cancelled.set()
+        usb_workers = [self.usb_worker, *self.kiosk_workers.values()]
+        for worker in usb_workers:
+            if worker:
+                worker.cancel()
+        watchers = [self.device_watcher, *self.retired_threads]
+        for watcher in watchers:
+            if watcher:
+                watcher.stop()
+        # As threads Wi-Fi, de conexão e de busca saem assim que suas tarefas no loop são canceladas
+        self.loop_bridge.cancel_all()
+        # Sessões fechadas interrompem comandos longos dos workers USB
+        self.adb_manager.close_all_sessions()
+        threads = [self.worker, self.connect_worker, self.scan_worker, self.apk_index_thread, *usb_workers, *watchers]
+        for thread in threads:
+            if thread:
+                thread.wait()
+        self.adb_manager.close_all_sessions()
+        self.loop_bridge.stop()
+        super().closeEvent(event)
+
     def setup_auto_update_check(self):
         """Configura a verificação automática de atualizações"""
         # Timer para verificar atualizações na inicialização (após 5 segundos)
@@ -1376,32 +4440,59 @@ class ConfiguradorDPI(QMainWindow):
             self.result_text.append("✅ Você está usando a versão mais recente!")
 
     def load_settings(self):
+        self.saved_devices = []
+        self.default_dpi = "160"
+        self.max_parallel_devices = 4
+        self.last_subnet = "10.0.0.0/24"
+        self.wifi_rate_mb = TransferScheduler.DEFAULT_GLOBAL_RATE // (1024 * 1024)
         try:
-            if os.path.exists('settings.txt'):
-                with open('settings.txt', 'r') as f:
-                    lines = f.readlines()
-                    self.last_ip = lines[0].strip() if len(lines) > 0 else "10.0.0."
-                    self.last_dpi = lines[1].strip() if len(lines) > 1 else "160"
-                    self.last_ip2 = lines[2].strip() if len(lines) > 2 else "10.0.0."
-                    self.last_dpi2 = lines[3].strip() if len(lines) > 3 else "160"
-            else:
-                self.last_ip = "10.0.0."
-                self.last_dpi = "160"
-                self.last_ip2 = "10.0.0."
-                self.last_dpi2 = "160"
+            if not os.path.exists('settings.txt'):
+                return
+            with open('settings.txt', 'r') as f:
+                lines = [line.strip() for line in f]
+
+            if not any("=" in line or "," in line for line in lines):
+                # Formato antigo: ip1, dpi1, ip2, dpi2 e simultâneos, um por linha
+                pairs = zip(lines[0:4:2], lines[1:4:2])
+                self.saved_devices = parse_device_list("\n".join(f"{ip},{dpi}" for ip, dpi in pairs),
+                                                       self.default_dpi)
+                if len(lines) > 4 and lines[4].isdigit():
+                    self.max_parallel_devices = int(lines[4])
+                return
+
+            for line in lines:
+                key, separator, value = line.partition("=")
+                if separator and key == "parallel" and value.isdigit():
+                    self.max_parallel_devices = int(value)
+                elif separator and key == "dpi" and value.isdigit():
+                    self.default_dpi = value
+                elif separator and key == "subnet" and value:
+                    self.last_subnet = value
+                elif separator and key == "artifacts":
+                    self.apk_manager.artifact_server = value
+                elif separator and key == "channel":
+                    self.apk_manager.channel = value
+                elif separator and key == "store_mb" and value.isdigit():
+                    self.apk_manager.artifact_store.max_bytes = int(value) * 1024 * 1024
+                elif separator and key == "wifi_mb" and value.isdigit():
+                    self.wifi_rate_mb = int(value)
+            self.saved_devices = parse_device_list("\n".join(line for line in lines if "=" not in line),
+                                                   self.default_dpi)
         except:
-            self.last_ip = "10.0.0."
-            self.last_dpi = "160"
-            self.last_ip2 = "10.0.0."
-            self.last_dpi2 = "160"
+            pass
 
     def save_settings(self):
         try:
             with open('settings.txt', 'w') as f:
-                f.write(f"{self.ip_entry1.text()}\n")
-                f.write(f"{self.dpi_entry1.text()}\n")
-                f.write(f"{self.ip_entry2.text()}\n")
-                f.write(f"{self.dpi_entry2.text()}\n")
+                f.write(f"parallel={self.parallel_spin.value()}\n")
+                f.write(f"dpi={self.default_dpi_entry.text()}\n")
+                f.write(f"subnet={self.subnet_entry.text()}\n")
+                f.write(f"artifacts={self.artifact_server_entry.text().strip()}\n")
+                f.write(f"channel={self.apk_manager.channel}\n")
+                f.write(f"store_mb={self.apk_manager.artifact_store.max_bytes // (1024 * 1024)}\n")
+                f.write(f"wifi_mb={self.wifi_rate_spin.value()}\n")
+                for ip, dpi in self.fleet_model.devices():
+                    f.write(f"{ip},{dpi}\n")
         except:
             pass
 
@@ -1624,108 +4715,119 @@ class ConfiguradorDPI(QMainWindow):
         self._apply_card_effect(devices_group)
         devices_layout = QVBoxLayout(devices_group)
         
-        # Container para os dois dispositivos
-        devices_container = QHBoxLayout()
-        
-        # Dispositivo 1
-        device1_group = QGroupBox("Dispositivo 1")
-        device1_group.setStyleSheet(
-            "QGroupBox{border:1px solid #3a4056; border-radius:8px; margin-top:6px; padding-top:2px;}"
-            " QGroupBox::title{subcontrol-origin: margin; left:10px; top:-4px; color:#c8cbe0;}"
-        )
-        device1_layout = QVBoxLayout(device1_group)
-        
-        # Status do dispositivo 1 (em cima)
-        self.status_label1 = QLabel("Dispositivo não conectado")
-        self.status_label1.setMinimumHeight(32)
-        self.status_label1.setObjectName("status")
-        self.status_label1.setStyleSheet("color: #ff6b6b; background-color: #1a1d26; padding: 6px; border-radius: 4px; margin-bottom: 8px;")
-        device1_layout.addWidget(self.status_label1)
-        
-        # Layout horizontal para IP e DPI do dispositivo 1
-        device1_horizontal = QHBoxLayout()
-        
-        # IP do dispositivo 1
-        ip_layout1 = QVBoxLayout()
-        ip_label1 = QLabel("Endereço IP:")
-        self.ip_entry1 = QLineEdit()
-        self.ip_entry1.setMinimumWidth(200)
-        self.ip_entry1.setMinimumHeight(38)
-        self.ip_entry1.setText(self.last_ip)
-        ip_layout1.addWidget(ip_label1)
-        ip_layout1.addWidget(self.ip_entry1)
-        device1_horizontal.addLayout(ip_layout1)
-        
-        # DPI do dispositivo 1
-        dpi_layout1 = QVBoxLayout()
-        dpi_label1 = QLabel("DPI:")
-        self.dpi_entry1 = QLineEdit()
-        self.dpi_entry1.setText(self.last_dpi)
-        self.dpi_entry1.setMinimumHeight(38)
-        self.dpi_entry1.setMaximumWidth(80)
-        dpi_layout1.addWidget(dpi_label1)
-        dpi_layout1.addWidget(self.dpi_entry1)
-        device1_horizontal.addLayout(dpi_layout1)
-        
-        device1_layout.addLayout(device1_horizontal)
-        devices_container.addWidget(device1_group)
-        
-        # Dispositivo 2
-        device2_group = QGroupBox("Dispositivo 2")
-        device2_group.setStyleSheet(
-            "QGroupBox{border:1px solid #3a4056; border-radius:8px; margin-top:6px; padding-top:2px;}"
-            " QGroupBox::title{subcontrol-origin: margin; left:10px; top:-4px; color:#c8cbe0;}"
-        )
-        device2_layout = QVBoxLayout(device2_group)
-        
-        # Status do dispositivo 2 (em cima)
-        self.status_label2 = QLabel("Dispositivo não conectado")
-        self.status_label2.setMinimumHeight(32)
-        self.status_label2.setObjectName("status")
-        self.status_label2.setStyleSheet("color: #ff6b6b; background-color: #1a1d26; padding: 6px; border-radius: 4px; margin-bottom: 8px;")
-        device2_layout.addWidget(self.status_label2)
-        
-        # Layout horizontal para IP e DPI do dispositivo 2
-        device2_horizontal = QHBoxLayout()
-        
-        # IP do dispositivo 2
-        ip_layout2 = QVBoxLayout()
-        ip_label2 = QLabel("Endereço IP:")
-        self.ip_entry2 = QLineEdit()
-        self.ip_entry2.setMinimumWidth(200)
-        self.ip_entry2.setMinimumHeight(38)
-        self.ip_entry2.setText(self.last_ip2)
-        ip_layout2.addWidget(ip_label2)
-        ip_layout2.addWidget(self.ip_entry2)
-        device2_horizontal.addLayout(ip_layout2)
-        
-        # DPI do dispositivo 2
-        dpi_layout2 = QVBoxLayout()
-        dpi_label2 = QLabel("DPI:")
-        self.dpi_entry2 = QLineEdit()
-        self.dpi_entry2.setText(self.last_dpi2)
-        self.dpi_entry2.setMinimumHeight(38)
-        self.dpi_entry2.setMaximumWidth(80)
-        dpi_layout2.addWidget(dpi_label2)
-        dpi_layout2.addWidget(self.dpi_entry2)
-        device2_horizontal.addLayout(dpi_layout2)
-        
-        device2_layout.addLayout(device2_horizontal)
-        devices_container.addWidget(device2_group)
-        
-        devices_layout.addLayout(devices_container)
+        # Entrada rápida de um dispositivo e importação em lote
+        entry_layout = QHBoxLayout()
+
+        ip_label = QLabel("Endereço IP:")
+        entry_layout.addWidget(ip_label)
+        self.new_ip_entry = QLineEdit()
+        self.new_ip_entry.setMinimumWidth(200)
+        self.new_ip_entry.setMinimumHeight(38)
+        self.new_ip_entry.setPlaceholderText("10.0.0.")
+        self.new_ip_entry.returnPressed.connect(self.add_device_row)
+        entry_layout.addWidget(self.new_ip_entry)
+
+        dpi_label = QLabel("DPI:")
+        entry_layout.addWidget(dpi_label)
+        self.default_dpi_entry = QLineEdit()
+        self.default_dpi_entry.setText(self.default_dpi)
+        self.default_dpi_entry.setMinimumHeight(38)
+        self.default_dpi_entry.setMaximumWidth(80)
+        entry_layout.addWidget(self.default_dpi_entry)
+
+        add_button = QPushButton("Adicionar")
+        add_button.clicked.connect(self.add_device_row)
+        entry_layout.addWidget(add_button)
+
+        paste_button = QPushButton("Colar IPs")
+        paste_button.clicked.connect(self.paste_devices)
+        entry_layout.addWidget(paste_button)
+
+        import_button = QPushButton("Importar CSV")
+        import_button.clicked.connect(self.import_devices_csv)
+        entry_layout.addWidget(import_button)
+
+        devices_layout.addLayout(entry_layout)
+
+        # Descoberta automática na rede local
+        scan_layout = QHBoxLayout()
+        scan_label = QLabel("Rede:")
+        scan_layout.addWidget(scan_label)
+        self.subnet_entry = QLineEdit()
+        self.subnet_entry.setText(self.last_subnet)
+        self.subnet_entry.setMinimumHeight(38)
+        self.subnet_entry.setMaximumWidth(180)
+        scan_layout.addWidget(self.subnet_entry)
+        self.scan_button = QPushButton("Procurar na Rede")
+        self.scan_button.clicked.connect(self.scan_network)
+        scan_layout.addWidget(self.scan_button)
+        scan_layout.addStretch()
+        devices_layout.addLayout(scan_layout)
+
+        # Tabela de dispositivos (IP e DPI editáveis)
+        self.fleet_model = FleetTableModel(self)
+        self.fleet_model.add_devices(self.saved_devices)
+        self.fleet_table = QTableView()
+        self.fleet_table.setModel(self.fleet_model)
+        self.fleet_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.fleet_table.setMinimumHeight(220)
+        header = self.fleet_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.fleet_table.verticalHeader().setDefaultSectionSize(26)
+        devices_layout.addWidget(self.fleet_table)
+
+        table_buttons = QHBoxLayout()
+        remove_button = QPushButton("Remover Selecionados")
+        remove_button.clicked.connect(self.remove_selected_devices)
+        table_buttons.addWidget(remove_button)
+
+        clear_button = QPushButton("Limpar Lista")
+        clear_button.clicked.connect(self.clear_devices)
+        table_buttons.addWidget(clear_button)
+
+        self.devices_count_label = QLabel()
+        table_buttons.addWidget(self.devices_count_label)
+        table_buttons.addStretch()
+        devices_layout.addLayout(table_buttons)
+
+        self.fleet_model.rowsInserted.connect(self.update_devices_count)
+        self.fleet_model.rowsRemoved.connect(self.update_devices_count)
+        self.fleet_model.modelReset.connect(self.update_devices_count)
+        self.update_devices_count()
         
         # Botões de conexão
         buttons_layout = QHBoxLayout()
         
-        connect_button = QPushButton("Conectar aos Dispositivos")
-        connect_button.clicked.connect(self.connect_all_devices)
-        buttons_layout.addWidget(connect_button)
+        self.connect_button = QPushButton("Conectar aos Dispositivos")
+        self.connect_button.clicked.connect(self.connect_all_devices)
+        buttons_layout.addWidget(self.connect_button)
         
         usb_button = QPushButton("USB")
         usb_button.setObjectName("usb")
         usb_button.clicked.connect(self.connect_usb_device)
         buttons_layout.addWidget(usb_button)
+
+        # Vagas das etapas de instalação/comando; esperas de boot de todos os dispositivos se sobrepõem
+        parallel_label = QLabel("Simultâneos:")
+        buttons_layout.addWidget(parallel_label)
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(1, 64)
+        self.parallel_spin.setValue(self.max_parallel_devices)
+        self.parallel_spin.setMinimumHeight(38)
+        buttons_layout.addWidget(self.parallel_spin)
+
+        # Banda total das transferências de APK para dispositivos Wi-Fi (0 = sem limite)
+        buttons_layout.addWidget(QLabel("Wi-Fi MB/s:"))
+        self.wifi_rate_spin = QSpinBox()
+        self.wifi_rate_spin.setRange(0, 1000)
+        self.wifi_rate_spin.setSpecialValueText("Sem limite")
+        self.wifi_rate_spin.setValue(self.wifi_rate_mb)
+        self.wifi_rate_spin.setMinimumHeight(38)
+        self.wifi_rate_spin.valueChanged.connect(
+            lambda value: self.adb_manager.transfer_scheduler.set_global_rate(value * 1024 * 1024))
+        self.adb_manager.transfer_scheduler.set_global_rate(self.wifi_rate_mb * 1024 * 1024)
+        buttons_layout.addWidget(self.wifi_rate_spin)
         
         devices_layout.addLayout(buttons_layout)
         
@@ -1922,6 +5024,26 @@ class ConfiguradorDPI(QMainWindow):
         info_label = QLabel(f"Pasta: {self.apk_manager.get_base_path()}")
         info_label.setStyleSheet("color: #aeb2c0; font-size: 10px; font-style: italic;")
         right_layout.addWidget(info_label)
+
+        # Servidor HTTP de APKs na rede local (instalação em streaming, sem cópia para a pasta)
+        self.artifact_server_entry = QLineEdit(self.apk_manager.artifact_server)
+        self.artifact_server_entry.setPlaceholderText("Servidor de APKs (http://..., opcional)")
+        self.artifact_server_entry.textChanged.connect(
+            lambda text: setattr(self.apk_manager, "artifact_server", text.strip()))
+        right_layout.addWidget(self.artifact_server_entry)
+
+        # Canal de versões do repositório local (vazio = arquivos da pasta)
+        channel_layout = QHBoxLayout()
+        channel_layout.addWidget(QLabel("Canal:"))
+        self.channel_combo = QComboBox()
+        self.reload_channels()
+        self.channel_combo.currentIndexChanged.connect(self.on_channel_changed)
+        channel_layout.addWidget(self.channel_combo, 1)
+        save_channel_button = QPushButton("Salvar como Canal")
+        save_channel_button.setStyleSheet("background: #32384a; font-size: 12px; padding: 8px 14px;")
+        save_channel_button.clicked.connect(self.save_apk_channel)
+        channel_layout.addWidget(save_channel_button)
+        right_layout.addLayout(channel_layout)
         
         # Botões na horizontal
         buttons_layout = QHBoxLayout()
@@ -1939,6 +5061,11 @@ class ConfiguradorDPI(QMainWindow):
         buttons_layout.addWidget(usb_button)
         
         right_layout.addLayout(buttons_layout)
+
+        # Modo quiosque: configurar cada dispositivo assim que for plugado
+        self.kiosk_checkbox = QCheckBox("Modo quiosque (configurar ao plugar)")
+        self.kiosk_checkbox.toggled.connect(self.toggle_kiosk_mode)
+        right_layout.addWidget(self.kiosk_checkbox)
         
         # Adicionar ao layout principal
         main_layout.addLayout(left_layout)
@@ -2019,64 +5146,158 @@ class ConfiguradorDPI(QMainWindow):
         import webbrowser
         webbrowser.open(url)
 
+    def current_dpi_default(self):
+        dpi = self.default_dpi_entry.text().strip()
+        return dpi if dpi.isdigit() else "160"
+
+    def import_device_text(self, text):
+        devices = parse_device_list(text, self.current_dpi_default())
+        if not devices:
+            self.result_text.append("Nenhum IP válido encontrado.")
+            return
+        added = self.fleet_model.add_devices(devices)
+        self.result_text.append(f"{added} dispositivo(s) adicionado(s), {len(devices) - added} já estavam na lista.")
+        self.save_settings()
+
+    def add_device_row(self):
+        text = self.new_ip_entry.text().strip()
+        if not parse_device_list(text, self.current_dpi_default()):
+            self.show_message_box("Aviso", "Endereço IP inválido.", "warning")
+            return
+        self.import_device_text(text)
+        self.new_ip_entry.clear()
+
+    def paste_devices(self):
+        """Importa IPs da área de transferência (um por linha, DPI opcional após vírgula ou tab)"""
+        self.import_device_text(QApplication.clipboard().text())
+
+    def import_devices_csv(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Importar lista de dispositivos", "",
+                                                   "CSV (*.csv);;Texto (*.txt);;Todos os arquivos (*)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig') as f:
+                self.import_device_text(f.read())
+        except Exception as e:
+            self.show_message_box("Erro", f"Erro ao importar arquivo: {str(e)}", "critical")
+
+    def selected_device_rows(self):
+        return sorted({index.row() for index in self.fleet_table.selectionModel().selectedRows()})
+
+    def remove_selected_devices(self):
+        self.fleet_model.remove_rows(self.selected_device_rows())
+        self.save_settings()
+
+    def clear_devices(self):
+        self.fleet_model.clear()
+        self.save_settings()
+
+    def update_devices_count(self, *args):
+        self.devices_count_label.setText(f"{self.fleet_model.rowCount()} dispositivo(s)")
+
+    def scan_network(self):
+        # A thread anterior pode ainda estar terminando após emitir o resultado
+        if self.scan_worker and self.scan_worker.isRunning():
+            return
+        try:
+            network = ipaddress.IPv4Network(self.subnet_entry.text().strip(), strict=False)
+        except ValueError:
+            self.show_message_box("Aviso", "Rede inválida. Use o formato 10.0.0.0/24.", "warning")
+            return
+        if network.prefixlen < 16:
+            self.show_message_box("Aviso", "Rede muito grande. Use no máximo uma /16.", "warning")
+            return
+
+        self.save_settings()
+        self.scan_button.setEnabled(False)
+        self.scan_button.setText("Procurando...")
+
+        self.scan_worker = ScanWorkerThread(self.async_adb_manager, self.loop_bridge, network,
+                                            max_parallel=max(8, self.parallel_spin.value()))
+        self.scan_worker.progress.connect(self.result_text.append)
+        self.scan_worker.device_found.connect(
+            lambda ip: self.fleet_model.add_devices([(ip, self.current_dpi_default())]))
+        self.scan_worker.device_update.connect(self.fleet_model.queue_update)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.scan_worker.start()
+
+    def on_scan_finished(self, result):
+        self.result_text.append(result)
+        self.scan_button.setEnabled(True)
+        self.scan_button.setText("Procurar na Rede")
+        self.save_settings()
+
     def connect_all_devices(self):
-        # Testar dispositivo 1
-        ip_address1 = self.ip_entry1.text()
-        device1_connected = False
-        if ip_address1:
-            if self.adb_manager.connect(ip_address1):
-                info1 = self.adb_manager.get_device_info(ip_address1)
-                if info1:
-                    self.status_label1.setText(f"Conectado: {info1['model']}")
-                    self.status_label1.setStyleSheet("color: #4caf50; background-color: #2d2d2d;")
-                    device1_connected = True
-                else:
-                    self.status_label1.setText("Erro ao obter informações")
-                    self.status_label1.setStyleSheet("color: #ff6b6b; background-color: #2d2d2d;")
-            else:
-                self.status_label1.setText("Dispositivo não conectado")
-                self.status_label1.setStyleSheet("color: #ff6b6b; background-color: #2d2d2d;")
-        else:
-            self.status_label1.setText("IP não informado")
-            self.status_label1.setStyleSheet("color: #ffa726; background-color: #2d2d2d;")
-
-        # Testar dispositivo 2
-        ip_address2 = self.ip_entry2.text()
-        device2_connected = False
-        if ip_address2:
-            if self.adb_manager.connect(ip_address2):
-                info2 = self.adb_manager.get_device_info(ip_address2)
-                if info2:
-                    self.status_label2.setText(f"Conectado: {info2['model']}")
-                    self.status_label2.setStyleSheet("color: #4caf50; background-color: #2d2d2d;")
-                    device2_connected = True
-                else:
-                    self.status_label2.setText("Erro ao obter informações")
-                    self.status_label2.setStyleSheet("color: #ff6b6b; background-color: #2d2d2d;")
-            else:
-                self.status_label2.setText("Dispositivo não conectado")
-                self.status_label2.setStyleSheet("color: #ff6b6b; background-color: #2d2d2d;")
-        else:
-            self.status_label2.setText("IP não informado")
-            self.status_label2.setStyleSheet("color: #ffa726; background-color: #2d2d2d;")
+        # A thread anterior pode ainda estar terminando após emitir o resultado
+        if self.connect_worker and self.connect_worker.isRunning():
+            return
+        ip_addresses = [ip for ip, _ in self.fleet_model.devices()]
+        if not ip_addresses:
+            self.result_text.append("Nenhum dispositivo na lista")
+            return
 
-        # Mostrar resultado geral baseado no status real
-        connected_count = 0
-        if device1_connected:
-            connected_count += 1
-        if device2_connected:
-            connected_count += 1
-        
-        if connected_count == 0:
-            self.result_text.append("Nenhum dispositivo conectado")
-        elif connected_count == 1:
-            self.result_text.append("1 dispositivo conectado")
-        else:
-            self.result_text.append("2 dispositivos conectados")
+        self.connect_button.setEnabled(False)
+        self.connect_button.setText("Conectando...")
+        self.connect_worker = ConnectWorkerThread(self.async_adb_manager, self.loop_bridge, ip_addresses,
+                                                  max_parallel=max(8, self.parallel_spin.value()))
+        self.connect_worker.device_update.connect(self.fleet_model.queue_update)
+        self.connect_worker.finished.connect(self.on_connect_finished)
+        self.connect_worker.start()
+
+    def on_connect_finished(self, result):
+        self.result_text.append(result)
+        self.connect_button.setEnabled(True)
+        self.connect_button.setText("Conectar aos Dispositivos")
+
+    def reload_channels(self):
+        self.channel_combo.blockSignals(True)
+        self.channel_combo.clear()
+        self.channel_combo.addItem("Pasta local", "")
+        for channel in self.apk_manager.get_channels():
+            self.channel_combo.addItem(channel, channel)
+        index = self.channel_combo.findData(self.apk_manager.channel)
+        if index < 0:
+            self.apk_manager.channel = ""
+            index = 0
+        self.channel_combo.setCurrentIndex(index)
+        self.channel_combo.blockSignals(False)
+
+    def on_channel_changed(self, index):
+        self.apk_manager.channel = self.channel_combo.itemData(index) or ""
+        source = self.apk_manager.channel or "pasta local"
+        self.result_text.append(f"📦 APKs do {self.panel_combo.currentText()}: {source}")
+        self.save_settings()
+
+    def save_apk_channel(self):
+        """Guarda os APKs atuais da pasta no repositório de versões, como um canal"""
+        panel_type = self.panel_combo.currentText()
+        channel, ok = QInputDialog.getText(self, "Salvar como Canal",
+                                           f"Nome do canal para os APKs atuais do {panel_type}:",
+                                           text=self.apk_manager.channel or "estavel")
+        channel = channel.strip()
+        if not ok or not channel:
+            return
+        try:
+            count = self.apk_manager.save_channel(channel, panel_type)
+        except OSError as e:
+            self.result_text.append(f"❌ Erro ao salvar o canal {channel}: {e}")
+            return
+        if not count:
+            self.result_text.append(f"⚠️ Nenhum APK na pasta do {panel_type} para salvar")
+            return
+        self.result_text.append(f"✅ {count} APK(s) do {panel_type} salvos no canal {channel}")
+        store = self.apk_manager.artifact_store
+        if store.total_bytes() > store.max_bytes:
+            self.result_text.append(
+                f"⚠️ Repositório de versões com {store.total_bytes() // (1024 * 1024)} MB, acima do limite de "
+                f"{store.max_bytes // (1024 * 1024)} MB: as versões restantes estão todas em uso por algum canal")
+        self.reload_channels()
 
     def configure_usb_device(self):
         """Configura dispositivo USB com instalação automática de APKs"""
         panel_type = self.panel_combo.currentText()
+        self.save_settings()
         
         # Desabilitar botão durante a operação
         usb_button = self.sender()
@@ -2084,11 +5305,67 @@ class ConfiguradorDPI(QMainWindow):
         usb_button.setText("Configurando...")
         
         # Criar e iniciar thread USB
-        self.usb_worker = USBWorkerThread(self.adb_manager, self.app_manager, self.apk_manager, panel_type)
+        self.usb_worker = USBWorkerThread(self.adb_manager, self.app_manager, self.apk_manager, panel_type,
+                                          max_parallel=self.parallel_spin.value())
         self.usb_worker.progress.connect(self.result_text.append)
         self.usb_worker.finished.connect(lambda result: self.on_usb_worker_finished(result, usb_button))
         self.usb_worker.start()
 
+    def toggle_kiosk_mode(self, enabled):
+        if enabled:
+            self.result_text.append(f"🟢 Modo quiosque ativo: plugue os dispositivos para configurar como {self.panel_combo.currentText()}")
+            # Uma única fila por etapa para todos os dispositivos plugados
+            self.kiosk_stages = StageScheduler(transfer_slots=self.parallel_spin.value(),
+                                               command_slots=self.parallel_spin.value())
+            self.device_watcher = DeviceWatcherThread(self.adb_manager)
+            self.device_watcher.device_ready.connect(self.on_kiosk_device_ready)
+            self.device_watcher.state_changed.connect(self.on_kiosk_state_changed)
+            self.device_watcher.device_attached.connect(
+                lambda serial, state: self.on_kiosk_state_changed(serial, "", state))
+            self.device_watcher.device_detached.connect(
+                lambda serial: self.result_text.append(f"🔌 {serial} desconectado"))
+            self.device_watcher.error.connect(self.result_text.append)
+            self.device_watcher.start()
+        elif self.device_watcher:
+            # Pode estar no meio de um `adb start-server`: só solta a referência quando terminar
+            watcher = self.device_watcher
+            self.device_watcher = None
+            self.retired_threads.add(watcher)
+            watcher.finished.connect(lambda watcher=watcher: self.retired_threads.discard(watcher))
+            watcher.stop()
+            self.result_text.append("⚪ Modo quiosque desativado")
+
+    def on_kiosk_state_changed(self, serial, previous, state):
+        if state == "unauthorized":
+            self.result_text.append(f"⚠️ {serial}: autorize a depuração USB na tela do dispositivo")
+
+    def on_kiosk_device_ready(self, serial):
+        """Inicia a configuração de um dispositivo USB recém-plugado"""
+        if ":" in serial or serial in self.kiosk_workers:
+            return  # Dispositivos Wi-Fi ou já em configuração
+        # O próprio auto-start reinicia o dispositivo; não configurar de novo quando ele voltar
+        finished_at = self.kiosk_finished.get(serial)
+        if finished_at and time.monotonic() - finished_at < self.kiosk_cooldown:
+            return
+
+        panel_type = self.panel_combo.currentText()
+        self.result_text.append(f"🔌 {serial} pronto - configurando como {panel_type}")
+        worker = USBWorkerThread(self.adb_manager, self.app_manager, self.apk_manager, panel_type,
+                                 serials=[serial], stages=self.kiosk_stages)
+        worker.progress.connect(lambda text, serial=serial: self.result_text.append(
+            "\n".join(f"[{serial}] {line}" if line else line for line in text.split("\n"))))
+        worker.finished.connect(lambda result, serial=serial: self.on_kiosk_worker_finished(serial, result))
+        self.kiosk_workers[serial] = worker
+        worker.start()
+
+    def on_kiosk_worker_finished(self, serial, result):
+        worker = self.kiosk_workers.pop(serial, None)
+        if worker:
+            # O sinal de resultado sai antes de run() retornar; esperar a thread antes de soltá-la
+            worker.wait()
+        self.kiosk_finished[serial] = time.monotonic()
+        self.result_text.append(f"[{serial}] {result}")
+
     def on_usb_worker_finished(self, result, button):
         """Callback quando a configuração USB termina"""
         self.result_text.append(result)
@@ -2099,25 +5376,17 @@ class ConfiguradorDPI(QMainWindow):
         try:
             self.result_text.append("Verificando dispositivos USB...")
             # Verificar dispositivos USB conectados
-            result = subprocess.run(
-                [self.adb_manager.adb_path, "devices"],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            success, devices = self.adb_manager.list_devices()
             
-            if result.returncode != 0:
-                self.result_text.append(f"Erro ao executar 'adb devices': {result.stderr}")
+            if not success:
+                self.result_text.append(f"Erro ao listar dispositivos adb: {devices}")
                 return
             
-            devices_output = result.stdout.strip()
-            self.result_text.append(f"Saída do comando 'adb devices':\n{devices_output}")
+            devices_output = "\n".join(f"{d['serial']}\t{d['state']}" for d in devices)
+            self.result_text.append(f"Dispositivos adb:\n{devices_output}")
             
             # Verificar se há dispositivos conectados
-            connected_devices = []
-            for line in devices_output.split('\n'):
-                if line.strip() and not line.startswith('List of devices') and '\tdevice' in line:
-                    device_id = line.split('\t')[0]
-                    connected_devices.append(device_id)
+            connected_devices = [d["serial"] for d in devices if d["state"] == "device"]
             
             if not connected_devices:
                 self.result_text.append("Nenhum dispositivo USB encontrado. Conecte um dispositivo via USB.")
@@ -2159,22 +5428,22 @@ class ConfiguradorDPI(QMainWindow):
             self.result_text.append(f"Erro inesperado: {str(e)}")
 
     def show_app_list(self):
-        # Verificar qual dispositivo está conectado
-        ip_address1 = self.ip_entry1.text()
-        ip_address2 = self.ip_entry2.text()
-        
-        # Priorizar dispositivo 1 se ambos estiverem preenchidos
-        target_ip = None
-        if ip_address1:
-            target_ip = ip_address1
-        elif ip_address2:
-            target_ip = ip_address2
+        # Usar o dispositivo selecionado na tabela, ou o primeiro da lista
+        selected_rows = self.selected_device_rows()
+        if selected_rows:
+            target_ip = self.fleet_model.ip_at(selected_rows[0])
+        elif self.fleet_model.rowCount():
+            target_ip = self.fleet_model.ip_at(0)
         else:
-            self.show_message_box("Aviso", "Por favor, preencha pelo menos um endereço IP de dispositivo.", "warning")
+            self.show_message_box("Aviso", "Por favor, adicione pelo menos um endereço IP de dispositivo.", "warning")
             return
         
         # Verificar conexão
-        if not self.adb_manager.connect(target_ip):
+        status = self.adb_manager.ensure_connected(target_ip)
+        if status == CONNECTION_UNREACHABLE:
+            self.show_message_box("Erro", "Dispositivo inacessível. Verifique se está ligado e se o IP está correto.", "critical")
+            return
+        if status != CONNECTION_OK:
             self.show_message_box("Erro", "Não foi possível conectar ao dispositivo. Verifique o IP e a conexão.", "critical")
             return
         
@@ -2209,24 +5478,17 @@ class ConfiguradorDPI(QMainWindow):
         pass  # Por enquanto, o usuário pode ver a mudança na próxima vez que abrir
 
     def change_dpi(self):
-        ip_address1 = self.ip_entry1.text()
-        dpi1 = self.dpi_entry1.text()
-        ip_address2 = self.ip_entry2.text()
-        dpi2 = self.dpi_entry2.text()
+        # Validar entradas (o número do dispositivo é a linha na tabela)
+        devices_to_process = [(ip, dpi, row + 1)
+                              for row, (ip, dpi) in enumerate(self.fleet_model.devices()) if dpi.isdigit()]
 
-        # Validar entradas
-        devices_to_process = []
-        
-        if ip_address1 and dpi1.isdigit():
-            devices_to_process.append((ip_address1, dpi1, 1))
-        
-        if ip_address2 and dpi2.isdigit():
-            devices_to_process.append((ip_address2, dpi2, 2))
-        
         if not devices_to_process:
-            self.result_text.append("Por favor, preencha pelo menos um IP válido e DPI válido.")
+            self.result_text.append("Por favor, adicione pelo menos um IP válido e DPI válido.")
             return
 
+        for ip, _, _ in devices_to_process:
+            self.fleet_model.queue_update(ip, {"status": "Na fila", "level": None, "progress": 0})
+
         # Salvar configurações
         self.save_settings()
 
@@ -2235,8 +5497,11 @@ class ConfiguradorDPI(QMainWindow):
         self.main_button.setText("Processando...")
 
         # Criar e iniciar thread de trabalho
-        self.worker = WorkerThread(self.adb_manager, self.app_manager, devices_to_process)
+        self.worker = WorkerThread(self.adb_manager, self.app_manager, devices_to_process,
+                                   self.async_adb_manager, self.loop_bridge,
+                                   max_parallel=self.parallel_spin.value())
         self.worker.progress.connect(self.result_text.append)
+        self.worker.device_update.connect(self.fleet_model.queue_update)
         self.worker.finished.connect(self.on_worker_finished)
         self.worker.start()
 
@@ -3033,6 +6298,8 @@ class AnimatedLineWidget(QWidget):
         painter.end()
 
 if __name__ == "__main__":
+    # Necessário para o ProcessPoolExecutor do índice de APKs no executável congelado
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = ConfiguradorDPI()
     window.show()
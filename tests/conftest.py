@@ -0,0 +1,94 @@
+import os
+import struct
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+# Testes sem tela: o módulo importa PyQt6, mas nenhum teste abre janelas
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+try:
+    import PyQt6  # noqa: F401
+    import requests  # noqa: F401
+except ImportError:
+    collect_ignore_glob = ["test_*.py"]
+
+# O app só roda no Windows; fora dele as flags de criação de processo não existem
+if not hasattr(subprocess, "CREATE_NO_WINDOW"):
+    subprocess.CREATE_NO_WINDOW = 0
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# IDs de recurso android:versionCode, android:versionName e android:minSdkVersion
+_RESOURCE_IDS = [0x0101021b, 0x0101021c, 0x0101020c]
+
+
+def _string_pool(strings, utf8):
+    blobs = []
+    for text in strings:
+        if utf8:
+            encoded = text.encode("utf-8")
+            blobs.append(bytes([len(text), len(encoded)]) + encoded + b"\0")
+        else:
+            blobs.append(struct.pack("<H", len(text)) + text.encode("utf-16-le") + b"\0\0")
+    offsets = []
+    position = 0
+    for blob in blobs:
+        offsets.append(position)
+        position += len(blob)
+    data = b"".join(blobs)
+    data += b"\0" * (-len(data) % 4)
+    header_size = 28
+    strings_start = header_size + 4 * len(strings)
+    header = struct.pack("<HHIIIIII", 0x0001, header_size, strings_start + len(data), len(strings), 0,
+                         0x100 if utf8 else 0, strings_start, 0)
+    return header + b"".join(struct.pack("<I", offset) for offset in offsets) + data
+
+
+def _start_element(name_index, attributes):
+    """RES_XML_START_ELEMENT_TYPE com atributos (nome, string bruta, tipo, valor)"""
+    attribute_data = b"".join(struct.pack("<IIIHBBI", 0xFFFFFFFF, name, raw, 8, 0, data_type, value)
+                              for name, raw, data_type, value in attributes)
+    body = struct.pack("<IIHHHHHH", 0xFFFFFFFF, name_index, 20, 20, len(attributes), 0, 0, 0) + attribute_data
+    return struct.pack("<HHIII", 0x0102, 16, 16 + len(body), 1, 0xFFFFFFFF) + body
+
+
+def build_manifest(package, version_code, version_name, min_sdk, utf8=True):
+    """AndroidManifest.xml binário mínimo: <manifest> com versão e <uses-sdk> com minSdk"""
+    strings = ["versionCode", "versionName", "minSdkVersion", "package", "manifest", "uses-sdk",
+               "application", version_name, package]
+    resource_map = struct.pack("<HHI", 0x0180, 8, 8 + 4 * len(_RESOURCE_IDS)) + \
+        b"".join(struct.pack("<I", resource_id) for resource_id in _RESOURCE_IDS)
+    body = (
+        _string_pool(strings, utf8) + resource_map
+        + _start_element(4, [(0, 0xFFFFFFFF, 0x10, version_code), (1, 7, 0x03, 7), (3, 8, 0x03, 8)])
+        + _start_element(5, [(2, 0xFFFFFFFF, 0x10, min_sdk)])
+        + _start_element(6, [])
+    )
+    return struct.pack("<HHI", 0x0003, 8, 8 + len(body)) + body
+
+
+def corrupt_entry(apk_path, name):
+    """Inverte um byte dos dados de uma entrada armazenada (o CRC deixa de conferir)"""
+    with zipfile.ZipFile(apk_path) as apk:
+        info = apk.getinfo(name)
+    with open(apk_path, "r+b") as f:
+        # Os dados começam após o cabeçalho local (30 bytes + nome + extra)
+        f.seek(info.header_offset + 30 + len(info.filename) + len(info.extra) + 100)
+        byte = f.read(1)
+        f.seek(-1, 1)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+@pytest.fixture
+def make_apk(tmp_path):
+    """Cria um APK pequeno com manifesto binário, uma entrada comprimida e uma armazenada"""
+    def factory(name="app.apk", package="com.example.app", version_code=1, version_name="1.0", min_sdk=21):
+        path = tmp_path / name
+        with zipfile.ZipFile(path, "w") as apk:
+            apk.writestr("AndroidManifest.xml", build_manifest(package, version_code, version_name, min_sdk),
+                         compress_type=zipfile.ZIP_DEFLATED)
+            apk.writestr("classes.dex", b"dex\n035\0" + bytes(range(256)) * 8, compress_type=zipfile.ZIP_STORED)
+        return str(path)
+    return factory
@@ -0,0 +1,221 @@
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+import pytest
+from PyQt6.QtCore import Qt
+
+import configurardpi_qt
+from configurardpi_qt import ADBManager, ADBProtocolError, ADBSocketClient, DeviceWatcherThread
+
+
+class FakeADBServer:
+    """Servidor adb falso em localhost: lê requisições com prefixo de tamanho e responde com `handler`"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self.stdin = b""
+        self._server = socket.socket()
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def read_request(self, conn):
+        length = int(self._recv(conn, 4), 16)
+        request = self._recv(conn, length).decode()
+        self.requests.append(request)
+        return request
+
+    @staticmethod
+    def _recv(conn, size):
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def read_stdin(self, conn):
+        """Lê pacotes de stdin do shell v2 até o CLOSE_STDIN"""
+        while True:
+            packet_id, length = struct.unpack("<BI", self._recv(conn, 5))
+            if packet_id == ADBSocketClient.SHELL_CLOSE_STDIN:
+                return
+            self.stdin += self._recv(conn, length)
+
+    def _serve(self, conn):
+        with conn:
+            try:
+                self.handler(self, conn)
+            except (ConnectionError, OSError):
+                pass
+
+    def close(self):
+        self._server.close()
+
+
+def message(text):
+    data = text.encode()
+    return b"%04x" % len(data) + data
+
+
+def packet(packet_id, payload):
+    return struct.pack("<BI", packet_id, len(payload)) + payload
+
+
+@pytest.fixture
+def fake_server():
+    servers = []
+
+    def start(handler):
+        server = FakeADBServer(handler)
+        servers.append(server)
+        return server, ADBSocketClient(port=server.port, timeout=2)
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_version_and_devices(fake_server):
+    def handler(server, conn):
+        request = server.read_request(conn)
+        if request == "host:version":
+            conn.sendall(b"OKAY" + message("0029"))
+        else:
+            conn.sendall(b"OKAY" + message("emulator-5554\tdevice product:x model:X96\n10.0.0.2:5555\toffline\n"))
+
+    server, client = fake_server(handler)
+    assert client.version() == 0x29
+    devices = client.devices()
+    assert [(d["serial"], d["state"]) for d in devices] == [("emulator-5554", "device"), ("10.0.0.2:5555", "offline")]
+    assert server.requests == ["host:version", "host:devices-l"]
+
+
+def test_shell_v2_framing(fake_server):
+    def handler(server, conn):
+        server.read_request(conn)
+        conn.sendall(b"OKAY")
+        server.read_request(conn)
+        conn.sendall(b"OKAY")
+        server.read_stdin(conn)
+        # stdout em dois pacotes, stderr no meio e código de saída 3
+        conn.sendall(packet(1, b"linha 1\n") + packet(2, b"aviso\n") + packet(1, b"linha 2\n") + packet(3, b"\x03"))
+
+    server, client = fake_server(handler)
+    result = client.shell("usb1", ["pm", "list", "packages"], input="abc" * 40000)
+    assert server.requests == ["host:transport:usb1", "shell,v2,raw:pm list packages"]
+    assert server.stdin == b"abc" * 40000
+    assert (result.returncode, result.stdout, result.stderr) == (3, "linha 1\nlinha 2\n", "aviso\n")
+
+
+def test_fail_response_raises(fake_server):
+    def handler(server, conn):
+        server.read_request(conn)
+        conn.sendall(b"FAIL" + message("device 'usb9' not found"))
+
+    _, client = fake_server(handler)
+    with pytest.raises(ADBProtocolError, match="usb9"):
+        client.shell("usb9", "true")
+
+
+def trickle_handler(server, conn):
+    """Um byte de stdout a cada 0,3 s (mais que o timeout de conexão do cliente) e depois sai"""
+    for _ in range(2):
+        server.read_request(conn)
+        conn.sendall(b"OKAY")
+    for _ in range(4):
+        time.sleep(0.3)
+        conn.sendall(packet(1, b"x"))
+    conn.sendall(packet(3, b"\x00"))
+
+
+def test_shell_without_timeout_has_no_limit(fake_server):
+    server, _ = fake_server(trickle_handler)
+    client = ADBSocketClient(port=server.port, timeout=0.2)
+    result = client.shell("usb1", "logcat")
+    assert (result.returncode, result.stdout) == (0, "xxxx")
+
+
+def test_shell_timeout_is_a_total_deadline(fake_server):
+    _, client = fake_server(trickle_handler)
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        client.shell("usb1", "logcat", timeout=0.7)
+    # Cada recv chega antes de 0,7 s; só o prazo total interrompe
+    assert time.monotonic() - started < 1.1
+
+
+def test_track_devices_falls_back_without_l(fake_server):
+    def handler(server, conn):
+        request = server.read_request(conn)
+        if request == "host:track-devices-l":
+            conn.sendall(b"FAIL" + message("unknown host service"))
+            return
+        conn.sendall(b"OKAY" + message("usb1\tdevice\n"))
+        time.sleep(0.2)
+
+    server, client = fake_server(handler)
+    sock = client.open_track_devices()
+    with sock:
+        assert client.read_device_list(sock) == [{"serial": "usb1", "state": "device"}]
+    assert server.requests == ["host:track-devices-l", "host:track-devices"]
+
+
+def test_watcher_does_not_restart_a_running_server(fake_server, monkeypatch):
+    def handler(server, conn):
+        if server.read_request(conn) == "host:version":
+            conn.sendall(b"OKAY" + message("0029"))
+        else:
+            conn.sendall(b"FAIL" + message("unknown host service"))
+
+    server, client = fake_server(handler)
+    manager = ADBManager()
+    manager.socket_client = client
+    started = []
+    monkeypatch.setattr(configurardpi_qt.subprocess, "run", lambda args, **kwargs: started.append(args))
+
+    watcher = DeviceWatcherThread(manager, retry_interval=0.05)
+    errors = []
+    watcher.error.connect(errors.append, Qt.ConnectionType.DirectConnection)
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    time.sleep(0.5)
+    watcher.stop()
+    thread.join(2)
+
+    assert server.requests.count("host:track-devices") > 2
+    assert started == []
+    assert len(errors) == 1
+
+
+def test_watcher_starts_a_stopped_server(monkeypatch):
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    manager = ADBManager()
+    manager.socket_client = ADBSocketClient(port=port, timeout=0.2)
+    started = []
+    monkeypatch.setattr(configurardpi_qt.subprocess, "run", lambda args, **kwargs: started.append(args))
+
+    watcher = DeviceWatcherThread(manager, retry_interval=0.05)
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    time.sleep(0.3)
+    watcher.stop()
+    thread.join(2)
+
+    assert started and started[0][1:] == ["start-server"]
@@ -0,0 +1,56 @@
+import zipfile
+
+import pytest
+
+from conftest import build_manifest, corrupt_entry
+from configurardpi_qt import APKManifestError, parse_binary_manifest, verify_apk
+
+
+@pytest.mark.parametrize("utf8", [True, False])
+def test_parse_binary_manifest(utf8):
+    manifest = parse_binary_manifest(build_manifest("com.example.totem", 42, "2.1.0", 19, utf8=utf8))
+    assert manifest["package"] == "com.example.totem"
+    assert manifest["version_code"] == 42
+    assert manifest["version_name"] == "2.1.0"
+    assert manifest["min_sdk"] == 19
+
+
+def test_parse_binary_manifest_rejects_text_xml():
+    with pytest.raises(APKManifestError):
+        parse_binary_manifest(b"<?xml version='1.0'?><manifest/>")
+
+
+def test_verify_apk(make_apk):
+    result = verify_apk(make_apk(package="com.example.app", version_code=7, min_sdk=22))
+    assert result["error"] is None
+    assert not result["missing"]
+    assert (result["package"], result["version_code"], result["min_sdk"]) == ("com.example.app", 7, 22)
+
+
+def test_verify_apk_detects_corrupted_entry(make_apk):
+    path = make_apk()
+    corrupt_entry(path, "classes.dex")
+
+    result = verify_apk(path)
+    assert result["error"].startswith("ZIP inválido")
+    assert "classes.dex" in result["error"]
+
+
+def test_verify_apk_missing_file(tmp_path):
+    result = verify_apk(str(tmp_path / "nada.apk"))
+    assert result["missing"]
+    assert result["error"] is None
+
+
+def test_verify_apk_without_manifest(tmp_path):
+    path = tmp_path / "sem_manifesto.apk"
+    with zipfile.ZipFile(path, "w") as apk:
+        apk.writestr("classes.dex", b"dex")
+    assert verify_apk(str(path))["error"] == "APK sem AndroidManifest.xml"
+
+
+def test_verify_apk_not_a_zip(tmp_path):
+    path = tmp_path / "texto.apk"
+    path.write_bytes(b"nao e um zip")
+    assert verify_apk(str(path))["error"].startswith("ZIP inválido")
+
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from conftest import corrupt_entry
+import configurardpi_qt
+from configurardpi_qt import APKIndex
+
+
+def no_describe(apk_path):
+    raise AssertionError(f"{apk_path} não deveria ser lido de novo")
+
+
+@pytest.fixture
+def index(tmp_path):
+    return APKIndex(str(tmp_path))
+
+
+def test_refresh_indexes_new_apks(index, make_apk):
+    path = make_apk(package="com.example.totem", version_code=3)
+    assert index.refresh() == 1
+
+    entry = index.get(path)
+    assert (entry["package"], entry["version_code"], entry["preflight_error"]) == ("com.example.totem", 3, None)
+    with open(path, "rb") as f:
+        assert entry["sha256"] == hashlib.sha256(f.read()).hexdigest()
+
+
+def test_unchanged_apks_are_not_read_again(index, make_apk, monkeypatch):
+    path = make_apk()
+    index.refresh()
+    monkeypatch.setattr(configurardpi_qt, "describe_apk", no_describe)
+
+    assert index.refresh() == 0
+    assert index.get(path)["package"] == "com.example.app"
+    # O índice salvo vale para a próxima execução
+    assert APKIndex(index.base_path).get(path)["package"] == "com.example.app"
+
+
+def test_size_change_invalidates_entry(index, make_apk):
+    path = make_apk(version_code=1)
+    index.refresh()
+    make_apk(version_code=2)
+    with open(path, "ab") as f:
+        f.write(b"\0" * 16)  # Comentário extra no fim do ZIP: muda só o tamanho
+
+    assert index.refresh() == 1
+    assert index.get(path)["version_code"] == 2
+
+
+def test_mtime_change_invalidates_entry(index, make_apk):
+    path = make_apk()
+    entry = index.get(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert index.refresh() == 1
+    assert index.get(path)["mtime_ns"] == entry["mtime_ns"] + 10 ** 9
+
+
+def test_removed_apks_are_pruned(index, make_apk):
+    kept = make_apk("a.apk")
+    removed = make_apk("b.apk")
+    index.refresh()
+    os.remove(removed)
+
+    assert index.refresh() == 1
+    assert index.get(removed) is None
+    with open(index.index_path, encoding="utf-8") as f:
+        assert list(json.load(f)["entries"]) == [APKIndex._key(kept)]
+
+
+def test_old_index_version_is_rebuilt(index, make_apk):
+    path = make_apk()
+    with open(index.index_path, "w", encoding="utf-8") as f:
+        json.dump({"version": APKIndex.INDEX_VERSION - 1, "entries": {APKIndex._key(path): {"size": 0}}}, f)
+    assert APKIndex(index.base_path).refresh() == 1
+
+
+def test_preflight_keeps_order(index, make_apk, tmp_path):
+    paths = [make_apk("a.apk", package="com.a"), str(tmp_path / "falta.apk"), make_apk("b.apk", package="com.b")]
+    results = index.preflight(paths, max_workers=2)
+
+    assert [r["path"] for r in results] == paths
+    assert [r["package"] for r in results] == ["com.a", None, "com.b"]
+    assert [r["missing"] for r in results] == [False, True, False]
+
+
+def test_preflight_uses_cached_result(index, make_apk, monkeypatch):
+    path = make_apk()
+    corrupt_entry(path, "classes.dex")
+    first = index.preflight([path])
+    assert "classes.dex" in first[0]["error"]
+
+    monkeypatch.setattr(configurardpi_qt, "describe_apk", no_describe)
+    assert index.preflight([path]) == first
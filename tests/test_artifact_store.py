@@ -0,0 +1,78 @@
+import itertools
+import os
+
+import pytest
+
+import configurardpi_qt
+from configurardpi_qt import ArtifactStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time() crescente a cada chamada: a ordem de uso fica determinística"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(configurardpi_qt.time, "time", lambda: float(next(ticks)))
+
+
+def write_apk(tmp_path, name, content):
+    path = tmp_path / "origem" / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_add_deduplicates_by_sha256(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    first = store.add(write_apk(tmp_path, "adb.apk", b"a" * 100))
+    again = store.add(write_apk(tmp_path, "adb_totem.apk", b"a" * 100))
+    other = store.add(write_apk(tmp_path, "totem_ai.apk", b"b" * 50))
+
+    assert first == again != other
+    assert sorted(os.listdir(store.objects_path)) == sorted([first, other])
+    assert store.total_bytes() == 150
+    with open(store.path_for(first), "rb") as f:
+        assert f.read() == b"a" * 100
+
+
+def test_channel_pinned_versions_survive_evict(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=10)
+    pinned = store.add(write_apk(tmp_path, "painel_ai.apk", b"p" * 100))
+    loose = store.add(write_apk(tmp_path, "antigo.apk", b"x" * 100))
+    store.set_channel("rollback", "Painel", {"painel_ai.apk": pinned})
+
+    assert store.evict() == [loose]
+    assert os.path.exists(store.path_for(pinned))
+    # Só sobraram versões em uso: o repositório fica acima do limite
+    assert store.total_bytes() == 100 > store.max_bytes
+
+
+def test_evict_removes_least_recently_used_first(tmp_path, clock):
+    store = ArtifactStore(str(tmp_path), max_bytes=250)
+    a, b, c = (store.add(write_apk(tmp_path, f"{name}.apk", name.encode() * 100)) for name in "abc")
+    store.set_channel("teste", "Totem", {"a.apk": a})
+    store.resolve("teste", "Totem")  # a passa a ser o mais recente
+    store.set_channel("teste", "Totem", {})
+
+    assert store.evict() == [b]
+    assert store.path_for(a) and store.path_for(c)
+
+
+def test_last_used_survives_restart(tmp_path, clock):
+    store = ArtifactStore(str(tmp_path), max_bytes=150)
+    a = store.add(write_apk(tmp_path, "a.apk", b"a" * 100))
+    b = store.add(write_apk(tmp_path, "b.apk", b"b" * 100))
+    store.set_channel("estavel", "Totem", {"a.apk": a})
+    paths = store.resolve("estavel", "Totem")
+    assert paths == [store.path_for(a)]
+
+    reopened = ArtifactStore(str(tmp_path), max_bytes=150)
+    reopened.set_channel("estavel", "Totem", {})
+    assert reopened.evict() == [b]
+
+
+def test_resolve_reports_removed_versions_as_missing(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    store.set_channel("estavel", "Painel", {"painel_ai.apk": "0" * 64})
+    path, = store.resolve("estavel", "Painel")
+    assert path.endswith("painel_ai.apk")
+    assert not os.path.exists(path)
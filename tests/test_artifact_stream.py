@@ -0,0 +1,120 @@
+import hashlib
+import http.server
+import os
+import sys
+import threading
+
+import pytest
+
+from configurardpi_qt import ADBManager
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="adb falso é um script POSIX")
+
+# adb falso: confere o -S do pm install, grava o stdin recebido e responde como o pm
+FAKE_ADB = """#!{python}
+import sys
+size = int(sys.argv[-1].split()[-1])
+received = 0
+with open({output!r}, "wb") as f:
+    while True:
+        chunk = sys.stdin.buffer.read(4096)
+        if not chunk:
+            break
+        f.write(chunk)
+        f.flush()
+        received += len(chunk)
+if received == size:
+    print("Success")
+else:
+    print(f"Failure [INSTALL_FAILED_INVALID_APK: {{received}} de {{size}}]")
+    sys.exit(1)
+"""
+
+# adb falso que recusa o APK logo no início, como o pm faz com espaço insuficiente
+EARLY_EXIT_ADB = """#!{python}
+import sys
+sys.stdin.buffer.read(1024)
+print("Failure [INSTALL_FAILED_INSUFFICIENT_STORAGE]")
+sys.exit(1)
+"""
+
+
+@pytest.fixture
+def artifact_server():
+    payload = os.urandom(300 * 1024)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield payload, f"http://127.0.0.1:{server.server_address[1]}/totem.apk"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    output = tmp_path / "recebido.apk"
+    adb = tmp_path / "adb"
+    adb.write_text(FAKE_ADB.format(python=sys.executable, output=str(output)))
+    adb.chmod(0o755)
+    m = ADBManager()
+    m.adb_path = str(adb)
+    m.use_socket_transport = False
+    return m, output
+
+
+def test_stream_install_success(artifact_server, manager):
+    payload, url = artifact_server
+    m, output = manager
+    artifact = {"name": "totem.apk", "url": url, "size": len(payload), "sha256": hashlib.sha256(payload).hexdigest()}
+
+    success, message = m.install_apk_from_url(artifact, "usb1", chunk_size=64 * 1024)
+    assert success, message
+    assert message == "Success"
+    assert output.read_bytes() == payload
+
+
+def test_stream_install_sha_mismatch(artifact_server, manager):
+    payload, url = artifact_server
+    m, output = manager
+    artifact = {"name": "totem.apk", "url": url, "size": len(payload), "sha256": "0" * 64}
+
+    success, message = m.install_apk_from_url(artifact, "usb1", chunk_size=64 * 1024)
+    assert not success
+    assert "sha256" in message
+    # O último bloco fica retido: o pm nunca recebe o APK completo
+    assert len(output.read_bytes()) < len(payload)
+
+
+def test_stream_install_size_mismatch(artifact_server, manager):
+    payload, url = artifact_server
+    m, _ = manager
+    artifact = {"name": "totem.apk", "url": url, "size": len(payload) - 1,
+                "sha256": hashlib.sha256(payload).hexdigest()}
+
+    success, message = m.install_apk_from_url(artifact, "usb1", chunk_size=64 * 1024)
+    assert not success
+    assert "Tamanho" in message
+
+
+def test_stream_install_reports_early_pm_exit(artifact_server, manager, tmp_path):
+    payload, url = artifact_server
+    m, _ = manager
+    adb = tmp_path / "adb_early"
+    adb.write_text(EARLY_EXIT_ADB.format(python=sys.executable))
+    adb.chmod(0o755)
+    m.adb_path = str(adb)
+    artifact = {"name": "totem.apk", "url": url, "size": len(payload), "sha256": hashlib.sha256(payload).hexdigest()}
+
+    success, message = m.install_apk_from_url(artifact, "usb1", chunk_size=16 * 1024)
+    assert not success
+    assert message == "Failure [INSTALL_FAILED_INSUFFICIENT_STORAGE]"
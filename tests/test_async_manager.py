@@ -0,0 +1,104 @@
+import asyncio
+import subprocess
+import threading
+
+from configurardpi_qt import MAIN_APP_PACKAGES, ADBManager, AsyncADBManager, RebootRequests
+
+TOTEM = MAIN_APP_PACKAGES["Totem"]
+
+
+class FakeAsyncManager(AsyncADBManager):
+    """AsyncADBManager com o dispositivo simulado: registra os comandos e responde sem processos"""
+
+    def __init__(self, installed=(TOTEM,), batch_returncode=0):
+        super().__init__(ADBManager())
+        self.installed = installed
+        self.batch_returncode = batch_returncode
+        self.commands = []
+        self.finalized = []
+
+    async def shell(self, serial, command, timeout=None, input=None):
+        self.commands.append(command)
+        if command[:3] == ["pm", "list", "packages"]:
+            return subprocess.CompletedProcess(command, 0, "".join(f"package:{p}\n" for p in self.installed), "")
+        return subprocess.CompletedProcess(command, 0, "Starting: Intent", "")
+
+    async def run_batch(self, serial, commands, timeout=60):
+        self.commands.extend(command for command, _ in commands)
+        return [(description, subprocess.CompletedProcess(command, self.batch_returncode, "", "erro"))
+                for command, description in commands]
+
+    async def get_device_snapshot(self, serial, refresh=False, timeout=15):
+        return None
+
+    async def wait_for_foreground(self, serial, package, timeout=None):
+        return True
+
+    async def finalize_reboot(self, serial, reboots, stages=None):
+        self.finalized.append(reboots.pop(serial))
+        return True, True, "Pronto em 30 s"
+
+
+def test_install_apk_uses_sync_install_path(monkeypatch):
+    calls = []
+
+    def install_apk(self, apk_path, device_id=None):
+        calls.append((apk_path, device_id, threading.current_thread() is threading.main_thread()))
+        return True, "Success"
+
+    monkeypatch.setattr(ADBManager, "install_apk", install_apk)
+    manager = AsyncADBManager(ADBManager())
+    assert asyncio.run(manager.install_apk("totem.apk", "usb1")) == (True, "Success")
+    # A instalação bloqueante roda fora do event loop
+    assert calls == [("totem.apk", "usb1", False)]
+
+
+def test_install_apk_reports_errors(monkeypatch):
+    def install_apk(self, apk_path, device_id=None):
+        raise OSError("adb ausente")
+
+    monkeypatch.setattr(ADBManager, "install_apk", install_apk)
+    assert asyncio.run(AsyncADBManager(ADBManager()).install_apk("totem.apk", "usb1")) == (False, "adb ausente")
+
+
+def test_autostart_schedules_reboot():
+    manager = FakeAsyncManager()
+    reboots = RebootRequests()
+    success, message = asyncio.run(manager.configure_app_autostart("usb1", "Totem", reboots=reboots))
+
+    assert success, message
+    assert "reboot de teste agendado" in message
+    assert ["am", "start", "-n", TOTEM + "/.SplashActivity"] in manager.commands
+    assert reboots.pop("usb1") == (["testar o auto-start"], TOTEM)
+    assert manager.finalized == []
+
+
+def test_autostart_reboots_when_not_batched():
+    manager = FakeAsyncManager()
+    success, message = asyncio.run(manager.configure_app_autostart("usb1", "Totem"))
+
+    assert success, message
+    assert "confirmado após o reboot" in message
+    assert manager.finalized == [(["testar o auto-start"], TOTEM)]
+
+
+def test_autostart_fails_without_main_app():
+    manager = FakeAsyncManager(installed=())
+    success, message = asyncio.run(manager.configure_app_autostart("usb1", "Totem"))
+    assert not success
+    assert "App principal não encontrado" in message
+
+
+def test_autostart_fails_when_batch_fails():
+    manager = FakeAsyncManager(batch_returncode=1)
+    success, message = asyncio.run(manager.configure_app_autostart("usb1", "Totem", reboots=RebootRequests()))
+    assert not success
+    assert "Falha na configuração de auto-start" in message
+    assert not any(command[:2] == ["am", "start"] for command in manager.commands)
+
+
+def test_autostart_without_restart_checks_success_rate():
+    manager = FakeAsyncManager(batch_returncode=1)
+    success, message = asyncio.run(manager.configure_app_autostart("usb1", "Totem", restart=False))
+    assert not success
+    assert "Falha na configuração de auto-start" in message
@@ -0,0 +1,49 @@
+import shutil
+import subprocess
+
+import pytest
+
+from configurardpi_qt import build_batch_script, parse_batch_output
+
+MARKER = "__minipcs_test"
+
+
+@pytest.mark.skipif(shutil.which("sh") is None, reason="sh indisponível")
+def test_script_round_trip():
+    commands = [
+        (["echo", "primeiro arg"], "eco"),
+        ("echo saida; echo erro >&2; exit 3", "falha"),
+        (["printf", "sem quebra"], "printf"),
+    ]
+    script = build_batch_script(commands, MARKER)
+    result = subprocess.run(["sh"], input=script, capture_output=True, text=True)
+
+    records = parse_batch_output(commands, MARKER, result.stdout, result.stderr)
+    assert [description for description, _ in records] == ["eco", "falha", "printf"]
+    assert [(r.returncode, r.stdout, r.stderr) for _, r in records] == [
+        (0, "primeiro arg\n", ""),
+        (3, "saida\n", "erro\n"),
+        (0, "sem quebra", ""),
+    ]
+
+
+def test_commands_not_executed():
+    commands = [("true", "a"), ("false", "b"), ("true", "c")]
+    stdout = f"ok\n{MARKER}:0:0\n{MARKER}:1:1\n"
+    stderr = f"{MARKER}:0\n" + "x" * 20 + f"{MARKER}:1\n"
+
+    records = parse_batch_output(commands, MARKER, stdout, stderr, stderr_limit=10)
+    assert [(r.returncode, r.stdout, r.stderr) for _, r in records] == [
+        (0, "ok\n", ""),
+        (1, "", "x" * 10),
+        (-1, "", "Não executado"),
+    ]
+
+
+def test_mixed_streams_ignore_stderr_markers():
+    # Sem shell v2 o stderr chega junto ao stdout, incluindo os marcadores sem código
+    commands = [("cmd", "a")]
+    stdout = f"linha\n{MARKER}:0\n{MARKER}:0:0\n"
+
+    records = parse_batch_output(commands, MARKER, stdout, "")
+    assert (records[0][1].returncode, records[0][1].stdout) == (0, "linha\n")
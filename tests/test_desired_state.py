@@ -0,0 +1,128 @@
+import subprocess
+
+from configurardpi_qt import MAIN_APP_PACKAGES, ADBManager, DesiredState, command_fact
+
+TOTEM = MAIN_APP_PACKAGES["Totem"]
+
+
+def make_desired():
+    return DesiredState(dpi=160, absent_packages=["com.bloatware"], apks=[{"package": TOTEM, "version_code": 7}],
+                        main_package=TOTEM, android_major=10)
+
+
+def configured_device(desired, settings=None, returncodes=None):
+    """Registros de `run_batch` de um dispositivo já no estado desejado.
+
+    `settings` sobrescreve a saída de `settings get` por chave; `returncodes`,
+    o código de saída por tipo de consulta (consulta que falhou).
+    """
+    returncodes = returncodes or {}
+    values = {}
+    for kind, key, value in filter(None, desired.facts):
+        values.setdefault(kind, {})[key] = value
+    values["settings"].update(settings or {})
+    records = []
+    for command, (kind, key) in desired.query_commands():
+        if kind == "dpi":
+            output = "Physical density: 213\nOverride density: 160\n"
+        elif kind == "versions":
+            output = f"package:{TOTEM} versionCode:7\npackage:com.android.settings versionCode:29\n"
+        elif kind == "packages":
+            output = f"package:{TOTEM}\npackage:com.android.settings\n"
+        elif kind == "appops":
+            output = "".join(f"{op}: {value}; time=+1d\n" for (package, op), value in values["appops"].items()
+                             if package == key)
+        elif kind == "grants":
+            output = "".join(f"      {permission}: granted=true\n" for package, permission in values["grants"]
+                             if package == key)
+        elif kind == "idle_whitelist":
+            output = f"system,com.android.shell,2000\nuser,{TOTEM},10123\n"
+        else:
+            output = values[kind][key] + "\n"
+        records.append(((kind, key), subprocess.CompletedProcess(command, returncodes.get(kind, 0), output, "")))
+    return records
+
+
+def test_command_fact():
+    assert command_fact(["cmd", "appops", "set", TOTEM, "RUN_IN_BACKGROUND", "allow"]) == \
+        ("appops", (TOTEM, "RUN_IN_BACKGROUND"), "allow")
+    assert command_fact(["settings", "put", "global", "hidden_api_policy_p_apps", "1"]) == \
+        ("settings", ("global", "hidden_api_policy_p_apps"), "1")
+    assert command_fact(["dumpsys", "deviceidle", "whitelist", "+" + TOTEM]) == ("idle_whitelist", TOTEM, True)
+    assert command_fact(["pm", "grant", TOTEM, "android.permission.WAKE_LOCK"]) == \
+        ("grants", (TOTEM, "android.permission.WAKE_LOCK"), True)
+    assert command_fact(["am", "start", "-n", TOTEM + "/.SplashActivity"]) is None
+
+
+def test_configured_device_needs_nothing():
+    desired = make_desired()
+    plan = desired.diff(desired.read(configured_device(desired)))
+
+    assert (plan.dpi, plan.uninstall, plan.install, plan.autostart) == (None, [], [], [])
+    assert plan.is_empty()
+    assert not plan.reboot
+    assert plan.describe() == "já está no estado desejado"
+
+
+def test_setting_reading_null_is_changed():
+    desired = make_desired()
+    state = desired.read(configured_device(desired, settings={("global", "hidden_api_policy_p_apps"): "null"}))
+    plan = desired.diff(state)
+
+    assert [description for _, description in plan.autostart] == ["API Policy P"]
+    assert plan.changed == ["API Policy P"]
+    assert plan.reboot
+
+
+def test_unreadable_package_state_reinstalls_and_uninstalls():
+    desired = make_desired()
+    state = desired.read(configured_device(desired, returncodes={"versions": 1, "packages": 1}))
+    assert state["versions"] is None and state["packages"] is None
+
+    plan = desired.diff(state)
+    assert plan.uninstall == ["com.bloatware"]
+    assert plan.install == [0]
+    assert plan.reboot
+
+
+def test_unknown_values_are_applied_without_reboot():
+    # appop no modo padrão não aparece em `appops get`: aplica de novo, mas não conta como mudança
+    desired = make_desired()
+    records = [(query, result) for query, result in configured_device(desired) if query[0] != "appops"]
+    plan = desired.diff(desired.read(records))
+
+    assert plan.autostart
+    assert all(command[:3] == ["cmd", "appops", "set"] for command, _ in plan.autostart)
+    assert plan.changed == []
+    assert not plan.reboot
+
+
+class FakeADBManager(ADBManager):
+    """ADBManager sem dispositivo: o lote de auto-start devolve `batch_returncode` para todos os comandos"""
+
+    def __init__(self, batch_returncode):
+        super().__init__()
+        self.batch_returncode = batch_returncode
+        self.commands = []
+
+    def shell(self, serial, command, timeout=None, input=None):
+        self.commands.append(command)
+        return subprocess.CompletedProcess(command, 0, f"package:{TOTEM}\n", "")
+
+    def run_batch(self, serial, commands, timeout=60):
+        return [(description, subprocess.CompletedProcess(command, self.batch_returncode, "", "erro"))
+                for command, description in commands]
+
+
+def test_autostart_without_restart_checks_success_rate():
+    commands = make_desired().autostart_commands
+
+    success, message = FakeADBManager(1).configure_app_autostart("usb1", "Totem", commands=commands, restart=False)
+    assert not success
+    assert f"(0/{len(commands)} comandos)" in message
+
+    manager = FakeADBManager(0)
+    success, message = manager.configure_app_autostart("usb1", "Totem", commands=commands, restart=False)
+    assert success
+    assert "conferido sem reiniciar" in message
+    assert not any(command[:2] == ["am", "start"] for command in manager.commands)
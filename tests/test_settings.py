@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+from configurardpi_qt import ConfiguradorDPI, parse_device_list, parse_devices_output
+
+
+@pytest.fixture
+def load(tmp_path, monkeypatch):
+    """Roda load_settings sobre settings.txt sem abrir a janela"""
+    monkeypatch.chdir(tmp_path)
+
+    def run(text):
+        (tmp_path / "settings.txt").write_text(text)
+        window = SimpleNamespace(apk_manager=SimpleNamespace(artifact_server="", channel="estavel",
+                                                             artifact_store=SimpleNamespace(max_bytes=0)))
+        ConfiguradorDPI.load_settings(window)
+        return window
+
+    return run
+
+
+def test_parse_device_list_accepts_pasted_text_and_csv():
+    text = ('ip,dpi\n'
+            '10.0.0.5,213\n'
+            '"10.0.0.6";"160"\n'
+            '10.0.0.7:5555\tabc\n'
+            '  \n'
+            '10.0.0.300,213\n'
+            '10.0.0.8 240\n')
+    assert parse_device_list(text, "160") == [("10.0.0.5", "213"), ("10.0.0.6", "160"),
+                                              ("10.0.0.7", "160"), ("10.0.0.8", "240")]
+
+
+def test_old_four_line_format_is_migrated(load):
+    window = load("10.0.0.5\n213\n10.0.0.6\n240\n")
+    assert window.saved_devices == [("10.0.0.5", "213"), ("10.0.0.6", "240")]
+    assert window.max_parallel_devices == 4
+
+
+def test_old_format_with_empty_second_device_and_parallel(load):
+    window = load("10.0.0.5\n213\n\n\n6\n")
+    assert window.saved_devices == [("10.0.0.5", "213")]
+    assert window.max_parallel_devices == 6
+
+
+def test_current_format(load):
+    window = load("parallel=8\ndpi=240\nsubnet=192.168.1.0/24\nartifacts=http://srv:8080\n"
+                  "channel=rollback\nstore_mb=512\nwifi_mb=0\n10.0.0.5,213\n10.0.0.6\n")
+    assert window.saved_devices == [("10.0.0.5", "213"), ("10.0.0.6", "240")]
+    assert (window.max_parallel_devices, window.default_dpi, window.last_subnet) == (8, "240", "192.168.1.0/24")
+    assert (window.apk_manager.artifact_server, window.apk_manager.channel) == ("http://srv:8080", "rollback")
+    assert window.apk_manager.artifact_store.max_bytes == 512 * 1024 * 1024
+    assert window.wifi_rate_mb == 0
+
+
+def test_devices_l_output_with_offline_and_unauthorized():
+    output = ("* daemon not running; starting now at tcp:5037\n"
+              "* daemon started successfully\n"
+              "List of devices attached\n"
+              "0123456789ABCDEF       device usb:1-1 product:rk3288 model:X96_Mini device:rk3288 transport_id:3\n"
+              "10.0.0.5:5555          offline transport_id:4\n"
+              "R58M12345             unauthorized usb:1-2 transport_id:5\n"
+              "\n")
+    devices = parse_devices_output(output)
+    assert [(d["serial"], d["state"]) for d in devices] == [("0123456789ABCDEF", "device"),
+                                                            ("10.0.0.5:5555", "offline"),
+                                                            ("R58M12345", "unauthorized")]
+    assert devices[0]["model"] == "X96_Mini"
+    assert devices[1] == {"serial": "10.0.0.5:5555", "state": "offline", "transport_id": "4"}
+    assert devices[2]["usb"] == "1-2"
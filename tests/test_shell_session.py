@@ -0,0 +1,109 @@
+import os
+import subprocess
+
+import pytest
+
+from configurardpi_qt import ADBManager, ADBSessionError, ADBShellSession
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="adb falso é um script POSIX")
+
+# adb falso: `adb -s X shell -T` abre um sh lendo do stdin (a sessão); `adb -s X shell cmd` roda cmd.
+# Cada sessão aberta é registrada em `sessions`
+FAKE_ADB = """#!/bin/sh
+shift 3
+if [ "$1" = "-T" ]; then
+    echo session >> {sessions}
+    exec sh {redirect}
+fi
+exec sh -c "$*"
+"""
+
+
+def write_adb(tmp_path, merge_stderr=False):
+    adb = tmp_path / "adb"
+    # Sem shell v2 o adb entrega o stderr do dispositivo no stdout
+    adb.write_text(FAKE_ADB.format(sessions=tmp_path / "sessions", redirect="2>&1" if merge_stderr else ""))
+    adb.chmod(0o755)
+    return str(adb)
+
+
+def session_count(tmp_path):
+    path = tmp_path / "sessions"
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+@pytest.fixture
+def session(tmp_path):
+    sessions = []
+
+    def start(merge_stderr=False):
+        sessions.append(ADBShellSession(write_adb(tmp_path, merge_stderr), "usb1"))
+        return sessions[-1]
+
+    yield start
+    for s in sessions:
+        s.close()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    m = ADBManager()
+    m.adb_path = write_adb(tmp_path)
+    m.use_socket_transport = False
+    yield m
+    m.close_all_sessions()
+
+
+def test_stdout_stderr_and_returncode_kept_apart(session):
+    s = session()
+    result = s.run("echo saída; echo erro >&2; echo fim; exit 3")
+    assert (result.returncode, result.stdout, result.stderr) == (3, "saída\nfim\n", "erro\n")
+
+    # Os marcadores de um comando não vazam para o seguinte
+    result = s.run(["printf", "sem-quebra"])
+    assert (result.returncode, result.stdout, result.stderr) == (0, "sem-quebra", "")
+
+
+def test_merged_stderr_is_detected(session):
+    s = session(merge_stderr=True)
+    result = s.run("echo saída; echo erro >&2; false")
+    assert (result.returncode, result.stdout, result.stderr) == (1, "saída\nerro\n", "")
+
+    result = s.run("printf parcial >&2; echo ok")
+    assert (result.returncode, result.stdout) == (0, "parcial" + "ok\n")
+
+
+def test_timeout_raises(session):
+    s = session()
+    with pytest.raises(subprocess.TimeoutExpired):
+        s.run("sleep 5", timeout=0.3)
+
+
+def test_dead_session_raises(session):
+    s = session()
+    with pytest.raises(ADBSessionError):
+        s.run("kill -9 $$")  # $$ no subshell é o próprio sh da sessão
+    assert not s.is_alive()
+    with pytest.raises(ADBSessionError):
+        s.run("true")
+
+
+def test_manager_restarts_session_after_timeout(manager, tmp_path):
+    assert manager.shell("usb1", "echo um").stdout == "um\n"
+    with pytest.raises(subprocess.TimeoutExpired):
+        manager.shell("usb1", "sleep 5", timeout=0.3)
+    # Estado desconhecido após o timeout: a próxima chamada abre outra sessão
+    assert manager.shell("usb1", "echo dois").stdout == "dois\n"
+    assert session_count(tmp_path) == 2
+
+
+def test_manager_restarts_dead_session(manager, tmp_path):
+    manager.shell("usb1", "true")
+    old = manager._get_session("usb1")
+    old.process.kill()
+    old.process.wait()
+
+    result = manager.shell("usb1", "echo de novo")
+    assert (result.returncode, result.stdout) == (0, "de novo\n")
+    assert manager._get_session("usb1") is not old
+    assert session_count(tmp_path) == 2
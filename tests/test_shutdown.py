@@ -0,0 +1,37 @@
+import asyncio
+import concurrent.futures
+import subprocess
+import threading
+import time
+
+from configurardpi_qt import ADBManager, AsyncLoopBridge
+
+
+def test_cancel_all_releases_waiting_threads():
+    bridge = AsyncLoopBridge()
+    outcome = []
+
+    def worker():
+        try:
+            bridge.run(asyncio.sleep(60))
+        except concurrent.futures.CancelledError:
+            outcome.append("cancelada")
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(0.1)
+    bridge.cancel_all()
+    thread.join(2)
+    bridge.stop()
+    assert outcome == ["cancelada"]
+
+
+def test_cancelled_manager_stops_waiting(monkeypatch):
+    manager = ADBManager()
+    monkeypatch.setattr(manager, "shell", lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, "", ""))
+    threading.Timer(0.2, manager.cancelled.set).start()
+
+    started = time.monotonic()
+    assert not manager.wait_for_foreground("usb1", "com.example.app", timeout=60)
+    assert manager.wait_until_ready("usb1", previous_boot_id="antigo") == (False, "Espera cancelada")
+    assert time.monotonic() - started < 2
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+import configurardpi_qt
+from configurardpi_qt import TokenBucket, TransferScheduler
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio falso: sleep só avança o tempo e registra a espera"""
+    state = {"now": 100.0, "sleeps": []}
+
+    def sleep(seconds):
+        state["sleeps"].append(round(seconds, 6))
+        state["now"] += seconds
+
+    monkeypatch.setattr(configurardpi_qt.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(configurardpi_qt.time, "sleep", sleep)
+    return state
+
+
+def test_bucket_without_rate_never_waits(clock):
+    bucket = TokenBucket(None)
+    bucket.consume(10 ** 9)
+    assert clock["sleeps"] == []
+
+
+def test_bucket_burst_then_rate(clock):
+    # Valores exatos em ponto flutuante: o relógio falso não avança com esperas residuais
+    bucket = TokenBucket(rate=128, capacity=128)
+    bucket.consume(128)  # Rajada inicial cheia
+    assert clock["sleeps"] == []
+
+    bucket.consume(64)
+    assert clock["sleeps"] == [0.5]
+
+    clock["now"] += 0.25  # 32 bytes de saldo acumulado
+    bucket.consume(48)
+    assert clock["sleeps"] == [0.5, 0.125]
+
+
+def test_bucket_block_larger_than_capacity_goes_negative(clock):
+    bucket = TokenBucket(rate=128, capacity=128)
+    bucket.consume(384)  # Passa com o balde cheio e deixa saldo -256
+    assert clock["sleeps"] == []
+
+    bucket.consume(32)
+    assert clock["sleeps"] == [2.25]
+
+
+def run_transfers(scheduler, serials, hold=0.05):
+    """Roda uma transferência por serial e mede o máximo simultâneo (total e por sub-rede)"""
+    active = {}
+    peaks = {}
+    lock = threading.Lock()
+
+    def transfer(serial):
+        subnet = TransferScheduler.subnet_of(serial)
+        with scheduler.slot(serial):
+            with lock:
+                active[subnet] = active.get(subnet, 0) + 1
+                active["total"] = active.get("total", 0) + 1
+                for key in (subnet, "total"):
+                    peaks[key] = max(peaks.get(key, 0), active[key])
+            time.sleep(hold)
+            with lock:
+                active[subnet] -= 1
+                active["total"] -= 1
+
+    threads = [threading.Thread(target=transfer, args=(serial,)) for serial in serials]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return peaks
+
+
+def test_per_subnet_cap():
+    scheduler = TransferScheduler(max_concurrent=8, max_per_subnet=2)
+    peaks = run_transfers(scheduler, [f"10.0.0.{i}:5555" for i in range(1, 7)])
+    assert peaks["10.0.0.0/24"] == 2
+
+
+def test_global_cap_across_subnets():
+    scheduler = TransferScheduler(max_concurrent=3, max_per_subnet=2)
+    serials = [f"10.0.{subnet}.{i}:5555" for subnet in range(3) for i in range(1, 4)]
+    peaks = run_transfers(scheduler, serials)
+    assert peaks["total"] == 3
+    assert all(peaks[f"10.0.{subnet}.0/24"] <= 2 for subnet in range(3))
+
+
+def test_usb_transfers_only_use_global_slots():
+    scheduler = TransferScheduler(max_concurrent=2, max_per_subnet=1)
+    peaks = run_transfers(scheduler, ["usb1", "usb2", "usb3", "usb4"])
+    assert peaks["total"] == 2
+
+
+def test_measured_rate_adjusts_subnet_slots():
+    scheduler = TransferScheduler(max_per_subnet=3, min_rate=MB)
+    a, b = "10.0.0.1:5555", "10.0.0.2:5555"
+
+    # Sozinha e lenta: sinal fraco do dispositivo, as vagas não mudam
+    with scheduler.slot(a):
+        scheduler.record(a, MB, 4)
+    assert scheduler.subnet_limit(a) == 3
+
+    # Lenta junto com outra: access point saturado, uma vaga a menos
+    with scheduler.slot(a), scheduler.slot(b):
+        scheduler.record(a, MB, 4)
+        scheduler.record(b, MB, 4)
+    assert scheduler.subnet_limit(a) == 1
+
+    # Taxa boa devolve as vagas, até o máximo configurado
+    for _ in range(4):
+        with scheduler.slot(a):
+            scheduler.record(a, 10 * MB, 2)
+    assert scheduler.subnet_limit(a) == 3
+    assert scheduler.take_rate(a) == 5.0
+    assert scheduler.take_rate(a) is None
+
+
+def test_set_global_rate(clock):
+    scheduler = TransferScheduler()
+    assert scheduler._global_bucket.rate == TransferScheduler.DEFAULT_GLOBAL_RATE
+    scheduler.set_global_rate(0)
+    scheduler.throttle("usb1", 10 ** 9)
+    assert clock["sleeps"] == []